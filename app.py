@@ -1,8 +1,12 @@
 import os
 import logging
+import multiprocessing
+import sqlite3
 from flask import Flask, session, render_template, redirect, url_for
 from flask_login import current_user
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
@@ -23,6 +27,14 @@ app.config.from_object(Config)
 # Database configuration
 db = SQLAlchemy(app, model_class=Base)
 
+# SQLite ignores foreign keys (and so ON DELETE CASCADE) unless enabled per connection
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
 # Add template functions
 @app.template_global()
 def current_time():
@@ -35,16 +47,23 @@ def inject_last_updated():
     from datetime import datetime
     return {'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M')}
 
-# Create tables - but don't fail if database is unreachable
-try:
-    with app.app_context():
-        import models  # noqa: F401
-        db.create_all()
-        logging.info("Database tables created successfully")
-except Exception as e:
-    logging.warning(f"Could not create database tables during startup: {e}")
-    logging.info("Tables may already exist or database may be temporarily unavailable")
-    logging.info("Application will continue with limited functionality")
+# Create tables - but don't fail if database is unreachable. Processes spawned by
+# multiprocessing (the partner statement render pool) re-import the main module
+# and so this one; only the parent process touches the database at startup.
+if multiprocessing.parent_process() is None:
+    try:
+        with app.app_context():
+            import models  # noqa: F401
+            db.create_all()
+            logging.info("Database tables created successfully")
+            from utils.search import ensure_search_index
+            ensure_search_index()
+            from utils.report_jobs import fail_orphaned_jobs
+            fail_orphaned_jobs()
+    except Exception as e:
+        logging.warning(f"Could not create database tables during startup: {e}")
+        logging.info("Tables may already exist or database may be temporarily unavailable")
+        logging.info("Application will continue with limited functionality")
 
 # Add database connection check function
 def is_database_available():
@@ -191,6 +210,12 @@ except Exception as e:
     print(f"Warning: Could not register some blueprints: {e}")
     print("Main routes will still work")
 
+# Register CLI commands
+try:
+    import commands  # noqa: F401
+except Exception as e:
+    print(f"Warning: Could not register CLI commands: {e}")
+
 # Main routes
 @app.route('/')
 def index():
@@ -1,24 +1,70 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from supabase_auth import require_login
 from datetime import datetime
-from models import Auction, Item
+from models import Auction, Item, ItemStatus, item_list_options
 from app import db
 
 auctions_bp = Blueprint('auctions', __name__)
 
+# Columns of auction_item_stats() besides auction_id
+AUCTION_STAT_COLUMNS = (['item_count'] + [f'{status.value}_count' for status in ItemStatus]
+                        + ['spend', 'realized_profit'])
+
+def auction_item_stats(auction_ids=None):
+    """
+    Per-auction item counts (total and by status), spend and realized profit
+    as one grouped subquery over the items' cached columns
+
+    Spend counts purchase price, refurb cost and itemized expenses for every
+    item that was actually bought (anything past watch).
+
+    Args:
+        auction_ids: Only group these auctions' items (a range scan on
+            idx_item_auction_id) - ids or a SELECT of them - or None for
+            every auction
+    """
+    bought = Item.status != ItemStatus.WATCH
+    spend = (db.func.coalesce(Item.purchase_price, 0) + db.func.coalesce(Item.refurb_cost, 0)
+             + db.func.coalesce(Item.total_expenses_cached, 0))
+    stmt = (db.select(
+                Item.auction_id,
+                db.func.count(Item.id).label('item_count'),
+                *[db.func.count(db.case((Item.status == status, Item.id))).label(f'{status.value}_count')
+                  for status in ItemStatus],
+                db.func.sum(db.case((bought, spend), else_=0)).label('spend'),
+                db.func.sum(db.case((Item.status == ItemStatus.SOLD, Item.net_profit_cached), else_=0)).label('realized_profit'))
+            .group_by(Item.auction_id))
+    if auction_ids is not None:
+        stmt = stmt.where(Item.auction_id.in_(auction_ids))
+    return stmt.subquery('auction_stats')
+
 @auctions_bp.route('/')
 @require_login
 def index():
     """List all auctions"""
     page = request.args.get('page', 1, type=int)
-    per_page = 20
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
     
-    auctions = Auction.query.order_by(Auction.date.desc()).all()
+    # One query for the page with its items' stats outer-joined on, grouping
+    # only the items of this page's auctions, and one that counts auctions
+    page = max(page, 1)
+    order = (Auction.date.desc(), Auction.id.desc())
+    page_ids = db.select(Auction.id).order_by(*order).limit(per_page).offset((page - 1) * per_page)
+    stats = auction_item_stats(page_ids)
+    auctions = (Auction.query
+                .outerjoin(stats, stats.c.auction_id == Auction.id)
+                .add_columns(*[db.func.coalesce(stats.c[name], 0).label(name) for name in AUCTION_STAT_COLUMNS])
+                .order_by(*order)
+                .paginate(page=page, per_page=per_page, error_out=False, count=False))
+    auctions.total = Auction.query.order_by(None).count()
+    rows = [{'auction': row.Auction, **{name: getattr(row, name) for name in AUCTION_STAT_COLUMNS}}
+            for row in auctions.items]
     
     from datetime import date
     today = date.today()
     
-    return render_template('auctions/index.html', auctions=auctions, today=today)
+    return render_template('auctions/index.html', auctions=auctions, rows=rows, per_page=per_page,
+                           statuses=list(ItemStatus), today=today)
 
 @auctions_bp.route('/create', methods=['GET', 'POST'])
 @require_login
@@ -125,11 +171,22 @@ def view(auction_id):
     from datetime import date
     auction = Auction.query.get_or_404(auction_id)
     
-    # Get items for this auction
-    items = Item.query.filter_by(auction_id=auction_id).order_by(Item.lot_number).all()
+    page = request.args.get('page', 1, type=int)
+    per_page = min(max(request.args.get('per_page', 100, type=int), 1), 500)
+    
+    # Items in natural lot order, paged straight off idx_item_auction_lot_sort
+    items = (Item.query.options(*item_list_options())
+             .filter_by(auction_id=auction_id)
+             .order_by(Item.lot_sort_key, Item.id)
+             .paginate(page=page, per_page=per_page, error_out=False))
+    
+    # Counts cover the whole auction, not just this page
+    stats = auction_item_stats([auction_id])
+    counts = db.session.execute(db.select(stats)).first()
     
     today = date.today()
-    return render_template('auctions/view.html', auction=auction, items=items, today=today)
+    return render_template('auctions/view.html', auction=auction, items=items, counts=counts,
+                           per_page=per_page, today=today)
 
 @auctions_bp.route('/api/search')
 @require_login
@@ -1,11 +1,52 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from supabase_auth import require_login
 from datetime import datetime, date
-from models import Item, ItemExpense, ItemStatus
+from models import Item, ItemExpense, ItemStatus, EXPENSE_DATA_VERSION, bulk_insert_expenses
+from utils.report_cache import cached_report
+from utils.bulk_expenses import validate_bulk_expenses
 from app import db
 
 expenses_bp = Blueprint('expenses', __name__)
 
+def get_expense_categories():
+    """Distinct expense categories, cached until an expense is written"""
+    def compute():
+        return [category for (category,) in db.session.execute(
+            db.select(ItemExpense.category).distinct()
+            .where(ItemExpense.category.isnot(None), ItemExpense.category != '')
+            .order_by(ItemExpense.category))]
+    return cached_report('expense_categories', None, compute, version_name=EXPENSE_DATA_VERSION)
+
+def get_expense_summary(item_id=None, category=None):
+    """
+    Count, total, average, latest date and per-category subtotals for the
+    expenses matching the filters, from one GROUP BY category query
+    """
+    # Blank and missing categories are both "Uncategorized"
+    category_group = db.func.nullif(ItemExpense.category, '')
+    stmt = (db.select(category_group,
+                      db.func.count(ItemExpense.id),
+                      db.func.sum(ItemExpense.amount),
+                      db.func.max(ItemExpense.date))
+            .group_by(category_group)
+            .order_by(db.func.sum(ItemExpense.amount).desc()))
+    if item_id is not None:
+        stmt = stmt.where(ItemExpense.item_id == item_id)
+    if category is not None:
+        stmt = stmt.where(ItemExpense.category == category)
+    
+    summary = {'count': 0, 'total': 0.0, 'average': 0.0, 'latest_date': None, 'categories': []}
+    for category_name, count, total, latest in db.session.execute(stmt):
+        total = float(total or 0)
+        summary['categories'].append({'category': category_name, 'count': count, 'total': total})
+        summary['count'] += count
+        summary['total'] += total
+        if latest is not None and (summary['latest_date'] is None or latest > summary['latest_date']):
+            summary['latest_date'] = latest
+    if summary['count']:
+        summary['average'] = summary['total'] / summary['count']
+    return summary
+
 @expenses_bp.route('/')
 @require_login
 def index():
@@ -15,43 +56,39 @@ def index():
     category_filter = request.args.get('category', 'all')
     per_page = 20
     
+    item_id = int(item_filter) if item_filter != 'all' else None
+    category = category_filter if category_filter != 'all' else None
+    
     query = ItemExpense.query
     
     # Apply filters
-    if item_filter != 'all':
-        query = query.filter(ItemExpense.item_id == int(item_filter))
+    if item_id is not None:
+        query = query.filter(ItemExpense.item_id == item_id)
     
-    if category_filter != 'all':
-        query = query.filter(ItemExpense.category == category_filter)
+    if category is not None:
+        query = query.filter(ItemExpense.category == category)
     
     expenses = query.order_by(ItemExpense.date.desc()).paginate(
         page=page, per_page=per_page, error_out=False)
     
-    # Get items and categories for filter dropdowns
-    items = Item.query.order_by(Item.title).all()
-    categories = db.session.query(ItemExpense.category).distinct().filter(
-        ItemExpense.category.isnot(None)).all()
-    categories = [cat[0] for cat in categories]
+    # Selected item for the filter picker, categories for the dropdown
+    selected_item = db.session.get(Item, item_id) if item_id is not None else None
+    categories = get_expense_categories()
     
-    # Calculate summary statistics for all expenses (ignoring filters for summary)
-    total_expenses = float(db.session.query(db.func.sum(ItemExpense.amount)).scalar() or 0)
-    expense_count = ItemExpense.query.count()
-    avg_expense = total_expenses / expense_count if expense_count > 0 else 0
-    
-    # Get latest expense date
-    latest_expense = ItemExpense.query.order_by(ItemExpense.date.desc()).first()
-    latest_date = latest_expense.date if latest_expense else None
+    # Summary cards follow the active filters
+    summary = get_expense_summary(item_id, category)
     
     return render_template('expenses/index.html', 
                          expenses=expenses, 
-                         items=items,
+                         selected_item=selected_item,
                          categories=categories,
                          item_filter=item_filter,
                          category_filter=category_filter,
-                         total_expenses=total_expenses,
-                         expense_count=expense_count,
-                         avg_expense=avg_expense,
-                         latest_date=latest_date)
+                         summary=summary,
+                         total_expenses=summary['total'],
+                         expense_count=summary['count'],
+                         avg_expense=summary['average'],
+                         latest_date=summary['latest_date'])
 
 @expenses_bp.route('/create', methods=['GET', 'POST'])
 @require_login
@@ -81,8 +118,40 @@ def create():
             flash(f'Error creating expense: {str(e)}', 'danger')
             return redirect(request.url)
     
-    items = Item.query.order_by(Item.title).all()
-    return render_template('expenses/form.html', items=items, selected_item_id=item_id)
+    selected_item = db.session.get(Item, item_id) if item_id else None
+    return render_template('expenses/form.html', selected_item=selected_item)
+
+@expenses_bp.route('/api/bulk', methods=['POST'])
+@require_login
+def bulk_create():
+    """
+    Add many expenses from a JSON array (or {"expenses": [...]}) in one transaction
+
+    Nothing is saved unless every entry is valid; otherwise the response lists
+    the errors by entry index.
+    """
+    payload = request.get_json(silent=True)
+    entries = payload.get('expenses') if isinstance(payload, dict) else payload
+    
+    rows, errors = validate_bulk_expenses(entries)
+    if errors:
+        return jsonify({'success': False, 'errors': errors}), 400
+    
+    try:
+        created = bulk_insert_expenses(rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Bulk expense insert failed')
+        return jsonify({'success': False, 'errors': [
+            {'row': None, 'field': None, 'message': 'Could not save the expenses. Please try again.'}]}), 500
+    
+    return jsonify({
+        'success': True,
+        'created': created,
+        'total': f"{sum(row['amount'] for row in rows):.2f}",
+        'items': len({row['item_id'] for row in rows})
+    }), 201
 
 @expenses_bp.route('/<int:expense_id>/edit', methods=['GET', 'POST'])
 @require_login
@@ -109,8 +178,7 @@ def edit(expense_id):
             flash(f'Error updating expense: {str(e)}', 'danger')
             return redirect(request.url)
     
-    items = Item.query.order_by(Item.title).all()
-    return render_template('expenses/form.html', expense=expense, items=items)
+    return render_template('expenses/form.html', expense=expense, selected_item=expense.item)
 
 @expenses_bp.route('/<int:expense_id>/delete', methods=['POST'])
 @require_login
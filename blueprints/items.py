@@ -1,43 +1,107 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, make_response, abort
+from flask_login import current_user
 from supabase_auth import require_login
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import os
-from models import Item, Auction, Partner, ItemPartner, ItemStatus, ItemExpense, ItemSale
+from models import (Item, Auction, Partner, ItemPartner, ItemStatus, ItemExpense, ItemSale, item_list_options,
+                    bulk_update_item_status, bulk_delete_items)
 from utils.ebay_api import ebay_api
+from utils.pagination import paginate_keyset
+from utils.search import search_items, typeahead_items, item_label
+from utils.csv_import import IMPORT_JOB_KIND, save_import_upload, build_import_job, load_import_report
+from utils.report_jobs import PENDING_STATUSES, register_job_kind, submit_job, get_job, job_result_path
+from utils.streaming import stream_query, csv_response
 from app import db
 
 items_bp = Blueprint('items', __name__)
 
-@items_bp.route('/')
-@require_login
-def index():
-    """List all items with filtering"""
+def _filtered_items_page():
+    """Apply the status/auction filters and cursor from the query string"""
     status_filter = request.args.get('status', 'all')
     auction_filter = request.args.get('auction', 'all')
-    page = request.args.get('page', 1, type=int)
+    after = request.args.get('after')
+    before = request.args.get('before')
     per_page = 20
     
-    query = Item.query
-    
     # Apply filters
+    filters = []
     if status_filter != 'all':
-        query = query.filter(Item.status == ItemStatus(status_filter))
+        filters.append(Item.status == ItemStatus(status_filter))
     
     if auction_filter != 'all':
-        query = query.filter(Item.auction_id == int(auction_filter))
+        filters.append(Item.auction_id == int(auction_filter))
+    
+    query = Item.query.options(*item_list_options()).filter(*filters)
     
-    items = query.order_by(Item.updated_at.desc()).all()
+    # Keyset pagination on (updated_at, id) so deep pages cost the same as the first
+    page = paginate_keyset(query, Item.updated_at, Item.id, per_page=per_page,
+                           after=after, before=before)
+    
+    # Header count: one COUNT over the same filters, without the eager loads
+    page.total = db.session.scalar(db.select(db.func.count(Item.id)).where(*filters))
+    
+    return page, status_filter, auction_filter
+
+@items_bp.route('/')
+@require_login
+def index():
+    """List all items with filtering"""
+    page, status_filter, auction_filter = _filtered_items_page()
     
     # Get auctions for filter dropdown
     auctions = Auction.query.order_by(Auction.date.desc()).all()
     
     return render_template('items/index.html', 
-                         items=items, 
+                         items=page.items, 
+                         page=page,
                          auctions=auctions,
                          status_filter=status_filter,
                          auction_filter=auction_filter)
 
+@items_bp.route('/rows')
+@require_login
+def rows():
+    """Table rows and pagination footer for a filter or page change (htmx)"""
+    page, status_filter, auction_filter = _filtered_items_page()
+    
+    response = make_response(render_template('items/rows.html',
+                                              items=page.items,
+                                              page=page,
+                                              status_filter=status_filter,
+                                              auction_filter=auction_filter))
+    # Keep the address bar on the full page so reloads and bookmarks still work
+    response.headers['HX-Push-Url'] = url_for('items.index', **request.args)
+    return response
+
+@items_bp.route('/search')
+@require_login
+def search():
+    """Ranked full-text search over item title, description and lot number"""
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    
+    results = search_items(query, page=page, per_page=20, options=item_list_options())
+    
+    return render_template('items/search.html', results=results, query=query)
+
+@items_bp.route('/api/typeahead')
+@require_login
+def api_typeahead():
+    """API endpoint for item pickers (prefix/trigram match, 20 results)"""
+    query = request.args.get('q', '').strip()
+    
+    results = []
+    for item in typeahead_items(query, limit=20):
+        results.append({
+            'id': item.id,
+            'title': item.title,
+            'lot_number': item.lot_number,
+            'label': item_label(item)
+        })
+    
+    return jsonify(results)
+
 @items_bp.route('/bulk-action', methods=['POST'])
 @require_login
 def bulk_action():
@@ -49,17 +113,16 @@ def bulk_action():
         flash('No items selected.', 'warning')
         return redirect(url_for('items.index'))
     
+    try:
+        item_ids = [int(item_id) for item_id in selected_items]
+    except ValueError:
+        flash('Invalid item selection.', 'danger')
+        return redirect(url_for('items.index'))
+    
     if action == 'delete':
         try:
-            deleted_count = 0
-            for item_id in selected_items:
-                item = Item.query.get(int(item_id))
-                if item:
-                    # Delete partnerships first
-                    ItemPartner.query.filter_by(item_id=item.id).delete()
-                    db.session.delete(item)
-                    deleted_count += 1
-            
+            # One DELETE; partnerships, expenses and sales go via ON DELETE CASCADE
+            deleted_count = bulk_delete_items(item_ids)
             db.session.commit()
             flash(f'Successfully deleted {deleted_count} items.', 'success')
             
@@ -71,13 +134,7 @@ def bulk_action():
         new_status = request.form.get('new_status')
         if new_status and new_status in [status.value for status in ItemStatus]:
             try:
-                updated_count = 0
-                for item_id in selected_items:
-                    item = Item.query.get(int(item_id))
-                    if item:
-                        item.status = ItemStatus(new_status)
-                        updated_count += 1
-                
+                updated_count = bulk_update_item_status(item_ids, ItemStatus(new_status))
                 db.session.commit()
                 flash(f'Successfully updated {updated_count} items to {new_status}.', 'success')
                 
@@ -139,7 +196,7 @@ def create():
             
             # Try to get eBay price suggestion (non-blocking)
             try:
-                ebay_api.update_item_price_suggestion(item)
+                ebay_api.update_item_price_suggestion(item, interactive=True)
             except:
                 pass  # Don't fail item creation if eBay API fails
             
@@ -315,7 +372,7 @@ def manage_partners(item_id):
 @require_login
 def watchlist():
     """Show watchlist items"""
-    items = Item.query.filter_by(status=ItemStatus.WATCH).order_by(Item.updated_at.desc()).all()
+    items = Item.query.options(*item_list_options()).filter_by(status=ItemStatus.WATCH).order_by(Item.updated_at.desc()).all()
     auctions = Auction.query.order_by(Auction.date.desc()).all()
     
     return render_template('items/watchlist.html', items=items, auctions=auctions)
@@ -324,29 +381,30 @@ def watchlist():
 @require_login
 def inventory():
     """Show inventory (won items)"""
-    items = Item.query.filter_by(status=ItemStatus.WON).order_by(Item.updated_at.desc()).all()
-    
-    # Calculate totals for summary cards
-    total_invested = 0
-    total_target = 0
-    
-    for item in items:
-        # Calculate total cost including expenses
-        item_cost = float(item.purchase_price or 0) + float(item.refurb_cost or 0)
-        if hasattr(item, 'total_expenses') and callable(item.total_expenses):
-            expenses = item.total_expenses()
-            if expenses:
-                item_cost += float(expenses)
-        total_invested += item_cost
-        
-        # Add target resale price
-        if item.target_resale_price:
-            total_target += float(item.target_resale_price)
-    
+    # Summary cards come from one aggregate over the won items, using the
+    # write-maintained expense total rather than rescanning item_expense
+    item_cost = (db.func.coalesce(Item.purchase_price, 0) + db.func.coalesce(Item.refurb_cost, 0)
+                 + db.func.coalesce(Item.total_expenses_cached, 0))
+    totals = db.session.execute(
+        db.select(db.func.count(Item.id).label('item_count'),
+                  db.func.coalesce(db.func.sum(item_cost), 0).label('total_invested'),
+                  db.func.coalesce(db.func.sum(Item.target_resale_price), 0).label('total_target'))
+        .where(Item.status == ItemStatus.WON)
+    ).one()
+    
+    total_invested = float(totals.total_invested)
+    total_target = float(totals.total_target)
     estimated_profit = total_target - total_invested
     
+    # Item rows are paged separately
+    query = Item.query.options(*item_list_options()).filter_by(status=ItemStatus.WON)
+    page = paginate_keyset(query, Item.updated_at, Item.id, per_page=20,
+                           after=request.args.get('after'), before=request.args.get('before'))
+    
     return render_template('items/inventory.html', 
-                         items=items,
+                         items=page.items,
+                         page=page,
+                         item_count=totals.item_count,
                          total_invested=total_invested,
                          total_target=total_target,
                          estimated_profit=estimated_profit)
@@ -355,7 +413,7 @@ def inventory():
 @require_login
 def sold():
     """Show sold items"""
-    items = Item.query.filter_by(status=ItemStatus.SOLD).order_by(Item.sale_date.desc(), Item.updated_at.desc()).all()
+    items = Item.query.options(*item_list_options()).filter_by(status=ItemStatus.SOLD).order_by(Item.sale_date.desc(), Item.updated_at.desc()).all()
     
     return render_template('items/sold.html', items=items)
 
@@ -363,44 +421,29 @@ def sold():
 @require_login
 def export_inventory():
     """Export inventory as CSV"""
-    import csv
-    import io
-    from flask import make_response
-    
-    # Get all items 
-    items = Item.query.order_by(Item.updated_at.desc()).all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
+    items = stream_query(Item.query.options(*item_list_options()).order_by(Item.updated_at.desc()))
+    
+    def rows():
+        for item in items:
+            yield [
+                item.id,
+                item.title,
+                item.lot_number or '',
+                item.auction.title if item.auction else '',
+                item.status.value,
+                float(item.purchase_price) if item.purchase_price else '',
+                float(item.refurb_cost) if item.refurb_cost else '',
+                float(item.target_resale_price) if item.target_resale_price else '',
+                float(item.sale_price) if item.sale_price else '',
+                item.sale_date.strftime('%Y-%m-%d') if item.sale_date else '',
+                item.net_profit if item.net_profit else '',
+                round(item.roi_percentage, 2) if item.roi_percentage else ''
+            ]
+    
+    return csv_response('inventory.csv', [
         'ID', 'Title', 'Lot Number', 'Auction', 'Status', 'Purchase Price', 
         'Refurb Cost', 'Target Resale', 'Sale Price', 'Sale Date', 'Net Profit', 'ROI %'
-    ])
-    
-    # Write data
-    for item in items:
-        writer.writerow([
-            item.id,
-            item.title,
-            item.lot_number or '',
-            item.auction.title if item.auction else '',
-            item.status.value,
-            float(item.purchase_price) if item.purchase_price else '',
-            float(item.refurb_cost) if item.refurb_cost else '',
-            float(item.target_resale_price) if item.target_resale_price else '',
-            float(item.sale_price) if item.sale_price else '',
-            item.sale_date.strftime('%Y-%m-%d') if item.sale_date else '',
-            item.net_profit if item.net_profit else '',
-            round(item.roi_percentage, 2) if item.roi_percentage else ''
-        ])
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = 'attachment; filename=inventory.csv'
-    
-    return response
+    ], rows())
 
 @items_bp.route('/import-inventory', methods=['GET', 'POST'])
 @require_login
@@ -420,47 +463,30 @@ def import_inventory():
             flash('Please upload a CSV file.', 'danger')
             return redirect(request.url)
         
-        try:
-            import csv
-            import io
-            from datetime import datetime
-            
-            # Read CSV content
-            stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-            csv_input = csv.DictReader(stream)
-            
-            updated_count = 0
-            
-            for row in csv_input:
-                item_id = row.get('ID', '').strip()
-                
-                if item_id:
-                    # Update existing item
-                    item = Item.query.get(int(item_id))
-                    if item:
-                        if row.get('Purchase Price'):
-                            item.purchase_price = float(row['Purchase Price'])
-                        if row.get('Refurb Cost'):
-                            item.refurb_cost = float(row['Refurb Cost'])
-                        if row.get('Sale Price'):
-                            item.sale_price = float(row['Sale Price'])
-                        if row.get('Sale Date'):
-                            item.sale_date = datetime.strptime(row['Sale Date'], '%Y-%m-%d').date()
-                        
-                        item.updated_at = datetime.utcnow()
-                        updated_count += 1
-                
-            db.session.commit()
-            
-            flash(f'Successfully updated {updated_count} items from CSV.', 'success')
-            return redirect(url_for('items.index'))
-            
-        except Exception as e:
-            db.session.rollback()
-            flash(f'Error processing CSV: {str(e)}', 'danger')
-            return redirect(request.url)
-    
-    return render_template('items/import_inventory.html')
+        dry_run = request.form.get('dry_run') == 'on'
+        
+        # Imported by a background job, parsed off the saved file and committed in chunks
+        job = submit_job(IMPORT_JOB_KIND, {'upload': save_import_upload(file), 'dry_run': dry_run},
+                         current_user.id)
+        return redirect(url_for('items.import_inventory', job=job.id))
+    
+    job = None
+    report = None
+    job_id = request.args.get('job')
+    if job_id:
+        job = get_job(job_id, current_user.id)
+        if job is None or job.kind != IMPORT_JOB_KIND:
+            abort(404)
+        path = job_result_path(job)
+        if path:
+            report = load_import_report(path)
+    
+    return render_template('items/import_inventory.html', job=job, report=report,
+                           pending=job is not None and job.status in PENDING_STATUSES)
+
+register_job_kind(IMPORT_JOB_KIND, build_import_job,
+                  lambda params: 'inventory_import.json', 'application/json',
+                  view='items.import_inventory')
 
 @items_bp.route('/<int:item_id>/update-price', methods=['POST'])
 @require_login
@@ -469,7 +495,7 @@ def update_price_suggestion(item_id):
     item = Item.query.get_or_404(item_id)
     
     try:
-        success = ebay_api.update_item_price_suggestion(item)
+        success = ebay_api.update_item_price_suggestion(item, interactive=True)
         
         if success:
             return jsonify({
@@ -1,7 +1,10 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from supabase_auth import require_login
-from datetime import datetime
-from models import Partner, ItemPartner, Item, ItemStatus
+from datetime import datetime, timedelta
+from models import Partner, ItemPartner, Item, ItemStatus, partnership_list_options
+from utils.streaming import stream_query, csv_response
+from utils.partner_stats import get_partner_stats
+from utils.partner_ledger import get_partner_balances, get_partner_statement, record_payout
 from app import db
 
 partners_bp = Blueprint('partners', __name__)
@@ -11,35 +14,7 @@ partners_bp = Blueprint('partners', __name__)
 def index():
     """List all partners"""
     partners = Partner.query.order_by(Partner.name).all()
-    
-    # Calculate partner statistics
-    partner_stats = {}
-    for partner in partners:
-        stats = {
-            'total_items': 0,
-            'sold_items': 0,
-            'total_earnings': 0,
-            'pending_earnings': 0
-        }
-        
-        for partnership in partner.item_partnerships:
-            stats['total_items'] += 1
-            
-            if partnership.item.status == ItemStatus.SOLD:
-                stats['sold_items'] += 1
-                earnings = partnership.calculate_partner_share()
-                if earnings:
-                    stats['total_earnings'] += earnings
-            elif partnership.item.status in [ItemStatus.WON, ItemStatus.LISTED]:
-                # Estimate pending earnings based on target resale price
-                if partnership.item.target_resale_price and partnership.item.purchase_price:
-                    estimated_net = float(partnership.item.target_resale_price) - float(partnership.item.purchase_price)
-                    estimated_net -= float(partnership.item.refurb_cost or 0)
-                    estimated_net -= estimated_net * 0.15  # Estimate 15% for fees/shipping
-                    if estimated_net > 0:
-                        stats['pending_earnings'] += (float(partnership.pct_share) / 100) * estimated_net
-        
-        partner_stats[partner.id] = stats
+    partner_stats = get_partner_stats()
     
     return render_template('partners/index.html', partners=partners, partner_stats=partner_stats)
 
@@ -134,7 +109,7 @@ def view(partner_id):
     partner = Partner.query.get_or_404(partner_id)
     
     # Get all partnerships for this partner
-    partnerships = ItemPartner.query.filter_by(partner_id=partner_id).join(Item).order_by(Item.updated_at.desc()).all()
+    partnerships = ItemPartner.query.options(*partnership_list_options()).filter_by(partner_id=partner_id).join(Item).order_by(Item.updated_at.desc()).all()
     
     # Calculate detailed earnings
     earnings_data = []
@@ -167,11 +142,48 @@ def view(partner_id):
         
         earnings_data.append(data)
     
+    # Ledger statement, defaulting to the last 90 days
+    try:
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() if request.args.get('end_date') else datetime.now().date()
+        start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() if request.args.get('start_date') else end_date - timedelta(days=90)
+    except ValueError:
+        flash('Invalid statement dates.', 'danger')
+        end_date = datetime.now().date()
+        start_date = end_date - timedelta(days=90)
+    statement = get_partner_statement(partner_id, start_date, end_date)
+    balance = get_partner_balances([partner_id]).get(partner_id, 0.0)
+    
     return render_template('partners/view.html', 
                          partner=partner, 
                          earnings_data=earnings_data,
                          total_earnings=total_earnings,
-                         pending_earnings=pending_earnings)
+                         pending_earnings=pending_earnings,
+                         balance=balance,
+                         statement=statement,
+                         start_date=start_date,
+                         end_date=end_date)
+
+@partners_bp.route('/<int:partner_id>/payouts', methods=['POST'])
+@require_login
+def add_payout(partner_id):
+    """Record a payout to a partner"""
+    partner = Partner.query.get_or_404(partner_id)
+    
+    try:
+        payout_date = None
+        if request.form.get('date'):
+            payout_date = datetime.strptime(request.form['date'], '%Y-%m-%d').date()
+        record_payout(partner.id, request.form.get('amount', ''), payout_date, request.form.get('note'))
+        db.session.commit()
+        flash(f'Payout to {partner.name} recorded.', 'success')
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e) if 'amount' in str(e) else 'Invalid payout date.', 'danger')
+    except Exception as e:
+        db.session.rollback()
+        flash('Error recording payout. Please try again.', 'danger')
+    
+    return redirect(url_for('partners.view', partner_id=partner.id))
 
 @partners_bp.route('/<int:partner_id>/earnings/export')
 @require_login
@@ -180,87 +192,53 @@ def export_earnings(partner_id):
     partner = Partner.query.get_or_404(partner_id)
     
     # Get all sold partnerships for this partner
-    partnerships = ItemPartner.query.filter_by(partner_id=partner_id).join(Item).filter(
+    partnerships = stream_query(ItemPartner.query.options(*partnership_list_options()).filter_by(partner_id=partner_id).join(Item).filter(
         Item.status == ItemStatus.SOLD
-    ).order_by(Item.sale_date.desc()).all()
-    
-    # Generate CSV content
-    import io
-    import csv
-    from flask import Response
+    ).order_by(Item.sale_date.desc()))
     
-    output = io.StringIO()
-    writer = csv.writer(output)
+    def rows():
+        total_earnings = 0
+        for partnership in partnerships:
+            item = partnership.item
+            share_amount = partnership.calculate_partner_share()
+            
+            if share_amount:
+                total_earnings += share_amount
+            
+            yield [
+                item.sale_date.strftime('%Y-%m-%d') if item.sale_date else '',
+                item.title,
+                item.lot_number or '',
+                item.auction.title if item.auction else '',
+                f'${float(item.purchase_price):.2f}' if item.purchase_price else '',
+                f'${float(item.sale_price):.2f}' if item.sale_price else '',
+                f'${item.net_profit:.2f}' if item.net_profit else '',
+                f'{float(partnership.pct_share):.1f}%',
+                f'${share_amount:.2f}' if share_amount else ''
+            ]
+        
+        # Add total row
+        yield ['', '', '', '', '', '', '', 'Total:', f'${total_earnings:.2f}']
     
-    # Write header
-    writer.writerow([
+    return csv_response(f'{partner.name}_earnings_{datetime.now().strftime("%Y%m%d")}.csv', [
         'Sale Date', 'Item Title', 'Lot Number', 'Auction', 
         'Purchase Price', 'Sale Price', 'Net Profit', 
         'Partner Share %', 'Partner Earnings'
-    ])
-    
-    # Write data
-    total_earnings = 0
-    for partnership in partnerships:
-        item = partnership.item
-        share_amount = partnership.calculate_partner_share()
-        
-        if share_amount:
-            total_earnings += share_amount
-        
-        writer.writerow([
-            item.sale_date.strftime('%Y-%m-%d') if item.sale_date else '',
-            item.title,
-            item.lot_number or '',
-            item.auction.title if item.auction else '',
-            f'${float(item.purchase_price):.2f}' if item.purchase_price else '',
-            f'${float(item.sale_price):.2f}' if item.sale_price else '',
-            f'${item.net_profit:.2f}' if item.net_profit else '',
-            f'{float(partnership.pct_share):.1f}%',
-            f'${share_amount:.2f}' if share_amount else ''
-        ])
-    
-    # Add total row
-    writer.writerow(['', '', '', '', '', '', '', 'Total:', f'${total_earnings:.2f}'])
-    
-    output.seek(0)
-    
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={
-            'Content-Disposition': f'attachment; filename="{partner.name}_earnings_{datetime.now().strftime("%Y%m%d")}.csv"'
-        }
-    )
+    ], rows())
 
 @partners_bp.route('/earnings')
 @require_login
 def earnings_summary():
     """Show earnings summary for all partners"""
     partners = Partner.query.order_by(Partner.name).all()
-    
-    summary_data = []
-    for partner in partners:
-        # Calculate total earnings
-        total_earnings = 0
-        total_items = 0
-        sold_items = 0
-        
-        for partnership in partner.item_partnerships:
-            total_items += 1
-            
-            if partnership.item.status == ItemStatus.SOLD:
-                sold_items += 1
-                earnings = partnership.calculate_partner_share()
-                if earnings:
-                    total_earnings += earnings
-        
-        summary_data.append({
-            'partner': partner,
-            'total_earnings': total_earnings,
-            'total_items': total_items,
-            'sold_items': sold_items
-        })
+    partner_stats = get_partner_stats()
+    
+    summary_data = [{
+        'partner': partner,
+        'total_earnings': partner_stats[partner.id]['total_earnings'],
+        'total_items': partner_stats[partner.id]['total_items'],
+        'sold_items': partner_stats[partner.id]['sold_items']
+    } for partner in partners]
     
     # Sort by total earnings
     summary_data.sort(key=lambda x: x['total_earnings'], reverse=True)
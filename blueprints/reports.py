@@ -1,11 +1,24 @@
-from flask import Blueprint, render_template, request, jsonify, send_file, flash, redirect, url_for
+import json
+from flask import (Blueprint, render_template, request, jsonify, flash, redirect, url_for, abort, Response,
+                   stream_with_context, send_file)
+from flask_login import current_user
 from supabase_auth import require_login
-from datetime import datetime, timedelta
-import io
-import csv
-from models import Item, Auction, Partner, ItemPartner, ItemStatus
-from utils.email_service import send_weekly_cashflow_report, generate_cashflow_csv, generate_cashflow_chart
+from datetime import date, datetime, timedelta
+from models import (Item, Auction, Partner, ItemPartner, ItemStatus, MonthlyRollup, item_list_options,
+                    month_start)
+from utils.email_service import (send_weekly_cashflow_report, generate_cashflow_chart,
+                                 iter_cashflow_rows, CASHFLOW_CSV_HEADER)
+from utils.streaming import stream_query, csv_response, write_csv
+from utils.cashflow import iter_cash_events, cashflow_totals
+from utils.columnar_export import (DATASETS, FORMATS, ExportUnavailable, check_format_available,
+                                   iter_columnar_export)
 from utils.profit_calculations import calculate_portfolio_metrics
+from utils.report_cache import cached_report, get_report_cache
+from utils.partner_stats import get_partner_stats, get_recent_partner_sales
+from utils.partner_statements import (collect_partner_statements, render_partner_statements,
+                                      write_statement_zip, email_partner_statements)
+from utils.report_jobs import (JOB_KINDS, PENDING_STATUSES, register_job_kind, submit_job, get_job, job_params,
+                               job_status, job_result_path)
 from app import db
 
 reports_bp = Blueprint('reports', __name__)
@@ -16,6 +29,12 @@ def index():
     """Reports dashboard"""
     return render_template('reports/index.html')
 
+@reports_bp.route('/cache-stats')
+@require_login
+def cache_stats():
+    """Report cache hit/miss counters for this worker"""
+    return jsonify(get_report_cache().stats())
+
 @reports_bp.route('/cashflow')
 @require_login
 def cashflow():
@@ -24,6 +43,23 @@ def cashflow():
     end_date_str = request.args.get('end_date', datetime.now().strftime('%Y-%m-%d'))
     start_date_str = request.args.get('start_date', (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
     
+    # A report prepared by a background job
+    job_id = request.args.get('job')
+    if job_id:
+        job = get_job(job_id, current_user.id)
+        if job is None or job.kind != 'cashflow':
+            abort(404)
+        path = job_result_path(job)
+        if path is None:
+            flash('That report is not ready yet.', 'warning')
+            return redirect(url_for('reports.cashflow'))
+        cashflow_data = _load_cashflow_job(path)
+        params = job_params(job)
+        return render_template('reports/cashflow.html',
+                             cashflow_data=cashflow_data,
+                             start_date=params['start_date'],
+                             end_date=params['end_date'])
+    
     try:
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
         end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
@@ -32,7 +68,8 @@ def cashflow():
         return redirect(url_for('reports.index'))
     
     # Get cash flow data
-    cashflow_data = get_cashflow_data(start_date, end_date)
+    cashflow_data = cached_report('cashflow', {'start_date': start_date, 'end_date': end_date},
+                                  lambda: get_cashflow_data(start_date, end_date))
     
     return render_template('reports/cashflow.html',
                          cashflow_data=cashflow_data,
@@ -43,108 +80,52 @@ def cashflow():
 @require_login
 def profit_analysis():
     """Profit analysis report"""
-    # Get all sold items
-    sold_items = Item.query.filter_by(status=ItemStatus.SOLD).all()
-    
-    # Calculate metrics
-    analysis_data = {
-        'total_items': len(sold_items),
-        'total_revenue': sum(float(item.sale_price) for item in sold_items if item.sale_price),
-        'total_investment': sum(float(item.purchase_price) + float(item.refurb_cost or 0) 
-                              for item in sold_items if item.purchase_price),
-        'total_net_profit': sum(item.net_profit for item in sold_items if item.net_profit),
-        'avg_roi': 0,
-        'top_performers': [],
-        'category_breakdown': {},
+    # The monthly trends window moves with the calendar, not just with the data
+    analysis_data = cached_report('profit_analysis', {'month': month_start(datetime.now().date())},
+                                  get_profit_analysis_data)
+    return render_template('reports/profit_analysis.html', analysis_data=analysis_data)
+
+def get_profit_analysis_data():
+    """Totals, breakdown, top performers and monthly trends for the profit analysis page"""
+    summary, breakdown = get_profit_summary()
+
+    return {
+        'total_items': summary['count'],
+        'total_revenue': summary['revenue'],
+        'total_investment': summary['investment'],
+        'total_net_profit': summary['profit'],
+        'avg_roi': summary['roi_total'] / summary['roi_count'] if summary['roi_count'] else 0,
+        'top_performers': get_top_performers(),
+        'category_breakdown': {
+            title: {'count': row['count'], 'revenue': row['revenue'], 'profit': row['profit']}
+            for title, row in breakdown.items()
+        },
         'monthly_trends': get_monthly_profit_trends()
     }
-    
-    # Calculate average ROI
-    roi_values = [item.roi_percentage for item in sold_items if item.roi_percentage]
-    if roi_values:
-        analysis_data['avg_roi'] = sum(roi_values) / len(roi_values)
-    
-    # Get top performing items (convert to serializable format)
-    top_items = sorted(sold_items, key=lambda x: x.net_profit or 0, reverse=True)[:10]
-    analysis_data['top_performers'] = [
-        {
-            'id': item.id,
-            'title': item.title,
-            'sale_price': float(item.sale_price) if item.sale_price else 0,
-            'purchase_price': float(item.purchase_price) if item.purchase_price else 0,
-            'net_profit': item.net_profit or 0,
-            'roi_percentage': item.roi_percentage or 0,
-            'auction_title': item.auction.title if item.auction else 'Unknown'
-        }
-        for item in top_items
-    ]
-    
-    # Category breakdown by auction
-    for item in sold_items:
-        auction_title = item.auction.title if item.auction else 'Unknown'
-        if auction_title not in analysis_data['category_breakdown']:
-            analysis_data['category_breakdown'][auction_title] = {
-                'count': 0,
-                'revenue': 0,
-                'profit': 0
-            }
-        
-        analysis_data['category_breakdown'][auction_title]['count'] += 1
-        if item.sale_price:
-            analysis_data['category_breakdown'][auction_title]['revenue'] += float(item.sale_price)
-        if item.net_profit:
-            analysis_data['category_breakdown'][auction_title]['profit'] += item.net_profit
-    
-    return render_template('reports/profit_analysis.html', analysis_data=analysis_data)
 
 @reports_bp.route('/partner-report')
 @require_login
 def partner_report():
     """Partner earnings report"""
+    partner_data = cached_report('partner_report', None, get_partner_report_data)
+    return render_template('reports/partner_report.html', partner_data=partner_data)
+
+def get_partner_report_data():
+    """Per-partner totals and recent sales as plain data, so they can be cached"""
     partners = Partner.query.all()
-    partner_data = []
+    partner_stats = get_partner_stats()
+    recent_sales = get_recent_partner_sales()
     
-    for partner in partners:
-        data = {
-            'partner': partner,
-            'total_items': len(partner.item_partnerships),
-            'sold_items': 0,
-            'total_earnings': 0,
-            'pending_earnings': 0,
-            'recent_sales': []
-        }
-        
-        for partnership in partner.item_partnerships:
-            if partnership.item.status == ItemStatus.SOLD:
-                data['sold_items'] += 1
-                earnings = partnership.calculate_partner_share()
-                if earnings:
-                    data['total_earnings'] += earnings
-                    
-                # Add to recent sales
-                if len(data['recent_sales']) < 5:
-                    data['recent_sales'].append({
-                        'item': partnership.item,
-                        'share': earnings,
-                        'percentage': partnership.pct_share
-                    })
-            elif partnership.item.status in [ItemStatus.WON, ItemStatus.LISTED]:
-                # Estimate pending earnings
-                if partnership.item.target_resale_price and partnership.item.purchase_price:
-                    estimated_net = float(partnership.item.target_resale_price) - float(partnership.item.purchase_price)
-                    estimated_net -= float(partnership.item.refurb_cost or 0)
-                    estimated_net -= estimated_net * 0.15  # Estimate fees
-                    if estimated_net > 0:
-                        data['pending_earnings'] += (float(partnership.pct_share) / 100) * estimated_net
-        
-        # Sort recent sales by date
-        data['recent_sales'].sort(key=lambda x: x['item'].sale_date or datetime.min.date(), reverse=True)
-        partner_data.append(data)
+    partner_data = [{
+        'partner': {'id': partner.id, 'name': partner.name, 'email': partner.email},
+        **partner_stats[partner.id],
+        'recent_sales': recent_sales.get(partner.id, [])
+    } for partner in partners]
     
     # Sort by total earnings
     partner_data.sort(key=lambda x: x['total_earnings'], reverse=True)
     
-    return render_template('reports/partner_report.html', partner_data=partner_data)
+    return partner_data
 
 @reports_bp.route('/export/cashflow')
 @require_login
@@ -160,46 +141,28 @@ def export_cashflow():
         flash('Invalid date format.', 'danger')
         return redirect(url_for('reports.cashflow'))
     
-    # Generate CSV
-    csv_data = generate_cashflow_csv(start_date, end_date)
-    
-    if not csv_data:
-        flash('No data available for the selected date range.', 'warning')
-        return redirect(url_for('reports.cashflow'))
-    
-    # Return CSV file
-    output = io.BytesIO()
-    output.write(csv_data.encode('utf-8'))
-    output.seek(0)
-    
-    return send_file(
-        output,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'cashflow_report_{start_date_str}_{end_date_str}.csv'
-    )
+    return csv_response(f'cashflow_report_{start_date_str}_{end_date_str}.csv',
+                        CASHFLOW_CSV_HEADER, iter_cashflow_rows(start_date, end_date))
 
 @reports_bp.route('/export/profit-analysis')
 @require_login
 def export_profit_analysis():
     """Export profit analysis as CSV"""
-    sold_items = Item.query.filter_by(status=ItemStatus.SOLD).all()
-    
-    # Generate CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow([
-        'Sale Date', 'Auction', 'Lot Number', 'Item Title',
-        'Purchase Price', 'Refurb Cost', 'Sale Price',
-        'Sale Fees', 'Shipping Cost', 'Gross Profit',
-        'Net Profit', 'ROI %', 'List Channel'
-    ])
-    
-    # Data
+    return csv_response(f'profit_analysis_{datetime.now().strftime("%Y%m%d")}.csv',
+                        PROFIT_ANALYSIS_CSV_HEADER, iter_profit_analysis_rows())
+
+PROFIT_ANALYSIS_CSV_HEADER = [
+    'Sale Date', 'Auction', 'Lot Number', 'Item Title',
+    'Purchase Price', 'Refurb Cost', 'Sale Price',
+    'Sale Fees', 'Shipping Cost', 'Gross Profit',
+    'Net Profit', 'ROI %', 'List Channel'
+]
+
+def iter_profit_analysis_rows():
+    """Profit analysis CSV rows for every sold item, streamed from the database"""
+    sold_items = stream_query(Item.query.options(*item_list_options()).filter_by(status=ItemStatus.SOLD))
     for item in sold_items:
-        writer.writerow([
+        yield [
             item.sale_date.strftime('%Y-%m-%d') if item.sale_date else '',
             item.auction.title if item.auction else '',
             item.lot_number or '',
@@ -213,22 +176,164 @@ def export_profit_analysis():
             f'${item.net_profit:.2f}' if item.net_profit else '',
             f'{item.roi_percentage:.1f}%' if item.roi_percentage else '',
             item.list_channel or ''
-        ])
-    
-    output.seek(0)
+        ]
+
+@reports_bp.route('/export/data/<dataset>.<fmt>')
+@require_login
+def export_data(dataset, fmt):
+    """Typed export of items, expenses, piece sales or partner shares for analysis tools"""
+    if dataset not in DATASETS or fmt not in FORMATS:
+        abort(404)
     
-    # Return CSV file
-    csv_bytes = io.BytesIO()
-    csv_bytes.write(output.getvalue().encode('utf-8'))
-    csv_bytes.seek(0)
+    try:
+        check_format_available(fmt)
+    except ExportUnavailable as e:
+        flash(str(e), 'warning')
+        return redirect(url_for('reports.index'))
     
-    return send_file(
-        csv_bytes,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'profit_analysis_{datetime.now().strftime("%Y%m%d")}.csv'
+    extension, mimetype, _ = FORMATS[fmt]
+    return Response(
+        stream_with_context(iter_columnar_export(dataset, fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{dataset}_{datetime.now().strftime("%Y%m%d")}.{extension}"'}
     )
 
+def _job_dates(params):
+    return (datetime.strptime(params['start_date'], '%Y-%m-%d'),
+            datetime.strptime(params['end_date'], '%Y-%m-%d'))
+
+def _build_cashflow_job(params, result_file):
+    start_date, end_date = _job_dates(params)
+    data = get_cashflow_data(start_date, end_date)
+    result_file.write(json.dumps(data, default=date.isoformat).encode('utf-8'))
+
+def _load_cashflow_job(path):
+    """Cash flow data written by _build_cashflow_job, with transaction dates restored"""
+    with open(path, 'rb') as f:
+        data = json.load(f)
+    for transaction in data['transactions']:
+        transaction['date'] = date.fromisoformat(transaction['date'])
+    return data
+
+def _build_cashflow_csv_job(params, result_file):
+    start_date, end_date = _job_dates(params)
+    write_csv(result_file, CASHFLOW_CSV_HEADER, iter_cashflow_rows(start_date, end_date))
+
+def _build_profit_analysis_csv_job(params, result_file):
+    write_csv(result_file, PROFIT_ANALYSIS_CSV_HEADER, iter_profit_analysis_rows())
+
+def _build_partner_statements_job(params, result_file):
+    start_date, end_date = _job_dates(params)
+    statements = collect_partner_statements(start_date.date(), end_date.date())
+    write_statement_zip(render_partner_statements(statements), result_file)
+
+def _build_partner_statement_emails_job(params, result_file):
+    start_date, end_date = _job_dates(params)
+    statements = collect_partner_statements(start_date.date(), end_date.date())
+    result = email_partner_statements(render_partner_statements(statements))
+    
+    outcome = {'success': not result['failed'], **result}
+    if result['failed']:
+        outcome['error'] = f"Failed to send to {', '.join(result['failed'])}"
+    else:
+        outcome['message'] = f"Statements sent to {len(result['sent'])} partners"
+        if result['skipped']:
+            outcome['message'] += f"; no email address for {', '.join(result['skipped'])}"
+    result_file.write(json.dumps(outcome).encode('utf-8'))
+
+register_job_kind('cashflow', _build_cashflow_job,
+                  lambda params: f"cashflow_{params['start_date']}_{params['end_date']}.json",
+                  'application/json', view='reports.cashflow')
+register_job_kind('cashflow_csv', _build_cashflow_csv_job,
+                  lambda params: f"cashflow_report_{params['start_date']}_{params['end_date']}.csv",
+                  'text/csv')
+register_job_kind('profit_analysis_csv', _build_profit_analysis_csv_job,
+                  lambda params: f'profit_analysis_{datetime.now().strftime("%Y%m%d")}.csv',
+                  'text/csv')
+register_job_kind('partner_statements', _build_partner_statements_job,
+                  lambda params: f"partner_statements_{params['start_date']}_{params['end_date']}.zip",
+                  'application/zip')
+register_job_kind('partner_statement_emails', _build_partner_statement_emails_job,
+                  lambda params: f"partner_statement_emails_{params['start_date']}_{params['end_date']}.json",
+                  'application/json')
+
+# What each job produces, for the status partial
+JOB_LABELS = {
+    'cashflow': 'Cash flow report',
+    'cashflow_csv': 'Cash flow CSV',
+    'profit_analysis_csv': 'Profit analysis CSV',
+    'partner_statements': 'Partner statements',
+    'partner_statement_emails': 'Partner statement emails',
+    'inventory_import': 'Inventory import',
+}
+
+# Kinds that take a date range
+DATED_JOB_KINDS = ('cashflow', 'cashflow_csv', 'partner_statements')
+
+# Kinds the generic submit route may start; others are started by their own pages
+SUBMITTABLE_JOB_KINDS = DATED_JOB_KINDS + ('profit_analysis_csv',)
+
+def _job_response(job, status_code=200):
+    """Status partial for htmx polling, JSON for everything else"""
+    if request.headers.get('HX-Request'):
+        kind = JOB_KINDS.get(job.kind)
+        return render_template('reports/_job_status.html', job=job, label=JOB_LABELS.get(job.kind, job.kind),
+                               pending=job.status in PENDING_STATUSES, viewable=bool(kind and kind.view)), status_code
+    data = job_status(job)
+    data['status_url'] = url_for('reports.job_status_view', job_id=job.id)
+    if job_result_path(job):
+        data['download_url'] = url_for('reports.job_download', job_id=job.id)
+    return jsonify(data), status_code
+
+@reports_bp.route('/jobs/<kind>', methods=['POST'])
+@require_login
+def submit_report_job(kind):
+    """Start a report or export in the background; responds with the job id straight away"""
+    if kind not in JOB_KINDS or kind not in SUBMITTABLE_JOB_KINDS:
+        abort(404)
+    
+    params = {}
+    if kind in DATED_JOB_KINDS:
+        start_date_str = request.values.get('start_date') or (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        end_date_str = request.values.get('end_date') or datetime.now().strftime('%Y-%m-%d')
+        try:
+            datetime.strptime(start_date_str, '%Y-%m-%d')
+            datetime.strptime(end_date_str, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD.'}), 400
+        params = {'start_date': start_date_str, 'end_date': end_date_str}
+    
+    job = submit_job(kind, params, current_user.id)
+    return _job_response(job, 202)
+
+@reports_bp.route('/jobs/<job_id>')
+@require_login
+def job_status_view(job_id):
+    """Poll a background job"""
+    job = get_job(job_id, current_user.id)
+    if job is None:
+        abort(404)
+    return _job_response(job)
+
+@reports_bp.route('/jobs/<job_id>/download')
+@require_login
+def job_download(job_id):
+    """Download (or, for kinds shown as a page, view) a finished job's result"""
+    job = get_job(job_id, current_user.id)
+    if job is None or job.kind not in JOB_KINDS:
+        abort(404)
+    
+    path = job_result_path(job)
+    if path is None:
+        abort(404)
+    
+    kind = JOB_KINDS[job.kind]
+    if kind.view:
+        return redirect(url_for(kind.view, job=job.id))
+    
+    return send_file(path, mimetype=kind.mimetype, as_attachment=True,
+                     download_name=kind.filename(job_params(job)))
+
 @reports_bp.route('/send-weekly-report', methods=['POST'])
 @require_login
 def send_weekly_report():
@@ -258,132 +363,139 @@ def send_weekly_report():
             'error': str(e)
         })
 
+@reports_bp.route('/send-partner-report', methods=['POST'])
+@require_login
+def send_partner_report():
+    """Statements for every partner for a period, as one zip download or an email to each partner"""
+    today = datetime.now().date()
+    try:
+        start_date = datetime.strptime(request.form['start_date'], '%Y-%m-%d').date() if request.form.get('start_date') else today.replace(day=1)
+        end_date = datetime.strptime(request.form['end_date'], '%Y-%m-%d').date() if request.form.get('end_date') else today
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid date format. Use YYYY-MM-DD.'}), 400
+    
+    delivery = request.form.get('delivery', 'email')
+    if delivery not in ('email', 'zip'):
+        return jsonify({'success': False, 'error': f'Unknown delivery "{delivery}"'}), 400
+    
+    # Rendering (a process pool) and sending run in a report job; the caller polls it
+    params = {'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()}
+    if delivery == 'zip':
+        job = submit_job('partner_statements', params, current_user.id)
+    else:
+        # Every request sends, rather than reusing an earlier send's outcome
+        job = submit_job('partner_statement_emails', {**params, 'requested_at': datetime.now().isoformat()},
+                         current_user.id)
+    return _job_response(job, 202)
+
 def get_cashflow_data(start_date, end_date):
-    """Get cash flow data for the specified date range"""
-    # Get all items updated in the date range
-    items = Item.query.filter(
-        Item.updated_at >= start_date,
-        Item.updated_at <= end_date
-    ).all()
-    
-    transactions = []
-    total_income = 0
-    total_expenses = 0
-    
-    for item in items:
-        auction_title = item.auction.title if item.auction else 'N/A'
-        
-        # Purchase transactions
-        if item.purchase_price:
-            transactions.append({
-                'date': item.updated_at.date() if item.updated_at else start_date.date(),
-                'type': 'Expense',
-                'category': 'Purchase',
-                'item': item.title,
-                'amount': -float(item.purchase_price),
-                'auction': auction_title,
-                'description': f'Lot #{item.lot_number}' if item.lot_number else ''
-            })
-            total_expenses += float(item.purchase_price)
-        
-        # Refurbishment costs
-        if item.refurb_cost and float(item.refurb_cost) > 0:
-            transactions.append({
-                'date': item.updated_at.date() if item.updated_at else start_date.date(),
-                'type': 'Expense',
-                'category': 'Refurbishment',
-                'item': item.title,
-                'amount': -float(item.refurb_cost),
-                'auction': auction_title,
-                'description': 'Repair/restoration costs'
-            })
-            total_expenses += float(item.refurb_cost)
-        
-        # Sales income
-        if item.sale_price and item.status == ItemStatus.SOLD:
-            transactions.append({
-                'date': item.sale_date if item.sale_date else item.updated_at.date(),
-                'type': 'Income',
-                'category': 'Sale',
-                'item': item.title,
-                'amount': float(item.sale_price),
-                'auction': auction_title,
-                'description': f'Sold on {item.list_channel}' if item.list_channel else 'Sale'
-            })
-            total_income += float(item.sale_price)
-            
-            # Sale fees
-            if item.sale_fees and float(item.sale_fees) > 0:
-                transactions.append({
-                    'date': item.sale_date if item.sale_date else item.updated_at.date(),
-                    'type': 'Expense',
-                    'category': 'Fees',
-                    'item': item.title,
-                    'amount': -float(item.sale_fees),
-                    'auction': auction_title,
-                    'description': 'Marketplace fees'
-                })
-                total_expenses += float(item.sale_fees)
-            
-            # Shipping costs
-            if item.shipping_cost and float(item.shipping_cost) > 0:
-                transactions.append({
-                    'date': item.sale_date if item.sale_date else item.updated_at.date(),
-                    'type': 'Expense',
-                    'category': 'Shipping',
-                    'item': item.title,
-                    'amount': -float(item.shipping_cost),
-                    'auction': auction_title,
-                    'description': 'Shipping costs'
-                })
-                total_expenses += float(item.shipping_cost)
-    
-    # Sort transactions by date
-    transactions.sort(key=lambda x: x['date'], reverse=True)
+    """Get cash flow data for the specified date range from the cash event ledger"""
+    transactions = list(iter_cash_events(start_date, end_date))
+    totals = cashflow_totals(start_date, end_date)
     
     return {
         'transactions': transactions,
-        'total_income': total_income,
-        'total_expenses': total_expenses,
-        'net_cashflow': total_income - total_expenses,
+        'total_income': totals['total_income'],
+        'total_expenses': totals['total_expenses'],
+        'net_cashflow': totals['net_cashflow'],
         'summary': {
-            'total_transactions': len(transactions),
-            'income_transactions': len([t for t in transactions if t['type'] == 'Income']),
-            'expense_transactions': len([t for t in transactions if t['type'] == 'Expense'])
+            'total_transactions': totals['total_transactions'],
+            'income_transactions': totals['income_transactions'],
+            'expense_transactions': totals['expense_transactions']
         }
     }
 
-def get_monthly_profit_trends():
-    """Get monthly profit trends for the last 12 months"""
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=365)
-    
-    # Get sold items in the last 12 months
-    sold_items = Item.query.filter(
-        Item.status == ItemStatus.SOLD,
-        Item.sale_date >= start_date.date(),
-        Item.sale_date <= end_date.date()
+PROFIT_SUMMARY_FIELDS = ('count', 'revenue', 'investment', 'profit', 'roi_total', 'roi_count')
+
+
+def get_profit_summary():
+    """
+    Sold item totals overall and per auction from one GROUP BY over the cached profit columns
+
+    On PostgreSQL the grand total comes from the same statement via ROLLUP;
+    elsewhere it is summed from the per-auction rows. Either way the cost
+    depends on the number of auctions, not the number of sold items.
+
+    Returns:
+        (totals, {auction title: totals}) where totals has count, revenue,
+        investment, profit, roi_total and roi_count (for averaging ROI)
+    """
+    has_roi = db.and_(Item.roi_cached.isnot(None), Item.roi_cached != 0)
+    columns = [
+        db.func.count(Item.id),
+        db.func.coalesce(db.func.sum(Item.sale_price), 0),
+        db.func.coalesce(db.func.sum(
+            db.case((Item.purchase_price.isnot(None),
+                     Item.purchase_price + db.func.coalesce(Item.refurb_cost, 0)), else_=0)), 0),
+        db.func.coalesce(db.func.sum(Item.net_profit_cached), 0),
+        db.func.coalesce(db.func.sum(db.case((has_roi, Item.roi_cached), else_=0)), 0),
+        db.func.count(db.case((has_roi, 1))),
+    ]
+
+    use_rollup = db.engine.dialect.name == 'postgresql'
+    group_by = db.func.rollup(Auction.title) if use_rollup else Auction.title
+    rows = db.session.execute(
+        db.select(Auction.title, *columns)
+        .join(Auction, Item.auction_id == Auction.id)
+        .where(Item.status == ItemStatus.SOLD)
+        .group_by(group_by)
+        .order_by(Auction.title)
     ).all()
-    
-    monthly_data = {}
-    
-    for item in sold_items:
-        if not item.sale_date:
+
+    totals = dict.fromkeys(PROFIT_SUMMARY_FIELDS, 0)
+    breakdown = {}
+    for title, *values in rows:
+        row = {field: (float(value) if field not in ('count', 'roi_count') else value)
+               for field, value in zip(PROFIT_SUMMARY_FIELDS, values)}
+        # Auction titles are NOT NULL, so a NULL title is the ROLLUP grand total row
+        if title is None:
+            totals = row
             continue
-            
-        month_key = item.sale_date.strftime('%Y-%m')
-        
-        if month_key not in monthly_data:
-            monthly_data[month_key] = {
-                'month': item.sale_date.strftime('%B %Y'),
-                'revenue': 0,
-                'profit': 0,
-                'items': 0
-            }
-        
-        monthly_data[month_key]['revenue'] += float(item.sale_price or 0)
-        monthly_data[month_key]['profit'] += item.net_profit or 0
-        monthly_data[month_key]['items'] += 1
-    
-    # Sort by month and return as list
-    return [monthly_data[key] for key in sorted(monthly_data.keys())]
+        breakdown[title] = row
+        if not use_rollup:
+            for field in PROFIT_SUMMARY_FIELDS:
+                totals[field] += row[field]
+
+    return totals, breakdown
+
+
+def get_top_performers(limit=10):
+    """The most profitable sold items, ranked and limited in the database"""
+    rows = db.session.execute(
+        db.select(Item.id, Item.title, Item.sale_price, Item.purchase_price,
+                  Item.net_profit_cached, Item.roi_cached, Auction.title.label('auction_title'))
+        .outerjoin(Auction, Item.auction_id == Auction.id)
+        .where(Item.status == ItemStatus.SOLD)
+        .order_by(db.func.coalesce(Item.net_profit_cached, 0).desc(), Item.id)
+        .limit(limit)
+    ).all()
+    return [
+        {
+            'id': row.id,
+            'title': row.title,
+            'sale_price': float(row.sale_price) if row.sale_price else 0,
+            'purchase_price': float(row.purchase_price) if row.purchase_price else 0,
+            'net_profit': float(row.net_profit_cached or 0),
+            'roi_percentage': float(row.roi_cached or 0),
+            'auction_title': row.auction_title or 'Unknown'
+        }
+        for row in rows
+    ]
+
+def get_monthly_profit_trends():
+    """Get monthly profit trends for the last 12 months from the precomputed rollups"""
+    first_month = month_start(datetime.now().date())
+    for _ in range(11):
+        first_month = month_start(first_month - timedelta(days=1))
+
+    rollups = MonthlyRollup.query.filter(
+        MonthlyRollup.month >= first_month,
+        MonthlyRollup.items_sold > 0
+    ).order_by(MonthlyRollup.month).all()
+
+    return [{
+        'month': rollup.month.strftime('%B %Y'),
+        'revenue': float(rollup.revenue),
+        'profit': float(rollup.net_profit),
+        'items': rollup.items_sold
+    } for rollup in rollups]
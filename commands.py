@@ -0,0 +1,127 @@
+"""
+Flask CLI maintenance commands
+
+Run with e.g. `flask --app main recompute-profits`.
+"""
+import click
+from app import app, db
+
+
+@app.cli.command('recompute-profits')
+@click.option('--batch-size', default=1000, show_default=True, help='Items refreshed per transaction')
+def recompute_profits(batch_size):
+    """Rebuild the cached profit columns on every item"""
+    from models import Item, refresh_item_profit_cache
+
+    max_id = db.session.query(db.func.max(Item.id)).scalar() or 0
+    refreshed = 0
+
+    # Walk the primary key in ranges so each transaction stays small
+    for start in range(0, max_id + 1, batch_size):
+        ids = [row[0] for row in db.session.query(Item.id).filter(
+            Item.id >= start, Item.id < start + batch_size)]
+        if not ids:
+            continue
+        refresh_item_profit_cache(db.session, ids)
+        db.session.commit()
+        refreshed += len(ids)
+
+    click.echo(f'Recomputed cached profits for {refreshed} items.')
+
+
+@app.cli.command('backfill-lot-sort-keys')
+@click.option('--batch-size', default=1000, show_default=True, help='Items checked per transaction')
+def backfill_lot_sort_keys(batch_size):
+    """Compute the natural lot sort key for every item"""
+    from models import Item, refresh_lot_sort_keys
+
+    max_id = db.session.query(db.func.max(Item.id)).scalar() or 0
+    changed = 0
+
+    for start in range(0, max_id + 1, batch_size):
+        ids = [row[0] for row in db.session.query(Item.id).filter(
+            Item.id >= start, Item.id < start + batch_size)]
+        if not ids:
+            continue
+        changed += refresh_lot_sort_keys(db.session, ids)
+        db.session.commit()
+
+    click.echo(f'Updated lot sort keys for {changed} items.')
+
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index():
+    """Create the item search index and repopulate it from the item table"""
+    from utils.search import ensure_search_index
+
+    ensure_search_index(rebuild=True)
+    click.echo('Item search index rebuilt.')
+
+
+@app.cli.command('import-inventory')
+@click.argument('csv_file', type=click.File('rb'))
+@click.option('--dry-run', is_flag=True, help='Report changes and errors without saving')
+@click.option('--chunk-size', default=500, show_default=True, help='Rows updated per transaction')
+def import_inventory(csv_file, dry_run, chunk_size):
+    """Update existing items from an inventory CSV"""
+    from utils.csv_import import import_inventory_csv
+
+    def progress(report):
+        click.echo(f'{report.rows_processed} rows processed, {report.updated} updated, '
+                   f'{report.error_count} errors')
+
+    report = import_inventory_csv(csv_file, dry_run=dry_run, chunk_size=chunk_size, progress=progress)
+
+    for error in report.errors:
+        click.echo(f"Line {error['line']} (ID {error['item_id']}): {error['message']}", err=True)
+    if report.error_count > len(report.errors):
+        click.echo(f'... and {report.error_count - len(report.errors)} more errors', err=True)
+    click.echo(f"{'Would update' if dry_run else 'Updated'} {report.updated} items, "
+               f'{report.unchanged} rows unchanged, {report.error_count} errors.')
+
+
+@app.cli.command('rebuild-cash-events')
+def rebuild_cash_events():
+    """Rebuild the cash event ledger from items, expenses and piece sales"""
+    from models import CashEvent, refresh_cash_events
+
+    refresh_cash_events(db.session)
+    db.session.commit()
+    click.echo(f'Rebuilt cash event ledger ({CashEvent.query.count()} events).')
+
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups():
+    """Rebuild the monthly rollups from sold items and itemized expenses"""
+    from models import MonthlyRollup, refresh_monthly_rollups
+
+    refresh_monthly_rollups(db.session)
+    db.session.commit()
+    click.echo(f'Rebuilt monthly rollups ({MonthlyRollup.query.count()} months).')
+
+
+@app.cli.command('rebuild-partner-ledger')
+def rebuild_partner_ledger_command():
+    """Repost partner share accruals from sold items, keeping recorded payouts"""
+    from models import PartnerLedgerEntry, rebuild_partner_ledger
+
+    rebuild_partner_ledger(db.session)
+    db.session.commit()
+    click.echo(f'Rebuilt partner ledger ({PartnerLedgerEntry.query.count()} entries).')
+
+
+@app.cli.command('run-report-jobs')
+@click.option('--once', is_flag=True, help='Exit after the queue is empty instead of polling')
+@click.option('--interval', default=5, show_default=True, help='Seconds between polls')
+def run_report_jobs(once, interval):
+    """Run queued background report jobs (for REPORT_JOB_EXECUTOR=external)"""
+    import time
+    from utils.report_jobs import run_pending_jobs
+
+    while True:
+        ran = run_pending_jobs()
+        if ran:
+            click.echo(f'Ran {ran} report jobs.')
+        if once:
+            break
+        time.sleep(interval)
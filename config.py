@@ -27,6 +27,9 @@ class Config:
             "sslmode": "require"
         }
     }
+    if SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        # Local development and tests - the psycopg2 connect args don't apply
+        SQLALCHEMY_ENGINE_OPTIONS = {}
     
     # eBay API Configuration
     EBAY_APP_ID = os.environ.get('EBAY_APP_ID', 'default_app_id')
@@ -39,6 +42,22 @@ class Config:
     SMTP_USERNAME = os.environ.get('SMTP_USERNAME', 'default_username')
     SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', 'default_password')
     
+    # Report cache: memory (per process), filesystem (per host) or redis (shared)
+    REPORT_CACHE_BACKEND = os.environ.get('REPORT_CACHE_BACKEND', 'memory')
+    REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR')
+    REPORT_CACHE_URL = os.environ.get('REPORT_CACHE_URL', 'redis://localhost:6379/0')
+    REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    REPORT_CACHE_TTL = int(os.environ.get('REPORT_CACHE_TTL', str(24 * 60 * 60)))
+    
+    # Background report jobs: thread (in the web process), external (`flask run-report-jobs`) or inline
+    REPORT_JOB_EXECUTOR = os.environ.get('REPORT_JOB_EXECUTOR', 'thread')
+    REPORT_JOB_THREADS = int(os.environ.get('REPORT_JOB_THREADS', '2'))
+    REPORT_JOB_DIR = os.environ.get('REPORT_JOB_DIR')
+    REPORT_JOB_RETENTION_HOURS = int(os.environ.get('REPORT_JOB_RETENTION_HOURS', '24'))
+    
+    # Worker processes for batch partner statements (0 = one per CPU)
+    PARTNER_STATEMENT_WORKERS = int(os.environ.get('PARTNER_STATEMENT_WORKERS', '0'))
+    
     # File Upload Configuration
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
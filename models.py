@@ -1,8 +1,13 @@
-from datetime import datetime
+import re
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
 from enum import Enum
+from itertools import chain
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, event, inspect
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import joinedload, selectinload
 from app import db
 
 class ItemStatus(Enum):
@@ -44,10 +49,42 @@ class Partner(db.Model):
     
     item_partnerships = db.relationship('ItemPartner', backref='partner', lazy=True)
 
+_LOT_NUMBER_PATTERN = re.compile(r'(\D*?)(\d+)(.*)')
+
+
+def natural_lot_key(lot_number):
+    """
+    Sort key that orders lot numbers naturally: "LOT-2" before "LOT-10", "12" before "12A"
+
+    The first run of digits is zero-padded to a fixed width, with the letters
+    before it (punctuation dropped) and whatever follows kept around it.
+    Lot numbers without digits sort by their text.
+    """
+    if lot_number is None or not lot_number.strip():
+        return None
+    lot = lot_number.strip().upper()
+    match = _LOT_NUMBER_PATTERN.fullmatch(lot)
+    if match is None:
+        return lot[:80]
+    prefix, number, suffix = match.groups()
+    prefix = re.sub(r'[^A-Z]', '', prefix)
+    return f'{prefix}{int(number):012d}{suffix.strip()}'[:80]
+
+
 class Item(db.Model):
+    __table_args__ = (
+        # Supports keyset pagination of the items list
+        db.Index('idx_item_updated_at_id', 'updated_at', 'id'),
+        # Auction lot lists in natural lot order
+        db.Index('idx_item_auction_lot_sort', 'auction_id', 'lot_sort_key', 'id'),
+        # Month range scans when refreshing monthly_rollup
+        db.Index('idx_item_status_sale_date', 'status', 'sale_date'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
-    auction_id = db.Column(db.Integer, db.ForeignKey('auction.id'), nullable=False)
+    auction_id = db.Column(db.Integer, db.ForeignKey('auction.id', ondelete='CASCADE'), nullable=False)
     lot_number = db.Column(db.String(50))
+    lot_sort_key = db.Column(db.String(80))  # natural_lot_key(lot_number), kept current on write
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     planned_max_bid = db.Column(db.Numeric(10, 2))
@@ -69,19 +106,37 @@ class Item(db.Model):
     
     ebay_suggested_price = db.Column(db.Numeric(10, 2))
     ebay_price_updated = db.Column(db.DateTime)
+    
+    # Denormalized profit figures, kept current by refresh_item_profit_cache()
+    total_expenses_cached = db.Column(db.Numeric(10, 2), default=0)
+    pieces_sold_cached = db.Column(db.Integer, default=0)
+    piece_revenue_cached = db.Column(db.Numeric(10, 2), default=0)
+    net_profit_cached = db.Column(db.Numeric(10, 2))
+    roi_cached = db.Column(db.Numeric(10, 2))
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     partners = db.relationship('ItemPartner', backref='item', lazy=True, cascade='all, delete-orphan')
     
-    @property
+    @hybrid_property
     def total_expenses(self):
         """Calculate total itemized expenses"""
         if not self.expenses:
             return 0.0
         return float(sum(expense.amount for expense in self.expenses))
     
-    @property
+    @total_expenses.expression
+    def total_expenses(cls):
+        return db.func.coalesce(
+            db.select(db.func.sum(ItemExpense.amount))
+            .where(ItemExpense.item_id == cls.id)
+            .correlate_except(ItemExpense)
+            .scalar_subquery(),
+            0
+        )
+    
+    @hybrid_property
     def cost_per_piece(self):
         """Calculate cost per piece for multiple pieces items"""
         if not self.multiple_pieces or not self.pieces_total or self.pieces_total == 0:
@@ -89,21 +144,46 @@ class Item(db.Model):
         total_cost = float(self.purchase_price or 0) + float(self.refurb_cost or 0) + self.total_expenses
         return total_cost / self.pieces_total
     
-    @property
+    @cost_per_piece.expression
+    def cost_per_piece(cls):
+        total_cost = db.func.coalesce(cls.purchase_price, 0) + db.func.coalesce(cls.refurb_cost, 0) + cls.total_expenses
+        return db.case(
+            (db.and_(cls.multiple_pieces.is_(True), cls.pieces_total > 0),
+             total_cost / db.cast(cls.pieces_total, db.Float)),
+            else_=None
+        )
+    
+    @hybrid_property
     def pieces_sold(self):
         """Calculate number of pieces sold"""
         if not self.multiple_pieces:
             return None
         return sum(sale.pieces_sold for sale in self.piece_sales)
     
-    @property
+    @pieces_sold.expression
+    def pieces_sold(cls):
+        sold = (db.select(db.func.sum(ItemSale.pieces_sold))
+                .where(ItemSale.item_id == cls.id)
+                .correlate_except(ItemSale)
+                .scalar_subquery())
+        return db.case((cls.multiple_pieces.is_(True), db.func.coalesce(sold, 0)), else_=None)
+    
+    @hybrid_property
     def total_piece_sales_revenue(self):
         """Calculate total revenue from piece sales"""
         if not self.multiple_pieces:
             return 0.0
         return float(sum(sale.total_sale_amount for sale in self.piece_sales))
+    
+    @total_piece_sales_revenue.expression
+    def total_piece_sales_revenue(cls):
+        revenue = (db.select(db.func.sum(ItemSale.total_sale_amount))
+                   .where(ItemSale.item_id == cls.id)
+                   .correlate_except(ItemSale)
+                   .scalar_subquery())
+        return db.case((cls.multiple_pieces.is_(True), db.func.coalesce(revenue, 0)), else_=0)
 
-    @property
+    @hybrid_property
     def gross_profit(self):
         """Calculate gross profit (sale_price - purchase_price - refurb_cost - total_expenses)"""
         if self.multiple_pieces:
@@ -124,7 +204,22 @@ class Item(db.Model):
                 return None
             return float(self.sale_price) - float(self.purchase_price) - float(self.refurb_cost or 0) - self.total_expenses
     
-    @property
+    @gross_profit.expression
+    def gross_profit(cls):
+        # Mirrors the Python branches above; NULL wherever the property returns None
+        return db.case(
+            (cls.multiple_pieces.is_(True),
+             db.case(
+                 (cls.pieces_sold > 0,
+                  cls.total_piece_sales_revenue - cls.pieces_sold * db.func.coalesce(cls.cost_per_piece, 0)),
+                 else_=None
+             )),
+            (db.and_(cls.sale_price != 0, cls.purchase_price != 0),
+             cls.sale_price - cls.purchase_price - db.func.coalesce(cls.refurb_cost, 0) - cls.total_expenses),
+            else_=None
+        )
+    
+    @hybrid_property
     def net_profit(self):
         """Calculate net profit (gross_profit - sale_fees - shipping_cost)"""
         gross = self.gross_profit
@@ -132,7 +227,11 @@ class Item(db.Model):
             return None
         return gross - float(self.sale_fees or 0) - float(self.shipping_cost or 0)
     
-    @property
+    @net_profit.expression
+    def net_profit(cls):
+        return cls.gross_profit - db.func.coalesce(cls.sale_fees, 0) - db.func.coalesce(cls.shipping_cost, 0)
+    
+    @hybrid_property
     def roi_percentage(self):
         """Calculate ROI percentage"""
         if not self.purchase_price or float(self.purchase_price) == 0:
@@ -151,7 +250,20 @@ class Item(db.Model):
         
         return (net / total_investment) * 100 if total_investment > 0 else None
     
-    @property
+    @roi_percentage.expression
+    def roi_percentage(cls):
+        total_investment = db.case(
+            (db.and_(cls.multiple_pieces.is_(True), cls.pieces_sold > 0),
+             cls.pieces_sold * db.func.coalesce(cls.cost_per_piece, 0)),
+            else_=cls.purchase_price + db.func.coalesce(cls.refurb_cost, 0) + cls.total_expenses
+        )
+        return db.case(
+            (db.and_(cls.purchase_price != 0, total_investment > 0),
+             cls.net_profit * 100 / db.cast(total_investment, db.Float)),
+            else_=None
+        )
+    
+    @hybrid_property
     def break_even_price(self):
         """Calculate break-even sale price"""
         if not self.purchase_price:
@@ -164,11 +276,20 @@ class Item(db.Model):
         else:
             # Traditional break-even calculation
             return float(self.purchase_price) + float(self.refurb_cost or 0) + self.total_expenses + float(self.sale_fees or 0) + float(self.shipping_cost or 0)
+    
+    @break_even_price.expression
+    def break_even_price(cls):
+        selling_costs = db.func.coalesce(cls.sale_fees, 0) + db.func.coalesce(cls.shipping_cost, 0)
+        return db.case(
+            (db.or_(cls.purchase_price.is_(None), cls.purchase_price == 0), None),
+            (cls.multiple_pieces.is_(True), db.func.coalesce(cls.cost_per_piece, 0) + selling_costs),
+            else_=cls.purchase_price + db.func.coalesce(cls.refurb_cost, 0) + cls.total_expenses + selling_costs
+        )
 
 class ItemPartner(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
-    partner_id = db.Column(db.Integer, db.ForeignKey('partner.id'), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id', ondelete='CASCADE'), nullable=False)
+    partner_id = db.Column(db.Integer, db.ForeignKey('partner.id', ondelete='CASCADE'), nullable=False)
     pct_share = db.Column(db.Numeric(5, 2), nullable=False)  # Percentage share (0-100)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -181,8 +302,12 @@ class ItemPartner(db.Model):
 
 class ItemExpense(db.Model):
     """Itemized expenses associated with items"""
+    __table_args__ = (
+        db.Index('idx_item_expense_date', 'date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id', ondelete='CASCADE'), nullable=False)
     description = db.Column(db.String(200), nullable=False)
     amount = db.Column(db.Numeric(10, 2), nullable=False)
     date = db.Column(db.Date, nullable=False, default=datetime.utcnow().date)
@@ -199,7 +324,7 @@ class ItemSale(db.Model):
     __tablename__ = 'item_sales'
     
     id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id', ondelete='CASCADE'), nullable=False)
     pieces_sold = db.Column(db.Integer, nullable=False)
     sale_price_per_piece = db.Column(db.Numeric(10, 2), nullable=False)
     total_sale_amount = db.Column(db.Numeric(10, 2), nullable=False)
@@ -214,3 +339,851 @@ class ItemSale(db.Model):
     
     def __repr__(self):
         return f'<ItemSale {self.pieces_sold} pieces @ ${self.sale_price_per_piece}>'
+
+class CashEvent(db.Model):
+    """
+    Ledger of money in and out, one row per purchase, cost, sale or expense
+
+    Derived from items, itemized expenses and piece sales by
+    refresh_cash_events() - never edited directly. Amounts are signed:
+    positive is income, negative is money spent.
+    """
+    __tablename__ = 'cash_event'
+    __table_args__ = (
+        db.Index('idx_cash_event_date_item_kind', 'event_date', 'item_id', 'kind'),
+        # One row per event; refresh_cash_events() upserts on it
+        db.UniqueConstraint('item_id', 'kind', 'source_id', name='uq_cash_event_item_kind_source'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_date = db.Column(db.Date, nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey('item.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # see CASH_EVENT_CATEGORIES
+    source_id = db.Column(db.Integer, nullable=False, default=0)  # item_expense / item_sales row, 0 for item events
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    description = db.Column(db.String(200))
+
+class MonthlyRollup(db.Model):
+    """
+    Per-month sales and expense totals for the trend charts
+
+    One row per calendar month (month is the first of the month) that has a
+    sale or an expense. Maintained by refresh_monthly_rollups() - never
+    edited directly.
+    """
+    __tablename__ = 'monthly_rollup'
+
+    month = db.Column(db.Date, primary_key=True)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    net_profit = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    items_sold = db.Column(db.Integer, nullable=False, default=0)
+    fees = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    expenses = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DataVersion(db.Model):
+    """
+    Counters bumped whenever the data behind a group of derived views changes
+
+    The report cache keys entries by the 'reports' version, so a bump - made in
+    the same transaction as the change - invalidates every cached report in
+    every process at once.
+    """
+    __tablename__ = 'data_version'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class ReportJob(db.Model):
+    """
+    A report or export computed in the background (see utils/report_jobs.py)
+
+    The result is written to file_path. Jobs with the same kind, parameters,
+    data version and user share one result; only that user can see the job.
+    """
+    __tablename__ = 'report_job'
+    __table_args__ = (
+        db.Index('idx_report_job_reuse', 'kind', 'params_key', 'data_version'),
+    )
+
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False)  # normalized JSON
+    params_key = db.Column(db.String(64), nullable=False)
+    data_version = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    user_id = db.Column(db.String)  # who submitted it; None for jobs started from the CLI
+    worker = db.Column(db.String(100))  # host:pid of the web process running it on its thread pool
+    file_path = db.Column(db.String(500))
+    error = db.Column(db.Text)
+    progress = db.Column(db.Integer)  # units done so far, for kinds that report progress
+    progress_total = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+class PartnerLedgerEntry(db.Model):
+    """
+    Append-only record of what each partner has earned and been paid
+
+    Accruals and adjustments are posted by sync_partner_ledger() as item
+    profits change; payouts are recorded by hand. balance is the partner's
+    running balance after the entry in (entry_date, id) order - kept current
+    by post_partner_ledger_entries() when an entry is backdated - so balances
+    and statements are read from idx_partner_ledger_partner_date instead of
+    re-adding the history.
+    item_id deliberately has no foreign key: entries outlive deleted items.
+    """
+    __tablename__ = 'partner_ledger'
+    __table_args__ = (
+        db.Index('idx_partner_ledger_partner_date', 'partner_id', 'entry_date', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    partner_id = db.Column(db.Integer, db.ForeignKey('partner.id', ondelete='CASCADE'), nullable=False)
+    item_id = db.Column(db.Integer, index=True)
+    entry_date = db.Column(db.Date, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # accrual, adjustment or payout
+    amount = db.Column(db.Numeric(10, 2), nullable=False)  # positive is owed to the partner
+    balance = db.Column(db.Numeric(12, 2), nullable=False)
+    description = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Cash event kind -> category shown on reports
+CASH_EVENT_CATEGORIES = {
+    'purchase': 'Purchase',
+    'refurb': 'Refurbishment',
+    'sale': 'Sale',
+    'fees': 'Fees',
+    'shipping': 'Shipping',
+    'expense': 'Expense',
+    'piece_sale': 'Piece Sale',
+}
+
+# Cash event kinds that are money in; everything else is money out
+INCOME_CASH_EVENT_KINDS = ('sale', 'piece_sale')
+
+
+def item_list_options():
+    """
+    Loader options for pages and exports that show profit figures for many items.
+
+    The auction is joined into the main query; expenses, piece sales and partner
+    shares are each fetched with a single SELECT ... IN, so the number of round
+    trips stays fixed no matter how many rows are rendered.
+    """
+    return (
+        joinedload(Item.auction),
+        selectinload(Item.expenses),
+        selectinload(Item.piece_sales),
+        selectinload(Item.partners),
+    )
+
+
+def partnership_list_options():
+    """Loader options for ItemPartner lists that read each item's profit"""
+    return (
+        joinedload(ItemPartner.item).options(*item_list_options()),
+    )
+
+
+def bulk_update_item_status(item_ids, status):
+    """
+    Set the status of many items with one UPDATE
+
+    Returns:
+        Number of items updated
+    """
+    if not item_ids:
+        return 0
+    values = {'status': status}
+    if status == ItemStatus.SOLD:
+        # Same rule as _default_sale_date_before_flush
+        values['sale_date'] = db.func.coalesce(Item.sale_date, date.today())
+    result = db.session.execute(
+        db.update(Item).where(Item.id.in_(item_ids)).values(**values))
+    # Bulk statements skip flush events; selling or unselling moves cash events
+    # and the month totals
+    refresh_cash_events(db.session, item_ids)
+    refresh_monthly_rollups(db.session, item_rollup_months(db.session, item_ids))
+    sync_partner_ledger(db.session, item_ids)
+    mark_data_changed(db.session, REPORT_DATA_VERSION)
+    return result.rowcount
+
+
+def bulk_delete_items(item_ids):
+    """
+    Delete many items with one DELETE
+
+    Partner shares, expenses and piece sales are removed by the database's
+    ON DELETE CASCADE rather than loaded and deleted one by one.
+
+    Returns:
+        Number of items deleted
+    """
+    if not item_ids:
+        return 0
+    # Bulk statements skip flush events, so note the affected months first
+    months = item_rollup_months(db.session, item_ids)
+    result = db.session.execute(
+        db.delete(Item).where(Item.id.in_(item_ids)))
+    refresh_monthly_rollups(db.session, months)
+    sync_partner_ledger(db.session, item_ids)
+    mark_data_changed(db.session, REPORT_DATA_VERSION, EXPENSE_DATA_VERSION)
+    return result.rowcount
+
+
+def bulk_insert_expenses(rows):
+    """
+    Insert many expenses with one multi-row INSERT
+
+    Rows must already be validated; each is a dict of ItemExpense columns.
+
+    Returns:
+        Number of expenses inserted
+    """
+    if not rows:
+        return 0
+    now = datetime.utcnow()
+    db.session.execute(ItemExpense.__table__.insert().values(
+        [{'created_at': now, 'updated_at': now, **row} for row in rows]))
+    # Bulk statements skip flush events; new expenses change profits, cash events,
+    # the month totals and partner shares of every item they were charged to.
+    # Only the new expenses' months and the items' sale months move; the
+    # items' older expense months don't
+    item_ids = sorted({row['item_id'] for row in rows})
+    refresh_item_profit_cache(db.session, item_ids)
+    refresh_cash_events(db.session, item_ids)
+    months = item_sale_months(db.session, item_ids) | {month_start(row['date']) for row in rows}
+    refresh_monthly_rollups(db.session, months)
+    sync_partner_ledger(db.session, item_ids)
+    mark_data_changed(db.session, REPORT_DATA_VERSION, EXPENSE_DATA_VERSION)
+    return len(rows)
+
+
+# Item columns that feed into the cached profit figures
+PROFIT_INPUT_FIELDS = (
+    'purchase_price', 'refurb_cost', 'sale_price', 'sale_fees',
+    'shipping_cost', 'multiple_pieces', 'pieces_total',
+)
+
+
+def refresh_item_profit_cache(connection, item_ids=None):
+    """
+    Recompute the cached profit columns in a single UPDATE
+
+    Uses the hybrid SQL expressions so the cache always agrees with the live
+    properties. updated_at is preserved - a cache refresh is not an edit.
+
+    Args:
+        connection: Connection or Session to execute on
+        item_ids: Items to refresh, or None for every item
+    """
+    stmt = Item.__table__.update().values(
+        total_expenses_cached=Item.total_expenses,
+        pieces_sold_cached=db.func.coalesce(Item.pieces_sold, 0),
+        piece_revenue_cached=Item.total_piece_sales_revenue,
+        net_profit_cached=Item.net_profit,
+        roi_cached=Item.roi_percentage,
+        updated_at=Item.updated_at,
+    )
+    if item_ids is not None:
+        if not item_ids:
+            return
+        stmt = stmt.where(Item.id.in_(list(item_ids)))
+    connection.execute(stmt)
+
+
+def _dirty_item_ids(session, item_fields):
+    """Collect ids of items touched by this flush: edited children, or items with item_fields changed"""
+    item_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (ItemExpense, ItemSale)):
+            history = inspect(obj).attrs.item_id.history
+            item_ids.update(i for i in chain(history.added, history.unchanged, history.deleted) if i)
+        elif isinstance(obj, Item) and obj not in session.deleted:
+            state = inspect(obj)
+            if obj in session.new or any(state.attrs[f].history.has_changes() for f in item_fields):
+                item_ids.add(obj.id)
+    return item_ids
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_profit_cache_after_flush(session, flush_context):
+    item_ids = _dirty_item_ids(session, PROFIT_INPUT_FIELDS)
+    if item_ids:
+        refresh_item_profit_cache(session.connection(), item_ids)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _default_sale_date_before_flush(session, flush_context, instances):
+    # Reports date a sale by sale_date alone; an item marked sold without one
+    # sold today, and keeps that date however often it is edited later
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, Item) and obj.status == ItemStatus.SOLD and obj.sale_date is None:
+            obj.sale_date = date.today()
+
+
+@event.listens_for(db.session, 'before_flush')
+def _set_lot_sort_keys_before_flush(session, flush_context, instances):
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, Item) and (obj in session.new or inspect(obj).attrs.lot_number.history.has_changes()):
+            obj.lot_sort_key = natural_lot_key(obj.lot_number)
+
+
+def refresh_lot_sort_keys(connection, item_ids):
+    """
+    Recompute lot_sort_key for the given items, writing only the ones that differ
+
+    Used by the backfill command; normal writes keep the key current in
+    before_flush. updated_at is left alone since nothing visible changed.
+
+    Returns:
+        Number of items whose key changed
+    """
+    item_ids = list(item_ids)
+    if not item_ids:
+        return 0
+    table = Item.__table__
+    rows = [{'b_id': item_id, 'b_key': natural_lot_key(lot_number)}
+            for item_id, lot_number, current in connection.execute(
+                db.select(table.c.id, table.c.lot_number, table.c.lot_sort_key).where(table.c.id.in_(item_ids)))
+            if natural_lot_key(lot_number) != current]
+    if rows:
+        connection.execute(
+            table.update().where(table.c.id == db.bindparam('b_id'))
+            .values(lot_sort_key=db.bindparam('b_key'), updated_at=table.c.updated_at),
+            rows)
+    return len(rows)
+
+
+# Item columns that feed into cash events
+CASH_EVENT_FIELDS = (
+    'auction_id', 'status', 'lot_number', 'purchase_price', 'refurb_cost', 'sale_price',
+    'sale_date', 'sale_fees', 'shipping_cost', 'list_channel',
+)
+
+
+def upsert(table):
+    """
+    INSERT for this database that supports on_conflict_do_update()
+
+    Derived tables are written with upserts rather than DELETE + INSERT, so
+    two transactions refreshing the same rows wait on each other's row locks
+    instead of one failing on the unique key.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def _cash_event_selects():
+    """
+    (kind, SELECT) per event kind; each SELECT produces event_date, item_id,
+    kind, source_id, amount and description
+    """
+    purchase_date = Auction.date
+    # Sales are dated by sale_date alone - the same rule as the monthly rollups
+    sold = db.and_(Item.status == ItemStatus.SOLD, Item.sale_price.isnot(None), Item.sale_date.isnot(None))
+    no_source = db.literal(0).label('source_id')
+
+    def item_event(kind, event_date, amount, description, condition):
+        return kind, (db.select(event_date, Item.id.label('item_id'), db.literal(kind), no_source, amount, description)
+                      .select_from(Item)
+                      .join(Auction, Item.auction_id == Auction.id)
+                      .where(condition))
+
+    return [
+        item_event('purchase', purchase_date, -Item.purchase_price,
+                   db.case((Item.lot_number.isnot(None), db.literal('Lot #') + Item.lot_number), else_=''),
+                   db.and_(Item.purchase_price.isnot(None), Item.purchase_price != 0)),
+        item_event('refurb', purchase_date, -Item.refurb_cost,
+                   db.literal('Repair/restoration costs'),
+                   Item.refurb_cost > 0),
+        item_event('sale', Item.sale_date, Item.sale_price,
+                   db.case((Item.list_channel.isnot(None), db.literal('Sold on ') + Item.list_channel), else_='Sale'),
+                   sold),
+        item_event('fees', Item.sale_date, -Item.sale_fees,
+                   db.literal('Marketplace fees'),
+                   db.and_(sold, Item.sale_fees > 0)),
+        item_event('shipping', Item.sale_date, -Item.shipping_cost,
+                   db.literal('Shipping costs'),
+                   db.and_(sold, Item.shipping_cost > 0)),
+        ('expense', db.select(ItemExpense.date, ItemExpense.item_id, db.literal('expense'),
+                              ItemExpense.id.label('source_id'), -ItemExpense.amount, ItemExpense.description)
+         .where(db.true())),
+        ('piece_sale', db.select(ItemSale.sale_date, ItemSale.item_id, db.literal('piece_sale'),
+                                 ItemSale.id.label('source_id'), ItemSale.total_sale_amount,
+                                 db.case((ItemSale.sale_channel.isnot(None),
+                                          db.literal('Pieces sold on ') + ItemSale.sale_channel),
+                                         else_='Pieces sold'))
+         .where(db.true())),
+    ]
+
+
+def refresh_cash_events(connection, item_ids=None):
+    """
+    Bring the cash event ledger rows for some items (or all of them) up to date
+
+    Each kind is upserted with INSERT ... SELECT ... ON CONFLICT on
+    (item_id, kind, source_id), then rows the SELECT no longer produces are
+    deleted, so nothing is loaded into Python however many expenses and
+    sales an item has, and concurrent refreshes of one item can't leave
+    duplicate events.
+
+    Args:
+        connection: Connection or Session to execute on
+        item_ids: Items to refresh, or None for every item
+    """
+    if item_ids is not None:
+        item_ids = list(item_ids)
+        if not item_ids:
+            return
+
+    table = CashEvent.__table__
+    columns = ['event_date', 'item_id', 'kind', 'source_id', 'amount', 'description']
+    for kind, select in _cash_event_selects():
+        if item_ids is not None:
+            select = select.where(select.selected_columns.item_id.in_(item_ids))
+
+        insert = upsert(table).from_select(columns, select)
+        connection.execute(insert.on_conflict_do_update(
+            index_elements=['item_id', 'kind', 'source_id'],
+            set_={column: insert.excluded[column] for column in ('event_date', 'amount', 'description')}))
+
+        current = select.subquery()
+        stale = table.delete().where(
+            table.c.kind == kind,
+            ~db.exists().where(current.c.item_id == table.c.item_id,
+                               current.c.source_id == table.c.source_id))
+        if item_ids is not None:
+            stale = stale.where(table.c.item_id.in_(item_ids))
+        connection.execute(stale)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_cash_events_after_flush(session, flush_context):
+    item_ids = _dirty_item_ids(session, CASH_EVENT_FIELDS)
+
+    # Purchases are dated by the auction
+    for obj in session.dirty:
+        if isinstance(obj, Auction) and inspect(obj).attrs.date.history.has_changes():
+            item_ids.update(session.connection().execute(
+                db.select(Item.id).where(Item.auction_id == obj.id)).scalars())
+
+    if item_ids:
+        refresh_cash_events(session.connection(), item_ids)
+
+
+# Item columns that feed into the monthly rollups (net profit reads the profit cache)
+ROLLUP_FIELDS = PROFIT_INPUT_FIELDS + ('status', 'sale_date')
+
+
+def month_start(day):
+    """First day of the month containing day"""
+    return date(day.year, day.month, 1)
+
+
+def _next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def item_sale_months(connection, item_ids):
+    """Months these items were sold in"""
+    item_ids = list(item_ids)
+    if not item_ids:
+        return set()
+    sale_dates = connection.execute(
+        db.select(Item.sale_date).where(Item.id.in_(item_ids), Item.sale_date.isnot(None)).distinct()
+    ).scalars()
+    return {month_start(day) for day in sale_dates}
+
+
+def item_rollup_months(connection, item_ids):
+    """Months whose rollups depend on these items: their sale months and expense months"""
+    item_ids = list(item_ids)
+    if not item_ids:
+        return set()
+    expense_dates = connection.execute(
+        db.select(ItemExpense.date).where(ItemExpense.item_id.in_(item_ids)).distinct()
+    ).scalars()
+    return item_sale_months(connection, item_ids) | {month_start(day) for day in expense_dates}
+
+
+def _all_rollup_months(connection):
+    first_sale, last_sale = connection.execute(
+        db.select(db.func.min(Item.sale_date), db.func.max(Item.sale_date))
+        .where(Item.status == ItemStatus.SOLD)
+    ).one()
+    first_expense, last_expense = connection.execute(
+        db.select(db.func.min(ItemExpense.date), db.func.max(ItemExpense.date))
+    ).one()
+    bounds = [day for day in (first_sale, last_sale, first_expense, last_expense) if day]
+    if not bounds:
+        return []
+
+    months = []
+    month, last = month_start(min(bounds)), month_start(max(bounds))
+    while month <= last:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def refresh_monthly_rollups(connection, months=None):
+    """
+    Recompute the monthly_rollup rows for some months (or all of them)
+
+    Each month is two aggregates over a date range - sold items by sale date
+    (using the cached net profit) and itemized expenses by expense date - so
+    a change only costs a rescan of the months it touches. Months with no
+    activity have no row.
+
+    The month rows are created if missing and locked before anything is
+    read, so concurrent transactions touching the same month take turns:
+    the second one waits, then aggregates data that includes the first
+    one's changes, instead of failing on the primary key or overwriting
+    the totals with figures that miss them.
+
+    Args:
+        connection: Connection or Session to execute on
+        months: Month start dates to refresh, or None to rebuild every month
+    """
+    table = MonthlyRollup.__table__
+    if months is None:
+        months = _all_rollup_months(connection)
+        connection.execute(table.delete().where(table.c.month.notin_(months)))
+    else:
+        months = sorted(set(months))
+    if not months:
+        return
+
+    now = datetime.utcnow()
+    connection.execute(upsert(table).values([{'month': month, 'updated_at': now} for month in months])
+                       .on_conflict_do_nothing(index_elements=['month']))
+    connection.execute(db.select(table.c.month).where(table.c.month.in_(months))
+                       .order_by(table.c.month).with_for_update()).all()
+
+    rows = []
+    empty = []
+    for month in months:
+        next_month = _next_month(month)
+        items_sold, revenue, net_profit, fees = connection.execute(
+            db.select(db.func.count(Item.id),
+                      db.func.coalesce(db.func.sum(Item.sale_price), 0),
+                      db.func.coalesce(db.func.sum(Item.net_profit_cached), 0),
+                      db.func.coalesce(db.func.sum(Item.sale_fees), 0))
+            .where(Item.status == ItemStatus.SOLD,
+                   Item.sale_date >= month, Item.sale_date < next_month)
+        ).one()
+        expenses = connection.execute(
+            db.select(db.func.sum(ItemExpense.amount))
+            .where(ItemExpense.date >= month, ItemExpense.date < next_month)
+        ).scalar()
+
+        if not items_sold and expenses is None:
+            empty.append(month)
+            continue
+        rows.append({'b_month': month, 'b_revenue': revenue, 'b_net_profit': net_profit,
+                     'b_items_sold': items_sold, 'b_fees': fees, 'b_expenses': expenses or 0})
+
+    if rows:
+        connection.execute(
+            table.update().where(table.c.month == db.bindparam('b_month'))
+            .values(revenue=db.bindparam('b_revenue'), net_profit=db.bindparam('b_net_profit'),
+                    items_sold=db.bindparam('b_items_sold'), fees=db.bindparam('b_fees'),
+                    expenses=db.bindparam('b_expenses'), updated_at=now),
+            rows)
+    if empty:
+        connection.execute(table.delete().where(table.c.month.in_(empty)))
+
+
+def _rollup_item_ids(session):
+    """Items in this flush whose rollup months may change, including deleted ones"""
+    item_ids = _dirty_item_ids(session, ROLLUP_FIELDS)
+    item_ids.update(obj.id for obj in session.deleted if isinstance(obj, Item))
+    item_ids.discard(None)
+    return item_ids
+
+
+@event.listens_for(db.session, 'before_flush')
+def _note_rollup_months_before_flush(session, flush_context, instances):
+    # Sale and expense dates as stored before the flush, so months they move out of are refreshed too
+    session.info['rollup_months'] = item_rollup_months(session.connection(), _rollup_item_ids(session))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_monthly_rollups_after_flush(session, flush_context):
+    # Registered after the profit cache listener, so net_profit_cached is already current
+    months = session.info.pop('rollup_months', set())
+    months |= item_rollup_months(session.connection(), _rollup_item_ids(session))
+    if months:
+        refresh_monthly_rollups(session.connection(), months)
+
+
+REPORT_DATA_VERSION = 'reports'
+
+# Tables whose rows feed the cached reports
+REPORT_DATA_TABLES = ('auction', 'partner', 'item', 'item_expense', 'item_sales', 'item_partner')
+
+# Bumped only by expense writes, for data that depends on nothing else (e.g. the category list)
+EXPENSE_DATA_VERSION = 'expenses'
+
+
+def get_data_version(connection, name=REPORT_DATA_VERSION):
+    """Current value of a data version counter (0 if it was never bumped)"""
+    return connection.execute(
+        db.select(DataVersion.version).where(DataVersion.name == name)
+    ).scalar() or 0
+
+
+def bump_data_version(connection, name=REPORT_DATA_VERSION):
+    """
+    Increment a data version counter, creating it on first use
+
+    A single upsert, so two transactions bumping a counter that does not exist
+    yet cannot both try to insert it. Writers normally call mark_data_changed()
+    instead, which bumps once just before the transaction commits.
+    """
+    table = DataVersion.__table__
+    insert = upsert(table).values(name=name, version=1)
+    connection.execute(insert.on_conflict_do_update(
+        index_elements=['name'], set_={'version': table.c.version + 1}))
+
+
+def mark_data_changed(session, *names):
+    """
+    Note that this transaction changed the data behind the given versions
+
+    The counters are bumped once, at commit. Bumping on every flush held the
+    counter row locked from the first write to the commit, which queued every
+    other writing transaction behind it. Flushes mark the session
+    automatically; bulk statements skip flush events, so code issuing them
+    calls this itself.
+    """
+    session.info.setdefault('data_versions', set()).update(names)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_report_data_after_flush(session, flush_context):
+    tables = {obj.__table__.name for obj in chain(session.new, session.dirty, session.deleted)}
+    if tables & set(REPORT_DATA_TABLES):
+        mark_data_changed(session, REPORT_DATA_VERSION)
+    if 'item_expense' in tables:
+        mark_data_changed(session, EXPENSE_DATA_VERSION)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _bump_data_versions_before_commit(session):
+    # Flush first so changes still pending are marked too; the counter rows
+    # are then locked only for the commit itself
+    session.flush()
+    for name in sorted(session.info.pop('data_versions', ())):
+        bump_data_version(session.connection(), name)
+
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _forget_data_changes(session, transaction):
+    # A rolled back transaction changed nothing
+    if transaction.parent is None:
+        session.info.pop('data_versions', None)
+
+
+CENTS = Decimal('0.01')
+
+
+def partner_share_amount(net_profit, pct_share):
+    """A partner's share of an item's net profit, rounded to cents"""
+    return (Decimal(net_profit) * Decimal(pct_share) / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def _latest_ledger_balances(connection, *conditions):
+    """Balance after each partner's last entry, in (entry_date, id) order, among entries matching conditions"""
+    ledger = PartnerLedgerEntry
+    position = db.func.row_number().over(
+        partition_by=ledger.partner_id, order_by=(ledger.entry_date.desc(), ledger.id.desc())).label('position')
+    ranked = db.select(ledger.partner_id, ledger.balance, position).where(*conditions).subquery()
+    return dict(connection.execute(
+        db.select(ranked.c.partner_id, ranked.c.balance).where(ranked.c.position == 1)
+    ).all())
+
+
+def partner_ledger_balances(connection, partner_ids=None):
+    """Running balance after the latest-dated entry of each partner (or, with None, every partner) that has entries"""
+    if partner_ids is None:
+        return _latest_ledger_balances(connection)
+    partner_ids = list(partner_ids)
+    if not partner_ids:
+        return {}
+    return _latest_ledger_balances(connection, PartnerLedgerEntry.partner_id.in_(partner_ids))
+
+
+def post_partner_ledger_entries(connection, entries):
+    """
+    Add ledger entries, keeping every running balance in (entry_date, id) order
+
+    Entries may be dated before ones already posted - a sale recorded late, a
+    backdated payout - so each partner's balances are carried forward again
+    from the earliest new entry. Partner rows are locked first (on databases
+    that support it) so two transactions can't both extend a balance from the
+    same starting point.
+
+    Args:
+        connection: Connection or Session to execute on
+        entries: Dicts with partner_id, item_id, entry_date, kind, amount and
+            description; same-day entries are posted in list order
+    """
+    if not entries:
+        return
+    table = PartnerLedgerEntry.__table__
+    partner_ids = sorted({entry['partner_id'] for entry in entries})
+    connection.execute(db.select(Partner.id).where(Partner.id.in_(partner_ids)).with_for_update()).all()
+
+    since = {}
+    for entry in entries:
+        partner_id = entry['partner_id']
+        since[partner_id] = min(since.get(partner_id, entry['entry_date']), entry['entry_date'])
+    before = db.or_(*(db.and_(table.c.partner_id == partner_id, table.c.entry_date < day)
+                      for partner_id, day in since.items()))
+    after = db.or_(*(db.and_(table.c.partner_id == partner_id, table.c.entry_date >= day)
+                     for partner_id, day in since.items()))
+
+    balances = {partner_id: Decimal(balance)
+                for partner_id, balance in _latest_ledger_balances(connection, before).items()}
+    later = connection.execute(
+        db.select(table.c.id, table.c.partner_id, table.c.entry_date, table.c.amount, table.c.balance)
+        .where(after)
+    ).all()
+
+    # New entries get higher ids, so they follow existing entries of the same day
+    timeline = sorted(
+        [(row.partner_id, row.entry_date, False, row.id, row._mapping) for row in later]
+        + [(entry['partner_id'], entry['entry_date'], True, index, entry) for index, entry in enumerate(entries)],
+        key=lambda step: step[:4])
+
+    rows = []
+    moved = []
+    now = datetime.utcnow()
+    for partner_id, _, is_new, _, entry in timeline:
+        balance = balances.get(partner_id, Decimal('0')) + Decimal(entry['amount'])
+        balances[partner_id] = balance
+        if is_new:
+            rows.append({**entry, 'balance': balance, 'created_at': now})
+        elif balance != entry['balance']:
+            moved.append({'b_id': entry['id'], 'b_balance': balance})
+
+    if moved:
+        connection.execute(
+            table.update().where(table.c.id == db.bindparam('b_id')).values(balance=db.bindparam('b_balance')),
+            moved)
+    connection.execute(table.insert(), rows)
+
+
+def sync_partner_ledger(connection, item_ids):
+    """
+    Post accruals and adjustments so each partner's entries for these items
+    add up to their current share of the item's net profit
+
+    A partner is owed their share once an item is sold, so the accrual is
+    dated by the sale, as rebuild_partner_ledger() dates it. Anything that
+    changes that amount afterwards - a new expense, a price correction, a
+    changed share, the item being unsold, removed from the partner or
+    deleted - is posted as an adjustment for the difference, dated today.
+
+    Args:
+        connection: Connection or Session to execute on
+        item_ids: Items whose profit or partner shares may have changed
+    """
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+
+    ledger = PartnerLedgerEntry
+    targets = {}
+    sale_dates = {}
+    for partner_id, item_id, pct_share, status, net_profit, sale_date in connection.execute(
+            db.select(ItemPartner.partner_id, ItemPartner.item_id, ItemPartner.pct_share,
+                      Item.status, Item.net_profit_cached, Item.sale_date)
+            .join(Item, ItemPartner.item_id == Item.id)
+            .where(ItemPartner.item_id.in_(item_ids))):
+        owed = Decimal('0')
+        if status == ItemStatus.SOLD and net_profit is not None:
+            owed = partner_share_amount(net_profit, pct_share)
+        targets[(partner_id, item_id)] = (owed, pct_share)
+        sale_dates[item_id] = sale_date
+
+    posted = {(partner_id, item_id): Decimal(total) for partner_id, item_id, total in connection.execute(
+        db.select(ledger.partner_id, ledger.item_id, db.func.sum(ledger.amount))
+        .where(ledger.item_id.in_(item_ids), ledger.kind != 'payout')
+        .group_by(ledger.partner_id, ledger.item_id))}
+
+    changed = []
+    for key in sorted(set(targets) | set(posted)):
+        owed, pct_share = targets.get(key, (Decimal('0'), None))
+        difference = owed - posted.get(key, Decimal('0'))
+        if difference:
+            changed.append((key, difference, pct_share))
+    if not changed:
+        return
+
+    titles = dict(connection.execute(
+        db.select(Item.id, Item.title).where(Item.id.in_({item_id for (_, item_id), _, _ in changed}))).all())
+
+    today = date.today()
+    entries = []
+    for (partner_id, item_id), difference, pct_share in changed:
+        title = titles.get(item_id, f'item #{item_id} (deleted)')
+        if (partner_id, item_id) not in posted and difference > 0:
+            kind, description = 'accrual', f'{float(pct_share):g}% share of {title}'
+            entry_date = sale_dates.get(item_id) or today
+        else:
+            kind, description = 'adjustment', f'Adjustment: {title}'
+            entry_date = today
+        entries.append({'partner_id': partner_id, 'item_id': item_id, 'entry_date': entry_date,
+                        'kind': kind, 'amount': difference, 'description': description[:200]})
+    post_partner_ledger_entries(connection, entries)
+
+
+def rebuild_partner_ledger(connection):
+    """
+    Replace all accruals and adjustments with one accrual per sold partnership,
+    dated by the sale, keeping recorded payouts and recomputing every balance
+    """
+    table = PartnerLedgerEntry.__table__
+    payouts = [dict(row._mapping) for row in connection.execute(
+        db.select(table.c.partner_id, table.c.item_id, table.c.entry_date, table.c.kind,
+                  table.c.amount, table.c.description)
+        .where(table.c.kind == 'payout'))]
+    connection.execute(table.delete())
+
+    today = date.today()
+    accruals = []
+    for partner_id, item_id, title, pct_share, net_profit, sale_date in connection.execute(
+            db.select(ItemPartner.partner_id, Item.id, Item.title, ItemPartner.pct_share,
+                      Item.net_profit_cached, Item.sale_date)
+            .join(Item, ItemPartner.item_id == Item.id)
+            .where(Item.status == ItemStatus.SOLD, Item.net_profit_cached.isnot(None))):
+        amount = partner_share_amount(net_profit, pct_share)
+        if amount:
+            accruals.append({'partner_id': partner_id, 'item_id': item_id, 'entry_date': sale_date or today,
+                             'kind': 'accrual', 'amount': amount,
+                             'description': f'{float(pct_share):g}% share of {title}'[:200]})
+
+    # Payouts sort after the same day's accruals
+    entries = sorted(accruals + payouts,
+                     key=lambda e: (e['partner_id'], e['entry_date'], e['kind'] == 'payout', e['item_id'] or 0))
+    post_partner_ledger_entries(connection, entries)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _sync_partner_ledger_after_flush(session, flush_context):
+    # Registered after the profit cache listener, so net_profit_cached is already current
+    item_ids = _rollup_item_ids(session)
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, ItemPartner):
+            history = inspect(obj).attrs.item_id.history
+            item_ids.update(i for i in chain(history.added, history.unchanged, history.deleted) if i)
+    if item_ids:
+        sync_partner_ledger(session.connection(), item_ids)
@@ -55,6 +55,7 @@ window.MitchQuick = {
         this.initializePopovers();
         this.initializeDatePickers();
         this.initializeNumberFormatters();
+        this.initializeItemPickers();
     },
 
     // HTMX event handlers
@@ -359,6 +360,81 @@ window.MitchQuick = {
         });
     },
 
+    // Typeahead item pickers (templates/components/item_picker.html)
+    initializeItemPickers: function() {
+        document.querySelectorAll('[data-item-picker]').forEach(picker => {
+            const input = picker.querySelector('.item-picker-input');
+            const hidden = picker.querySelector('input[type="hidden"]');
+            const results = picker.querySelector('.item-picker-results');
+            const submitOnSelect = picker.hasAttribute('data-submit-on-select');
+            let timer = null;
+            let controller = null;
+
+            const close = () => {
+                results.innerHTML = '';
+                results.classList.add('d-none');
+            };
+
+            const choose = (item) => {
+                hidden.value = item.id;
+                input.value = item.label;
+                input.setCustomValidity('');
+                close();
+                if (submitOnSelect) {
+                    picker.closest('form').submit();
+                }
+            };
+
+            input.addEventListener('input', () => {
+                hidden.value = picker.dataset.emptyValue || '';
+                clearTimeout(timer);
+
+                const query = input.value.trim();
+                input.setCustomValidity(query ? 'Choose an item from the list' : '');
+                if (!query) {
+                    close();
+                    if (submitOnSelect) {
+                        picker.closest('form').submit();
+                    }
+                    return;
+                }
+
+                timer = setTimeout(() => {
+                    if (controller) {
+                        controller.abort();
+                    }
+                    controller = new AbortController();
+
+                    fetch(`${picker.dataset.url}?q=${encodeURIComponent(query)}`, { signal: controller.signal })
+                        .then(response => response.json())
+                        .then(items => {
+                            results.innerHTML = '';
+                            items.forEach(item => {
+                                const option = document.createElement('button');
+                                option.type = 'button';
+                                option.className = 'list-group-item list-group-item-action';
+                                option.textContent = item.label;
+                                option.addEventListener('click', () => choose(item));
+                                results.appendChild(option);
+                            });
+                            results.classList.toggle('d-none', items.length === 0);
+                        })
+                        .catch(error => {
+                            if (error.name !== 'AbortError') {
+                                console.error('Item lookup failed:', error);
+                            }
+                        });
+                }, 200);
+            });
+
+            document.addEventListener('click', (evt) => {
+                if (!picker.contains(evt.target)) {
+                    close();
+                }
+            });
+        });
+    },
+
     // Auto-refresh functionality
     startAutoRefresh: function() {
         setInterval(() => {
@@ -32,6 +32,7 @@ CREATE TABLE item (
     id SERIAL PRIMARY KEY,
     auction_id INTEGER REFERENCES auction(id) ON DELETE CASCADE,
     lot_number VARCHAR(50),
+    lot_sort_key VARCHAR(80),
     title VARCHAR(200) NOT NULL,
     description TEXT,
     planned_max_bid DECIMAL(10,2),
@@ -50,6 +51,11 @@ CREATE TABLE item (
     pieces_remaining INTEGER,
     ebay_suggested_price DECIMAL(10,2),
     ebay_price_updated TIMESTAMP,
+    total_expenses_cached DECIMAL(10,2) DEFAULT 0,
+    pieces_sold_cached INTEGER DEFAULT 0,
+    piece_revenue_cached DECIMAL(10,2) DEFAULT 0,
+    net_profit_cached DECIMAL(10,2),
+    roi_cached DECIMAL(10,2),
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
 );
@@ -91,6 +97,69 @@ CREATE TABLE item_sales (
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Cash event ledger, derived from items, expenses and piece sales (models.refresh_cash_events)
+-- Amounts are signed: positive is income, negative is money spent
+CREATE TABLE cash_event (
+    id SERIAL PRIMARY KEY,
+    event_date DATE NOT NULL,
+    item_id INTEGER NOT NULL REFERENCES item(id) ON DELETE CASCADE,
+    kind VARCHAR(20) NOT NULL,
+    source_id INTEGER NOT NULL DEFAULT 0,
+    amount DECIMAL(10,2) NOT NULL,
+    description VARCHAR(200),
+    CONSTRAINT uq_cash_event_item_kind_source UNIQUE (item_id, kind, source_id)
+);
+
+-- Per-month totals for the trend charts, derived from items and expenses (models.refresh_monthly_rollups)
+CREATE TABLE monthly_rollup (
+    month DATE PRIMARY KEY,
+    revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+    net_profit DECIMAL(12,2) NOT NULL DEFAULT 0,
+    items_sold INTEGER NOT NULL DEFAULT 0,
+    fees DECIMAL(12,2) NOT NULL DEFAULT 0,
+    expenses DECIMAL(12,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Change counters; the report cache keys entries by the 'reports' version (models.bump_data_version)
+CREATE TABLE data_version (
+    name VARCHAR(50) PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+-- Background report and export jobs (utils/report_jobs.py); results live in files under REPORT_JOB_DIR
+CREATE TABLE report_job (
+    id VARCHAR(32) PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    params TEXT NOT NULL,
+    params_key VARCHAR(64) NOT NULL,
+    data_version INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    user_id VARCHAR,
+    worker VARCHAR(100),
+    file_path VARCHAR(500),
+    error TEXT,
+    progress INTEGER,
+    progress_total INTEGER,
+    created_at TIMESTAMP DEFAULT NOW(),
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Partner share accruals, adjustments and payouts with a running balance (models.sync_partner_ledger)
+-- item_id has no foreign key so entries outlive deleted items
+CREATE TABLE partner_ledger (
+    id SERIAL PRIMARY KEY,
+    partner_id INTEGER NOT NULL REFERENCES partner(id) ON DELETE CASCADE,
+    item_id INTEGER,
+    entry_date DATE NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    amount DECIMAL(10,2) NOT NULL,
+    balance DECIMAL(12,2) NOT NULL,
+    description VARCHAR(200),
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
 -- Create indexes for better performance
 CREATE INDEX idx_item_auction_id ON item(auction_id);
 CREATE INDEX idx_item_status ON item(status);
@@ -98,6 +167,28 @@ CREATE INDEX idx_item_partner_item_id ON item_partner(item_id);
 CREATE INDEX idx_item_partner_partner_id ON item_partner(partner_id);
 CREATE INDEX idx_item_expense_item_id ON item_expense(item_id);
 CREATE INDEX idx_item_sales_item_id ON item_sales(item_id);
+CREATE INDEX idx_item_updated_at_id ON item(updated_at DESC, id DESC);
+CREATE INDEX idx_cash_event_date_item_kind ON cash_event(event_date, item_id, kind);
+CREATE INDEX idx_item_status_sale_date ON item(status, sale_date);
+CREATE INDEX idx_item_auction_lot_sort ON item(auction_id, lot_sort_key, id);
+CREATE INDEX idx_item_expense_date ON item_expense(date);
+CREATE INDEX idx_report_job_reuse ON report_job(kind, params_key, data_version);
+CREATE INDEX idx_partner_ledger_partner_date ON partner_ledger(partner_id, entry_date, id);
+CREATE INDEX ix_partner_ledger_item_id ON partner_ledger(item_id);
+
+-- Full-text search over lot number, title and description
+ALTER TABLE item ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(lot_number, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED;
+CREATE INDEX idx_item_search_vector ON item USING GIN (search_vector);
+
+-- Trigram indexes for the item picker typeahead
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_item_title_trgm ON item USING GIN (title gin_trgm_ops);
+CREATE INDEX idx_item_lot_number_trgm ON item USING GIN (lot_number gin_trgm_ops);
 
 -- Create triggers for updated_at timestamps
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -111,11 +202,64 @@ $$ language 'plpgsql';
 CREATE TRIGGER update_auction_updated_at BEFORE UPDATE ON auction
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Item edits bump updated_at, but refreshing the cached profit columns does not
+CREATE OR REPLACE FUNCTION update_item_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (to_jsonb(NEW) - ARRAY['updated_at', 'total_expenses_cached', 'pieces_sold_cached',
+                              'piece_revenue_cached', 'net_profit_cached', 'roi_cached', 'lot_sort_key'])
+       IS DISTINCT FROM
+       (to_jsonb(OLD) - ARRAY['updated_at', 'total_expenses_cached', 'pieces_sold_cached',
+                              'piece_revenue_cached', 'net_profit_cached', 'roi_cached', 'lot_sort_key']) THEN
+        NEW.updated_at = NOW();
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
 CREATE TRIGGER update_item_updated_at BEFORE UPDATE ON item
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+    FOR EACH ROW EXECUTE FUNCTION update_item_updated_at_column();
 
 CREATE TRIGGER update_item_expense_updated_at BEFORE UPDATE ON item_expense
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 CREATE TRIGGER update_item_sales_updated_at BEFORE UPDATE ON item_sales
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column(); 
\ No newline at end of file
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Upgrading an existing database
+-- Run these once, then `flask --app main recompute-profits` to backfill the cached columns.
+-- ALTER TABLE item ADD COLUMN IF NOT EXISTS total_expenses_cached DECIMAL(10,2) DEFAULT 0;
+-- ALTER TABLE item ADD COLUMN IF NOT EXISTS pieces_sold_cached INTEGER DEFAULT 0;
+-- ALTER TABLE item ADD COLUMN IF NOT EXISTS piece_revenue_cached DECIMAL(10,2) DEFAULT 0;
+-- ALTER TABLE item ADD COLUMN IF NOT EXISTS net_profit_cached DECIMAL(10,2);
+-- ALTER TABLE item ADD COLUMN IF NOT EXISTS roi_cached DECIMAL(10,2);
+-- CREATE INDEX IF NOT EXISTS idx_item_updated_at_id ON item(updated_at DESC, id DESC);
+-- The search_vector column and the GIN/trigram indexes are added automatically on startup (utils/search.py).
+-- DROP TRIGGER update_item_updated_at ON item;  -- then re-create it with update_item_updated_at_column() above
+-- The cash_event table is created by `db.create_all()` on startup; then run
+-- `flask --app main rebuild-cash-events` once to backfill it.
+-- Databases with a cash_event table from before its unique key need, once (the rebuild refills it):
+-- UPDATE item SET sale_date = updated_at::date WHERE status = 'sold' AND sale_date IS NULL;
+-- DELETE FROM cash_event;
+-- ALTER TABLE cash_event ALTER COLUMN source_id SET DEFAULT 0, ALTER COLUMN source_id SET NOT NULL;
+-- ALTER TABLE cash_event ADD CONSTRAINT uq_cash_event_item_kind_source UNIQUE (item_id, kind, source_id);
+-- DROP INDEX IF EXISTS ix_cash_event_item_id;
+-- then run `flask --app main rebuild-cash-events` and `flask --app main rebuild-rollups`.
+-- The monthly_rollup table is created by `db.create_all()` on startup; add its indexes with
+-- CREATE INDEX IF NOT EXISTS idx_item_status_sale_date ON item(status, sale_date);
+-- CREATE INDEX IF NOT EXISTS idx_item_expense_date ON item_expense(date);
+-- then run `flask --app main rebuild-rollups` once to backfill it.
+-- The data_version table is created by `db.create_all()` on startup and needs no backfill.
+-- The report_job table is created by `db.create_all()` on startup; existing databases also need
+-- CREATE INDEX IF NOT EXISTS idx_report_job_reuse ON report_job(kind, params_key, data_version);
+-- ALTER TABLE report_job ADD COLUMN IF NOT EXISTS user_id VARCHAR, ADD COLUMN IF NOT EXISTS worker VARCHAR(100);
+-- ALTER TABLE report_job ADD COLUMN IF NOT EXISTS progress INTEGER, ADD COLUMN IF NOT EXISTS progress_total INTEGER;
+-- DELETE FROM report_job;  -- older results have no owner, and cash flow results were pickles
+-- The partner_ledger table is created by `db.create_all()` on startup; then run
+-- `flask --app main rebuild-partner-ledger` once to post accruals for items already sold.
+-- Ledgers posted before accruals were dated by sale date need the same rebuild once, so balances
+-- follow (entry_date, id) order.
+-- ALTER TABLE item ADD COLUMN IF NOT EXISTS lot_sort_key VARCHAR(80);
+-- CREATE INDEX IF NOT EXISTS idx_item_auction_lot_sort ON item(auction_id, lot_sort_key, id);
+-- re-create update_item_updated_at_column() above (it now ignores lot_sort_key), then run
+-- `flask --app main backfill-lot-sort-keys` once.
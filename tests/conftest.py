@@ -0,0 +1,85 @@
+"""
+Shared pytest fixtures
+"""
+import os
+from datetime import date
+
+# The app refuses to start without a database URL; tests run against in-memory SQLite
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import pytest
+
+# Import the app before anything pulls in models directly, otherwise the
+# blueprints hit a circular import and are never registered
+import app  # noqa: F401,E402
+
+
+@pytest.fixture
+def app_ctx():
+    """Application context with a fresh schema"""
+    from app import app, db
+    import models  # noqa: F401
+
+    # Cached reports are keyed by a data version that restarts with the schema
+    app.extensions.pop('report_cache', None)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app_ctx):
+    """Test client logged in as a local user"""
+    from app import db
+    from models import User
+
+    user = User(id='test-user', email='test@example.com')
+    db.session.add(user)
+    db.session.commit()
+
+    app_ctx.config['TESTING'] = True
+    client = app_ctx.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = user.id
+        sess['_fresh'] = True
+    return client
+
+
+@pytest.fixture
+def seed_items(app_ctx):
+    """
+    Factory adding items to a new 'Estate Sale' auction on 2025-06-01
+
+    seed_items(3, status=ItemStatus.SOLD) adds three items sharing the given
+    fields. A field given as a callable is called with each item's index, and
+    titles default to 'Item <index>'. Pass a list of field dicts instead of a
+    count for items that differ. The items are flushed, so they have ids, and
+    committed unless commit=False.
+
+    Returns:
+        The new items
+    """
+    from app import db
+    from models import Auction, Item
+
+    def add_items(items=1, commit=True, **fields):
+        auction = Auction(title='Estate Sale', date=date(2025, 6, 1))
+        db.session.add(auction)
+        db.session.flush()
+
+        rows = items if isinstance(items, list) else [{}] * items
+        new_items = []
+        for index, row in enumerate(rows):
+            values = {'title': f'Item {index}', **fields, **row}
+            new_items.append(Item(auction_id=auction.id, **{
+                name: value(index) if callable(value) else value for name, value in values.items()}))
+        db.session.add_all(new_items)
+        db.session.flush()
+        if commit:
+            db.session.commit()
+        return new_items
+
+    return add_items
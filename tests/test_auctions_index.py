@@ -0,0 +1,120 @@
+"""
+Tests for the auctions list
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from tests.test_query_counts import seed_sold_items
+
+
+def test_stats_come_from_the_grouped_subquery(app_ctx, seed_items):
+    from app import db
+    from models import Auction, Item, ItemStatus
+    from blueprints.auctions import auction_item_stats
+
+    seed_sold_items(seed_items, 3)
+    auction = Auction.query.first()
+    db.session.add_all([
+        Item(auction_id=auction.id, title='Lamp', status=ItemStatus.WATCH, purchase_price=Decimal('0')),
+        Item(auction_id=auction.id, title='Rug', status=ItemStatus.WON, purchase_price=Decimal('30.00')),
+    ])
+    db.session.add(Auction(title='Empty', date=date(2025, 7, 1)))
+    db.session.commit()
+
+    stats = auction_item_stats()
+    row = db.session.execute(db.select(stats).where(stats.c.auction_id == auction.id)).one()
+    items = Item.query.filter_by(auction_id=auction.id).all()
+
+    assert (row.item_count, row.watch_count, row.won_count, row.sold_count) == (5, 1, 1, 3)
+    # Three sold items at 100 + 10 refurb + 5 hauling each, plus the won rug
+    assert float(row.spend) == 375.0
+    assert float(row.realized_profit) == sum(i.net_profit for i in items if i.status == ItemStatus.SOLD)
+
+
+def test_index_paginates_and_shows_stats(client, seed_items):
+    from app import db
+    from models import Auction
+
+    seed_sold_items(seed_items, 2)
+    for day in range(25):
+        db.session.add(Auction(title=f'Sale {day}', date=date(2024, 1, 1) + timedelta(days=day)))
+    db.session.commit()
+
+    first = client.get('/auctions/').get_data(as_text=True)
+    assert first.count('/edit"') == 20
+    assert 'Estate Sale' in first
+    assert '2 items' in first
+    assert '2 sold' in first
+    assert 'page=2' in first
+
+    last = client.get('/auctions/?page=2&per_page=20').get_data(as_text=True)
+    assert last.count('/edit"') == 6
+    assert 'Sale 0' in last
+
+
+def test_index_groups_only_the_pages_items(client, seed_items):
+    from flask import g
+    from tests.test_query_counts import count_queries
+
+    seed_sold_items(seed_items, 2)
+    g.pop('_login_user', None)
+    with count_queries() as statements:
+        client.get('/auctions/')
+    grouped = [s for s in statements if 'GROUP BY' in s.upper()]
+    assert len(grouped) == 1
+    assert ' IN (' in grouped[0].upper()
+    # Stats come back with the page rows; the page count reads auctions alone
+    auction_queries = [s for s in statements if 'FROM AUCTION' in s.upper()]
+    assert len(auction_queries) == 2
+    counts = [s for s in auction_queries if 'COUNT(*)' in s.upper()]
+    assert len(counts) == 1 and 'FROM ITEM' not in counts[0].upper()
+
+
+def test_natural_lot_key_orders_lots_naturally():
+    from models import natural_lot_key
+
+    lots = ['10', 'LOT-001', '2', '12A', '12', 'lot 10', '100', None, 'Misc']
+    ordered = sorted((lot for lot in lots if natural_lot_key(lot)), key=natural_lot_key)
+    assert ordered == ['2', '10', '12', '12A', '100', 'LOT-001', 'lot 10', 'Misc']
+    assert natural_lot_key('  ') is None
+
+
+def test_lots_sorted_on_write_backfill_and_import(client):
+    import io
+    from app import db
+    from models import Auction, Item, refresh_lot_sort_keys
+    from utils.csv_import import import_inventory_csv
+
+    auction = Auction(title='Lots', date=date(2025, 6, 1))
+    db.session.add(auction)
+    db.session.flush()
+    items = [Item(auction_id=auction.id, title=f'Thing {lot}', lot_number=lot) for lot in ['10', '1', '2', '100']]
+    db.session.add_all(items)
+    db.session.commit()
+
+    page = client.get(f'/auctions/{auction.id}/view').get_data(as_text=True)
+    positions = [page.index(f'Thing {lot}<') for lot in ['1', '2', '10', '100']]
+    assert positions == sorted(positions)
+
+    # Page two of two-per-page starts at lot 10
+    page = client.get(f'/auctions/{auction.id}/view?page=2&per_page=2').get_data(as_text=True)
+    assert 'Thing 10<' in page and 'Thing 1<' not in page
+
+    # Edits and imports keep the key current
+    items[0].lot_number = '3'
+    db.session.commit()
+    assert items[0].lot_sort_key == '000000000003'
+
+    upload = io.BytesIO(f'ID,Lot Number\n{items[1].id},LOT-7\n'.encode('utf-8'))
+    import_inventory_csv(upload)
+    assert db.session.get(Item, items[1].id).lot_sort_key == 'LOT000000000007'
+
+    # The backfill fixes keys written before the column existed, without touching updated_at
+    Item.query.update({'lot_sort_key': None})
+    db.session.commit()
+    stamped = db.session.get(Item, items[2].id).updated_at
+    assert refresh_lot_sort_keys(db.session, [item.id for item in items]) == 4
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(Item, items[2].id).lot_sort_key == '000000000002'
+    assert db.session.get(Item, items[2].id).updated_at == stamped
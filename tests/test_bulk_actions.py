@@ -0,0 +1,59 @@
+"""
+Tests for set-based bulk actions on the items list
+"""
+from tests.test_query_counts import count_queries, seed_sold_items
+
+
+def test_bulk_delete_is_one_statement_and_cascades(client, seed_items):
+    from flask import g
+    from app import db
+    from models import Item, ItemExpense, ItemPartner, ItemSale
+
+    seed_sold_items(seed_items, 35)
+    # Both requests load the user, as queries_for() does
+    g.pop('_login_user', None)
+    all_ids = [item_id for (item_id,) in db.session.query(Item.id).order_by(Item.id)]
+    few, ids = all_ids[:5], all_ids[5:25]
+
+    with count_queries() as small:
+        client.post('/items/bulk-action', data={'action': 'delete', 'selected_items': few})
+    g.pop('_login_user', None)
+    with count_queries() as statements:
+        response = client.post('/items/bulk-action', data={'action': 'delete', 'selected_items': ids})
+    assert response.status_code == 302
+    assert len([s for s in statements if s.lstrip().upper().startswith('DELETE FROM ITEM ')]) == 1
+    # Refreshing derived data (rollups, ledger, data versions) adds statements, but a fixed number
+    assert len(statements) == len(small)
+
+    assert Item.query.count() == 10
+    assert ItemExpense.query.filter(ItemExpense.item_id.in_(ids)).count() == 0
+    assert ItemPartner.query.filter(ItemPartner.item_id.in_(ids)).count() == 0
+    assert ItemSale.query.filter(ItemSale.item_id.in_(ids)).count() == 0
+    assert ItemExpense.query.count() == 10
+
+
+def test_bulk_status_change_is_one_update(client, seed_items):
+    from flask import g
+    from app import db
+    from models import Item, ItemStatus, bulk_update_item_status
+
+    seed_sold_items(seed_items, 25)
+    g.pop('_login_user', None)
+    all_ids = [item_id for (item_id,) in db.session.query(Item.id).order_by(Item.id)]
+    few, ids = all_ids[:5], all_ids[5:]
+
+    with count_queries() as small:
+        client.post('/items/bulk-action', data={
+            'action': 'status_change', 'new_status': 'listed', 'selected_items': few})
+    g.pop('_login_user', None)
+    with count_queries() as statements:
+        response = client.post('/items/bulk-action', data={
+            'action': 'status_change', 'new_status': 'listed', 'selected_items': ids})
+    assert response.status_code == 302
+    assert len([s for s in statements if s.lstrip().upper().startswith('UPDATE ITEM ')]) == 1
+    # Refreshing derived data adds statements, but a fixed number
+    assert len(statements) == len(small)
+    assert Item.query.filter_by(status=ItemStatus.LISTED).count() == 25
+
+    # Counts only rows that exist
+    assert bulk_update_item_status(ids[:3] + [999999], ItemStatus.WON) == 3
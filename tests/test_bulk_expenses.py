@@ -0,0 +1,146 @@
+"""
+Tests for the bulk expense API
+"""
+from datetime import date
+from decimal import Decimal
+
+from tests.test_query_counts import seed_sold_items, count_queries
+
+
+def item_ids():
+    from models import Item
+    return [item.id for item in Item.query.order_by(Item.id)]
+
+
+def test_batch_with_split_receipt_is_inserted_in_one_statement(client, seed_items):
+    from app import db
+    from models import Item, ItemExpense, Partner
+    from utils.partner_ledger import get_partner_balances
+
+    seed_sold_items(seed_items, 3)
+    first, second, third = item_ids()
+    pat = Partner.query.first()
+    profit_before = db.session.get(Item, first).net_profit_cached
+    balance_before = get_partner_balances()[pat.id]
+
+    payload = [
+        {'item_id': first, 'description': 'Glue', 'amount': '8.50', 'date': '2025-06-21', 'category': 'repair'},
+        {'description': 'U-Haul', 'amount': 90, 'date': '2025-06-22', 'category': 'transport',
+         'splits': [{'item_id': first, 'amount': '50.00'}, {'item_id': second}, {'item_id': third}]},
+        {'description': 'Storage', 'amount': '10.00', 'splits': [{'item_id': second}, {'item_id': third},
+                                                                 {'item_id': first}]},
+    ]
+    with count_queries() as queries:
+        response = client.post('/expenses/api/bulk', json={'expenses': payload})
+    assert response.status_code == 201
+    assert response.get_json() == {'success': True, 'created': 7, 'total': '108.50', 'items': 3}
+    assert sum(1 for statement in queries if statement.startswith('INSERT INTO item_expense')) == 1
+
+    uhaul = ItemExpense.query.filter_by(description='U-Haul').order_by(ItemExpense.id).all()
+    assert [e.amount for e in uhaul] == [Decimal('50.00'), Decimal('20.00'), Decimal('20.00')]
+    assert 'Split of $90.00 receipt across 3 items' in uhaul[0].notes
+    storage = ItemExpense.query.filter_by(description='Storage').order_by(ItemExpense.id).all()
+    assert [e.amount for e in storage] == [Decimal('3.34'), Decimal('3.33'), Decimal('3.33')]
+    assert storage[0].date == date.today()
+
+    # Derived data follows the new expenses
+    assert db.session.get(Item, first).net_profit_cached < profit_before
+    assert get_partner_balances()[pat.id] < balance_before
+
+
+def test_invalid_batch_reports_every_error_and_writes_nothing(client, seed_items):
+    from models import ItemExpense
+
+    seed_sold_items(seed_items, 2)
+    first, second = item_ids()
+    before = ItemExpense.query.count()
+
+    response = client.post('/expenses/api/bulk', json=[
+        {'item_id': first, 'description': 'Fine', 'amount': '5.00'},
+        {'item_id': first, 'description': '', 'amount': '5.00'},
+        {'item_id': 999999, 'description': 'Ghost', 'amount': '5.00'},
+        {'item_id': second, 'description': 'Bad date', 'amount': '5.00', 'date': '06/01/2025'},
+        {'description': 'Uneven', 'amount': '10.00',
+         'splits': [{'item_id': first, 'amount': '4.00'}, {'item_id': second, 'amount': '4.00'}]},
+        {'item_id': second, 'description': 'Free', 'amount': '-1'},
+    ])
+    assert response.status_code == 400
+    errors = response.get_json()['errors']
+    assert [(e['row'], e['field']) for e in errors] == [
+        (1, 'description'), (2, 'item_id'), (3, 'date'), (4, 'splits'), (5, 'amount')]
+    assert ItemExpense.query.count() == before
+
+    assert client.post('/expenses/api/bulk', json={'expenses': []}).status_code == 400
+    assert client.post('/expenses/api/bulk', data='not json').status_code == 400
+
+
+def test_split_rows_are_capped_and_failures_stay_generic(client, monkeypatch, seed_items):
+    import blueprints.expenses
+    from models import ItemExpense
+    from utils.bulk_expenses import MAX_BULK_EXPENSE_ROWS
+
+    seed_sold_items(seed_items, 1)
+    first, = item_ids()
+    before = ItemExpense.query.count()
+
+    # One entry, but more rows than a single INSERT may carry
+    splits = [{'item_id': first}] * (MAX_BULK_EXPENSE_ROWS + 1)
+    response = client.post('/expenses/api/bulk', json=[
+        {'description': 'Pallet', 'amount': MAX_BULK_EXPENSE_ROWS + 1, 'splits': splits}])
+    assert response.status_code == 400
+    assert response.get_json()['errors'][0]['field'] == 'expenses'
+    assert ItemExpense.query.count() == before
+
+    def fail(rows):
+        raise RuntimeError('connection to server at 10.0.0.5 failed')
+
+    monkeypatch.setattr(blueprints.expenses, 'bulk_insert_expenses', fail)
+    response = client.post('/expenses/api/bulk', json=[{'item_id': first, 'description': 'Tape', 'amount': '1'}])
+    assert response.status_code == 500
+    assert '10.0.0.5' not in response.get_data(as_text=True)
+
+
+def test_only_new_expense_and_sale_months_are_refreshed(app_ctx, monkeypatch, seed_items):
+    import models
+    from datetime import date
+    from models import bulk_insert_expenses
+
+    from app import db
+    from models import ItemExpense
+
+    seed_sold_items(seed_items, 1)
+    first, = item_ids()
+    db.session.add(ItemExpense(item_id=first, description='Cleaning', amount=Decimal('3.00'),
+                               date=date(2025, 1, 15)))
+    db.session.commit()
+    refreshed = []
+    monkeypatch.setattr(models, 'refresh_monthly_rollups', lambda connection, months: refreshed.append(months))
+
+    # The sale month and the new expense's month; January's expense is unaffected
+    bulk_insert_expenses([{'item_id': first, 'description': 'Crate', 'amount': Decimal('4.00'),
+                           'date': date(2025, 3, 9), 'category': None, 'notes': None}])
+    assert refreshed == [{date(2025, 3, 1), date(2025, 6, 1)}]
+
+
+def test_amounts_and_item_ids_are_checked_before_writing(client, seed_items):
+    from models import ItemExpense
+
+    seed_sold_items(seed_items, 2)
+    first, second = item_ids()
+    before = ItemExpense.query.count()
+
+    response = client.post('/expenses/api/bulk', json=[
+        {'item_id': first, 'description': 'Not a number', 'amount': 'NaN'},
+        {'description': 'Split NaN', 'amount': '10.00',
+         'splits': [{'item_id': first, 'amount': 'NaN'}, {'item_id': second}]},
+        {'item_id': first, 'description': 'Infinite', 'amount': 'Infinity'},
+        {'item_id': first, 'description': 'Too big', 'amount': '1e20'},
+        {'item_id': first, 'description': 'Half a cent', 'amount': '10.005'},
+        {'item_id': 1.5, 'description': 'Fractional item', 'amount': '5.00'},
+        {'item_id': first, 'description': 'Largest', 'amount': '99999999.99'},
+    ])
+    assert response.status_code == 400
+    errors = response.get_json()['errors']
+    assert [(e['row'], e['field']) for e in errors] == [
+        (0, 'amount'), (1, 'splits[0].amount'), (2, 'amount'), (3, 'amount'), (4, 'amount'), (5, 'item_id')]
+    assert ItemExpense.query.count() == before
@@ -0,0 +1,149 @@
+"""
+Tests for the cash event ledger behind the cash flow reports
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+
+def seed_sold_item(seed_items):
+    from app import db
+    from models import ItemExpense, ItemStatus
+
+    item, = seed_items(commit=False, title='Oak table', lot_number='7', status=ItemStatus.SOLD,
+                       purchase_price=Decimal('100.00'), refurb_cost=Decimal('20.00'),
+                       sale_price=Decimal('250.00'), sale_date=date(2025, 6, 20), list_channel='eBay',
+                       sale_fees=Decimal('25.00'), shipping_cost=Decimal('10.00'))
+    db.session.add(ItemExpense(item_id=item.id, description='Hauling', amount=Decimal('15.00'),
+                               date=date(2025, 6, 5)))
+    db.session.commit()
+    return item
+
+
+def ledger():
+    from models import CashEvent
+    return sorted((e.event_date, e.kind, e.amount) for e in CashEvent.query.all())
+
+
+def test_events_are_dated_by_what_happened(app_ctx, seed_items):
+    seed_sold_item(seed_items)
+
+    assert ledger() == [
+        (date(2025, 6, 1), 'purchase', Decimal('-100.00')),
+        (date(2025, 6, 1), 'refurb', Decimal('-20.00')),
+        (date(2025, 6, 5), 'expense', Decimal('-15.00')),
+        (date(2025, 6, 20), 'fees', Decimal('-25.00')),
+        (date(2025, 6, 20), 'sale', Decimal('250.00')),
+        (date(2025, 6, 20), 'shipping', Decimal('-10.00')),
+    ]
+
+
+def test_ledger_follows_edits_and_deletes(app_ctx, seed_items):
+    from app import db
+    from models import CashEvent, ItemSale
+
+    item = seed_sold_item(seed_items)
+    before = ledger()
+
+    # Editing something unrelated doesn't move history
+    item.title = 'Oak dining table'
+    db.session.commit()
+    assert ledger() == before
+
+    item.expenses[0].amount = Decimal('18.00')
+    item.sale_fees = Decimal('0')
+    db.session.add(ItemSale(item_id=item.id, pieces_sold=1, sale_price_per_piece=Decimal('30.00'),
+                            total_sale_amount=Decimal('30.00'), sale_date=date(2025, 7, 1)))
+    db.session.commit()
+    kinds = {kind: amount for _, kind, amount in ledger()}
+    assert kinds['expense'] == Decimal('-18.00')
+    assert 'fees' not in kinds
+    assert kinds['piece_sale'] == Decimal('30.00')
+
+    db.session.delete(item)
+    db.session.commit()
+    assert CashEvent.query.count() == 0
+
+
+def test_cashflow_report_reads_the_ledger(client, seed_items):
+    from blueprints.reports import get_cashflow_data
+
+    seed_sold_item(seed_items)
+
+    data = get_cashflow_data(datetime(2025, 6, 1), datetime(2025, 6, 10))
+    assert [t['category'] for t in data['transactions']] == ['Expense', 'Refurbishment', 'Purchase']
+    assert data['total_expenses'] == 135.0
+    assert data['total_income'] == 0
+    assert data['summary']['expense_transactions'] == 3
+
+    response = client.get('/reports/export/cashflow?start_date=2025-06-01&end_date=2025-06-30')
+    lines = response.get_data(as_text=True).splitlines()
+    assert '2025-06-20,Income,Oak table,250.00,Sale,Estate Sale,Sold on eBay' in lines
+    assert len(lines) == 7
+
+    response = client.get('/reports/cashflow?start_date=2025-06-01&end_date=2025-06-30')
+    assert response.status_code == 200
+    assert b'250.00' in response.data
+
+
+def test_bulk_status_change_updates_ledger(client, seed_items):
+    from app import db
+    from models import CashEvent, Item, ItemStatus
+
+    item = seed_sold_item(seed_items)
+    client.post('/items/bulk-action', data={'action': 'status_change', 'new_status': 'listed',
+                                            'selected_items': [item.id]})
+    assert CashEvent.query.filter_by(kind='sale').count() == 0
+
+    client.post('/items/bulk-action', data={'action': 'status_change', 'new_status': 'sold',
+                                            'selected_items': [item.id]})
+    assert CashEvent.query.filter_by(kind='sale').count() == 1
+
+
+def test_refresh_upserts_in_place_and_drops_stale_events(app_ctx, seed_items):
+    from app import db
+    from models import CashEvent, refresh_cash_events
+
+    item = seed_sold_item(seed_items)
+    ids = {e.kind: e.id for e in CashEvent.query}
+
+    item.sale_price = Decimal('260.00')
+    db.session.commit()
+    refresh_cash_events(db.session)
+    refresh_cash_events(db.session, [item.id])
+    db.session.commit()
+
+    # Same rows updated, never duplicated
+    assert {e.kind: e.id for e in CashEvent.query} == ids
+    assert CashEvent.query.filter_by(kind='sale').one().amount == Decimal('260.00')
+
+    db.session.delete(item.expenses[0])
+    db.session.commit()
+    assert CashEvent.query.filter_by(kind='expense').count() == 0
+
+
+def test_sold_without_a_date_is_dated_once_and_matches_rollups(seed_items):
+    from app import db
+    from models import CashEvent, ItemExpense, ItemStatus, MonthlyRollup, month_start
+    from utils.cashflow import cashflow_totals
+
+    item, = seed_items(commit=False, title='Lamp', status=ItemStatus.SOLD,
+                       purchase_price=Decimal('10.00'), sale_price=Decimal('30.00'))
+    # A zero-dollar expense is still money out, not income
+    db.session.add(ItemExpense(item_id=item.id, description='Free pickup', amount=Decimal('0'),
+                               date=date(2025, 6, 2)))
+    db.session.commit()
+
+    today = date.today()
+    assert item.sale_date == today
+    sale = CashEvent.query.filter_by(kind='sale').one()
+    assert sale.event_date == today
+    assert db.session.get(MonthlyRollup, month_start(today)).items_sold == 1
+
+    # Later edits don't move the sale
+    item.title = 'Brass lamp'
+    db.session.commit()
+    assert CashEvent.query.filter_by(kind='sale').one().event_date == today
+
+    totals = cashflow_totals(date(2025, 6, 1), date(2025, 6, 30))
+    assert totals['income_transactions'] == 0
+    assert totals['expense_transactions'] == 2
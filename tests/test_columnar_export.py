@@ -0,0 +1,48 @@
+"""
+Tests for typed Parquet / Arrow / NDJSON exports
+"""
+import io
+import json
+import pytest
+from tests.test_query_counts import seed_sold_items
+
+
+def test_ndjson_keeps_numeric_types(client, seed_items):
+    seed_sold_items(seed_items, 3)
+
+    response = client.get('/reports/export/data/items.ndjson')
+    assert response.status_code == 200
+    assert response.is_streamed
+
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(records) == 3
+    assert records[0]['purchase_price'] == 100.0
+    assert records[0]['status'] == 'sold'
+    assert records[0]['sale_date'] == '2025-06-20'
+
+
+def test_parquet_and_arrow_round_trip(client, seed_items):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+    from utils import columnar_export
+
+    seed_sold_items(seed_items, 7)
+
+    # Small batches so the writer emits several record batches
+    chunks = list(columnar_export.iter_columnar_export('expenses', 'parquet', batch_size=3))
+    assert len(chunks) > 2
+    table = pq.read_table(io.BytesIO(b''.join(chunks)))
+    assert table.num_rows == 7
+    assert table.schema.field('amount').type == pa.float64()
+    assert table.column('amount').to_pylist() == [5.0] * 7
+
+    response = client.get('/reports/export/data/partner_shares.arrow')
+    assert response.status_code == 200
+    table = pa.ipc.open_file(io.BytesIO(response.get_data())).read_all()
+    assert table.num_rows == 7
+    assert table.schema.field('share_amount').type == pa.float64()
+
+
+def test_unknown_dataset_is_404(client):
+    assert client.get('/reports/export/data/users.ndjson').status_code == 404
+    assert client.get('/reports/export/data/items.xlsx').status_code == 404
@@ -0,0 +1,150 @@
+"""
+Tests for the streaming inventory CSV import
+"""
+import io
+from datetime import date
+from decimal import Decimal
+
+
+def seed_item_ids(seed_items, count):
+    return [item.id for item in seed_items(count, purchase_price=Decimal('10.00'))]
+
+
+def make_csv(rows):
+    lines = ['ID,Purchase Price,Sale Price,Sale Date'] + rows
+    return io.BytesIO(('\ufeff' + '\n'.join(lines) + '\n').encode('utf-8'))
+
+
+def test_dry_run_reports_diffs_and_errors_without_writing(app_ctx, seed_items):
+    from app import db
+    from models import Item
+    from utils.csv_import import import_inventory_csv
+
+    ids = seed_item_ids(seed_items, 3)
+    upload = make_csv([
+        f'{ids[0]},10.00,25.50,2025-07-01',
+        f'{ids[1]},10.00,,',
+        f'{ids[2]},abc,,',
+        '999999,5.00,,',
+        ',1.00,,',
+    ])
+
+    report = import_inventory_csv(upload, dry_run=True, chunk_size=2)
+
+    assert report.rows_processed == 5
+    assert report.updated == 1 and report.unchanged == 1 and report.skipped == 1
+    assert report.diffs[0]['changes']['sale_price'] == {'old': None, 'new': Decimal('25.50')}
+    assert [(e['line'], e['item_id']) for e in report.errors] == [(4, str(ids[2])), (5, '999999')]
+    assert db.session.get(Item, ids[0]).sale_price is None
+
+
+def test_non_finite_and_oversized_amounts_are_row_errors(app_ctx, seed_items):
+    from utils.csv_import import import_inventory_csv
+
+    ids = seed_item_ids(seed_items, 4)
+    upload = make_csv([
+        f'{ids[0]},NaN,,',
+        f'{ids[1]},10.00,Infinity,',
+        f'{ids[2]},"100,000,000.00",,',
+        f'{ids[3]},10.00,"99,999,999.99",',
+    ])
+
+    report = import_inventory_csv(upload, dry_run=True)
+
+    assert [e['line'] for e in report.errors] == [2, 3, 4]
+    assert report.updated == 1
+    assert report.diffs[0]['changes']['sale_price']['new'] == Decimal('99999999.99')
+
+
+def test_import_updates_in_chunks_and_refreshes_profit(app_ctx, seed_items):
+    from app import db
+    from models import Item
+    from utils.csv_import import import_inventory_csv
+
+    ids = seed_item_ids(seed_items, 7)
+    upload = make_csv([f'{item_id},12.00,20.00,2025-07-01' for item_id in ids])
+
+    progress = []
+    report = import_inventory_csv(upload, chunk_size=3,
+                                  progress=lambda r: progress.append(r.rows_processed))
+
+    assert progress == [3, 6, 7]
+    assert report.updated == 7 and not report.errors
+    item = db.session.get(Item, ids[-1])
+    assert item.sale_price == Decimal('20.00')
+    assert item.sale_date == date(2025, 7, 1)
+    assert item.net_profit_cached == Decimal('8.00')
+
+
+def test_real_imports_count_items_and_keep_no_diffs(app_ctx, seed_items):
+    from app import db
+    from models import Item
+    from utils.csv_import import MAX_REPORTED_ROWS, import_inventory_csv
+
+    ids = seed_item_ids(seed_items, 2)
+    # The same item twice, with changes both times
+    upload = make_csv([f'{ids[0]},11.00,,', f'{ids[0]},12.00,,', f'{ids[1]},13.00,,'])
+    report = import_inventory_csv(upload, chunk_size=2)
+    assert report.updated == 2
+    assert report.diffs == [] and report.diff_count == 0
+    assert db.session.get(Item, ids[0]).purchase_price == Decimal('12.00')
+
+    bad_rows = [f'{ids[0]},oops,,'] * (MAX_REPORTED_ROWS + 5)
+    report = import_inventory_csv(make_csv(bad_rows), dry_run=True)
+    assert report.error_count == MAX_REPORTED_ROWS + 5
+    assert len(report.errors) == MAX_REPORTED_ROWS
+
+
+def test_crlf_and_cr_only_line_endings(app_ctx, seed_items):
+    from utils.csv_import import import_inventory_csv
+
+    ids = seed_item_ids(seed_items, 2)
+    for newline in ('\r\n', '\r'):
+        lines = ['ID,Purchase Price', f'{ids[0]},21.00', f'{ids[1]},22.00']
+        upload = io.BytesIO((newline.join(lines) + newline).encode('utf-8'))
+        report = import_inventory_csv(upload, dry_run=True)
+        assert report.rows_processed == 2, newline
+        assert not report.errors
+        assert report.diffs[1]['changes']['purchase_price']['new'] == Decimal('22.00')
+
+
+def test_import_view_runs_as_a_job(client, tmp_path, seed_items):
+    import os
+    from app import db
+    from models import ReportJob
+
+    client.application.config.update(REPORT_JOB_EXECUTOR='inline', REPORT_JOB_DIR=str(tmp_path))
+    try:
+        ids = seed_item_ids(seed_items, 1)
+        response = client.post('/items/import-inventory', data={
+            'csv_file': (make_csv([f'{ids[0]},15.00,,']), 'inventory.csv'),
+            'dry_run': 'on',
+        }, content_type='multipart/form-data')
+        assert response.status_code == 302
+        assert '/items/import-inventory?job=' in response.headers['Location']
+
+        page = client.get(response.headers['Location'])
+        assert page.status_code == 200
+        assert b'Dry Run Results' in page.data
+        assert b'15.00' in page.data
+        # The saved upload is removed once imported
+        assert not [name for name in os.listdir(tmp_path) if name.endswith('.upload.csv')]
+        # Rows done are kept on the job for the polled status
+        job = ReportJob.query.one()
+        assert (job.progress, job.progress_total) == (1, 1)
+
+        # Pending jobs poll; the generic report route can't start imports
+        client.application.config['REPORT_JOB_EXECUTOR'] = 'external'
+        response = client.post('/items/import-inventory', data={
+            'csv_file': (make_csv([f'{ids[0]},16.00,,']), 'inventory.csv'),
+        }, content_type='multipart/form-data')
+        page = client.get(response.headers['Location'])
+        assert b'Preparing inventory import' in page.data
+        job = ReportJob.query.filter_by(status='queued').one()
+        job.progress, job.progress_total = 1500, 2000
+        db.session.commit()
+        status = client.get(f'/reports/jobs/{job.id}', headers={'HX-Request': 'true'})
+        assert b'1,500 of 2,000 rows (75%)' in status.data
+        assert client.post('/reports/jobs/inventory_import').status_code == 404
+    finally:
+        client.application.config.update(REPORT_JOB_EXECUTOR='thread', REPORT_JOB_DIR=None)
@@ -0,0 +1,164 @@
+"""
+Tests for the eBay client against a local stub server
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+
+class StubEbayHandler(BaseHTTPRequestHandler):
+    """Answers the token and search endpoints, failing or stalling on request"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._send(200, {'access_token': 'token', 'expires_in': 7200})
+
+    def do_GET(self):
+        server = self.server
+        server.search_requests += 1
+        if server.failures:
+            status = server.failures.pop(0)
+            self._send(status, {'error': 'try again'}, {'Retry-After': server.retry_after} if status == 429 else None)
+            return
+        if server.stall:
+            time.sleep(server.stall)
+        self._send(200, {'itemSummaries': [{'price': {'value': price}} for price in ('10.00', '30.00', '20.00')]})
+
+
+class StubEbayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Stalled responses are written after the client has timed out and hung up
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = StubEbayServer(('127.0.0.1', 0), StubEbayHandler)
+    server.failures = []
+    server.stall = 0
+    server.retry_after = '0'
+    server.search_requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_api(server, **options):
+    from utils.ebay_api import EBayAPI
+
+    options.setdefault('backoff_factor', 0.01)
+    return EBayAPI(base_url=f'http://127.0.0.1:{server.server_address[1]}', **options)
+
+
+def test_calls_reuse_one_pooled_connection(stub_server):
+    api = make_api(stub_server)
+
+    assert api.get_median_sold_price('oak table') == 20.0
+    assert api.get_median_sold_price('brass lamp') == 20.0
+    assert api.get_median_sold_price('wool rug') == 20.0
+
+    stats = api.stats()
+    assert stats['calls']['token']['calls'] == 1
+    assert stats['calls']['search']['calls'] == 3
+    assert stats['calls']['search']['avg_seconds'] > 0
+    # One token request and three searches over a single keep-alive connection
+    assert stats['connections_opened'] == 1
+    api.close()
+
+
+def test_rate_limits_and_server_errors_are_retried_then_given_up(stub_server):
+    api = make_api(stub_server, max_retries=2)
+
+    stub_server.failures = [429, 503]
+    assert api.get_median_sold_price('oak table') == 20.0
+    assert api.stats()['calls']['search']['retries'] == 2
+    assert api.stats()['calls']['search']['errors'] == 2
+
+    stub_server.search_requests = 0
+    stub_server.failures = [500, 502, 504, 503]
+    assert api.get_median_sold_price('brass lamp') is None
+    # The first try plus two retries, then the last error is returned
+    assert stub_server.search_requests == 3
+    api.close()
+
+
+def test_slow_responses_time_out(stub_server):
+    api = make_api(stub_server, read_timeout=0.2, max_retries=1)
+    stub_server.stall = 1
+
+    started = time.perf_counter()
+    with pytest.raises(requests.Timeout):
+        api._request('search', 'GET', '/buy/browse/v1/item_summary/search')
+    assert time.perf_counter() - started < 1
+    assert stub_server.search_requests == 2
+
+    # The public call logs the failure instead of raising
+    assert api.get_median_sold_price('oak table') is None
+    api.close()
+
+
+def test_calls_stay_within_the_total_budget(stub_server):
+    # Waiting out this Retry-After would overrun the budget, so the 429 is returned at once
+    api = make_api(stub_server, total_timeout=1, max_retries=3)
+    stub_server.failures = [429]
+    stub_server.retry_after = '5'
+    started = time.perf_counter()
+    assert api._request('search', 'GET', '/buy/browse/v1/item_summary/search').status_code == 429
+    assert time.perf_counter() - started < 1
+    assert stub_server.search_requests == 1
+
+    # A long read timeout is cut to what is left of the budget
+    api = make_api(stub_server, read_timeout=10, total_timeout=0.3, max_retries=3)
+    stub_server.stall = 2
+    started = time.perf_counter()
+    with pytest.raises(requests.Timeout):
+        api._request('search', 'GET', '/buy/browse/v1/item_summary/search')
+    assert time.perf_counter() - started < 1
+    api.close()
+
+
+def test_read_timeouts_are_not_retried_while_a_user_waits(stub_server):
+    api = make_api(stub_server, read_timeout=0.2, max_retries=2)
+    stub_server.stall = 1
+
+    with pytest.raises(requests.Timeout):
+        api._request('search', 'GET', '/buy/browse/v1/item_summary/search', retry_read_timeouts=False)
+    assert stub_server.search_requests == 1
+
+    stub_server.search_requests = 0
+    assert api.get_median_sold_price('oak table', interactive=True) is None
+    assert stub_server.search_requests == 1
+    api.close()
+
+
+def test_backoff_is_jittered_and_capped():
+    from utils.ebay_api import EBayAPI, MAX_BACKOFF_SECONDS
+
+    api = EBayAPI(backoff_factor=1)
+    delays = {api._backoff(3) for _ in range(20)}
+    assert len(delays) > 1
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert api._backoff(20) <= MAX_BACKOFF_SECONDS
@@ -0,0 +1,76 @@
+"""
+Tests for the expenses page summary
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from tests.test_query_counts import count_queries
+
+
+def seed_expenses(seed_items):
+    from app import db
+    from models import ItemExpense
+
+    table, lamp = seed_items([dict(title='Table'), dict(title='Lamp')], commit=False)
+    db.session.add_all([
+        ItemExpense(item_id=table.id, description='Stain', amount=Decimal('12.00'), date=date(2025, 6, 3),
+                    category='supplies'),
+        ItemExpense(item_id=table.id, description='Van', amount=Decimal('30.00'), date=date(2025, 6, 9),
+                    category='transport'),
+        ItemExpense(item_id=lamp.id, description='Bulb', amount=Decimal('4.00'), date=date(2025, 6, 5),
+                    category='supplies'),
+        ItemExpense(item_id=lamp.id, description='Misc', amount=Decimal('2.00'), date=date(2025, 6, 1),
+                    category=''),
+    ])
+    db.session.commit()
+    return table, lamp
+
+
+def test_summary_follows_filters_in_one_query(app_ctx, seed_items):
+    from blueprints.expenses import get_expense_summary
+
+    table, lamp = seed_expenses(seed_items)
+
+    with count_queries() as queries:
+        summary = get_expense_summary()
+    assert len(queries) == 1
+    assert (summary['count'], summary['total'], summary['latest_date']) == (4, 48.0, date(2025, 6, 9))
+    assert summary['average'] == pytest.approx(12.0)
+    assert [(row['category'], row['count'], row['total']) for row in summary['categories']] == \
+        [('transport', 1, 30.0), ('supplies', 2, 16.0), (None, 1, 2.0)]
+
+    lamp_summary = get_expense_summary(item_id=lamp.id)
+    assert (lamp_summary['count'], lamp_summary['total'], lamp_summary['latest_date']) == (2, 6.0, date(2025, 6, 5))
+
+    supplies = get_expense_summary(category='supplies')
+    assert (supplies['count'], supplies['total']) == (2, 16.0)
+
+    empty = get_expense_summary(category='nothing')
+    assert (empty['count'], empty['average'], empty['latest_date']) == (0, 0.0, None)
+
+
+def test_category_list_cached_until_expenses_change(client, seed_items):
+    from app import db
+    from models import ItemExpense, Item
+    from blueprints.expenses import get_expense_categories
+
+    table, lamp = seed_expenses(seed_items)
+    assert get_expense_categories() == ['supplies', 'transport']
+
+    # Unrelated writes keep the cached list
+    lamp.title = 'Desk lamp'
+    db.session.commit()
+    with count_queries() as queries:
+        assert get_expense_categories() == ['supplies', 'transport']
+    assert len(queries) == 1
+
+    db.session.add(ItemExpense(item_id=lamp.id, description='Shade', amount=Decimal('8.00'),
+                               date=date(2025, 6, 10), category='parts'))
+    db.session.commit()
+    assert get_expense_categories() == ['parts', 'supplies', 'transport']
+
+    page = client.get('/expenses/?category=supplies').get_data(as_text=True)
+    assert '$16.00' in page
+    assert '$8.00' in page
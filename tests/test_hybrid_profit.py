@@ -0,0 +1,74 @@
+"""
+Tests that the SQL expressions behind Item's profit hybrids match the Python properties
+"""
+from datetime import date
+from decimal import Decimal
+import pytest
+
+
+def seed_profit_cases(seed_items):
+    from app import db
+    from models import ItemExpense, ItemSale, ItemStatus
+
+    items = seed_items([
+        # Single item with fees and an itemized expense
+        dict(title='Table', status=ItemStatus.SOLD,
+             purchase_price=Decimal('100.00'), refurb_cost=Decimal('10.00'),
+             sale_price=Decimal('250.00'), sale_fees=Decimal('20.00'), shipping_cost=Decimal('5.00')),
+        # Single item sold at a loss
+        dict(title='Clock', status=ItemStatus.SOLD,
+             purchase_price=Decimal('80.00'), sale_price=Decimal('60.00')),
+        # Not sold yet
+        dict(title='Lamp', status=ItemStatus.WON,
+             purchase_price=Decimal('40.00')),
+        # Watchlist, no prices at all
+        dict(title='Rug', status=ItemStatus.WATCH),
+        # Multiple pieces, partly sold
+        dict(title='Chairs', status=ItemStatus.WON,
+             purchase_price=Decimal('120.00'), refurb_cost=Decimal('0'),
+             multiple_pieces=True, pieces_total=6, pieces_remaining=3),
+        # Multiple pieces, none sold
+        dict(title='Plates', status=ItemStatus.WON,
+             purchase_price=Decimal('30.00'), multiple_pieces=True, pieces_total=10),
+    ], commit=False)
+
+    db.session.add(ItemExpense(item_id=items[0].id, description='Hauling',
+                               amount=Decimal('15.00'), date=date(2025, 6, 2)))
+    db.session.add(ItemExpense(item_id=items[4].id, description='Glue',
+                               amount=Decimal('6.00'), date=date(2025, 6, 2)))
+    db.session.add(ItemSale(item_id=items[4].id, pieces_sold=3, sale_price_per_piece=Decimal('35.00'),
+                            total_sale_amount=Decimal('105.00'), sale_date=date(2025, 6, 20)))
+    db.session.commit()
+    return items
+
+
+@pytest.mark.parametrize('attr', [
+    'total_expenses', 'cost_per_piece', 'pieces_sold', 'total_piece_sales_revenue',
+    'gross_profit', 'net_profit', 'roi_percentage', 'break_even_price',
+])
+def test_sql_expression_matches_python(app_ctx, attr, seed_items):
+    from app import db
+    from models import Item
+
+    items = seed_profit_cases(seed_items)
+    rows = dict(db.session.execute(db.select(Item.id, getattr(Item, attr))).all())
+
+    for item in items:
+        expected = getattr(item, attr)
+        actual = rows[item.id]
+        if expected is None:
+            assert actual is None, f'{item.title}: {actual!r}'
+        else:
+            assert actual is not None, item.title
+            assert float(actual) == pytest.approx(expected), item.title
+
+
+def test_filter_and_order_by_profit_in_sql(app_ctx, seed_items):
+    from models import Item
+
+    seed_profit_cases(seed_items)
+    top = Item.query.filter(Item.net_profit.isnot(None)).order_by(Item.net_profit.desc()).limit(1).one()
+    assert top.title == 'Table'
+
+    high_roi = Item.query.filter(Item.roi_percentage > 50).order_by(Item.title).all()
+    assert [item.title for item in high_roi] == ['Chairs', 'Table']
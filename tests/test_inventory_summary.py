@@ -0,0 +1,54 @@
+"""
+Tests for the inventory page's aggregate summary
+"""
+import re
+from datetime import date
+from decimal import Decimal
+
+
+def seed_inventory(seed_items, count):
+    from app import db
+    from models import ItemExpense, ItemStatus
+
+    won = [dict(title=f'Won {i}', status=ItemStatus.WON, purchase_price=Decimal('100.00'),
+                refurb_cost=Decimal('10.00'), target_resale_price=Decimal('200.00')) for i in range(count)]
+    # Not inventory, must not be counted
+    listed = dict(title='Listed', status=ItemStatus.LISTED,
+                  purchase_price=Decimal('999.00'), target_resale_price=Decimal('999.00'))
+    items = seed_items(won + [listed], commit=False)
+    for item in items[:count]:
+        db.session.add_all([
+            ItemExpense(item_id=item.id, description='Hauling', amount=Decimal('5.00'), date=date(2025, 6, 2)),
+            ItemExpense(item_id=item.id, description='Parts', amount=Decimal('2.50'), date=date(2025, 6, 3)),
+        ])
+    db.session.commit()
+
+
+def test_inventory_totals_include_itemized_expenses(client, seed_items):
+    seed_inventory(seed_items, 25)
+
+    response = client.get('/items/inventory')
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+
+    # 25 x (100 + 10 + 7.50) invested, 25 x 200 target
+    assert '$2937.50' in html
+    assert '$5000.00' in html
+    assert '$2062.50' in html
+    assert '<h5 class="card-title">25</h5>' in html
+
+    # Rows are paged; the totals still cover every item
+    assert 'Older' in html
+    assert len(re.findall(r'Won \d+\s*</a>', html)) == 20
+
+
+def test_inventory_totals_read_the_cached_expense_column(client, seed_items):
+    from tests.test_query_counts import count_queries
+
+    seed_inventory(seed_items, 3)
+    with count_queries() as statements:
+        response = client.get('/items/inventory')
+    assert '$352.50' in response.get_data(as_text=True)
+    summary = [s for s in statements if 'sum(' in s.lower() and 'target_resale_price' in s]
+    assert len(summary) == 1
+    assert 'item_expense' not in summary[0]
@@ -0,0 +1,106 @@
+"""
+Tests for the monthly_rollup table behind the profit trend charts
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from tests.test_cash_events import seed_sold_item
+
+
+def rollups():
+    from models import MonthlyRollup
+    return {r.month: (r.revenue, r.net_profit, r.items_sold, r.fees, r.expenses)
+            for r in MonthlyRollup.query.order_by(MonthlyRollup.month)}
+
+
+def test_rollup_follows_sales_and_expenses(app_ctx, seed_items):
+    seed_sold_item(seed_items)
+
+    # 250 sale - 100 purchase - 20 refurb - 15 expense - 25 fees - 10 shipping
+    assert rollups() == {
+        date(2025, 6, 1): (Decimal('250.00'), Decimal('80.00'), 1, Decimal('25.00'), Decimal('15.00')),
+    }
+
+
+def test_rollup_updates_incrementally(app_ctx, seed_items):
+    from app import db
+    from models import ItemExpense
+
+    item = seed_sold_item(seed_items)
+
+    # A later expense lowers the sale month's profit and is counted in its own month
+    db.session.add(ItemExpense(item_id=item.id, description='Polish', amount=Decimal('5.00'),
+                               date=date(2025, 7, 2)))
+    db.session.commit()
+    assert rollups()[date(2025, 6, 1)][1] == Decimal('75.00')
+    assert rollups()[date(2025, 7, 1)] == (0, 0, 0, 0, Decimal('5.00'))
+
+    # Moving the sale moves revenue and profit out of June
+    item.sale_date = date(2025, 8, 3)
+    db.session.commit()
+    assert rollups()[date(2025, 6, 1)] == (0, 0, 0, 0, Decimal('15.00'))
+    assert rollups()[date(2025, 8, 1)][:3] == (Decimal('250.00'), Decimal('75.00'), 1)
+
+    db.session.delete(item)
+    db.session.commit()
+    assert rollups() == {}
+
+
+def test_bulk_actions_refresh_rollups(app_ctx, seed_items):
+    from app import db
+    from models import ItemStatus, bulk_update_item_status, bulk_delete_items
+
+    item = seed_sold_item(seed_items)
+
+    bulk_update_item_status([item.id], ItemStatus.LISTED)
+    db.session.commit()
+    assert rollups() == {date(2025, 6, 1): (0, 0, 0, 0, Decimal('15.00'))}
+
+    bulk_delete_items([item.id])
+    db.session.commit()
+    assert rollups() == {}
+
+
+def test_rebuild_matches_incremental(app_ctx, seed_items):
+    from app import db
+    from models import MonthlyRollup, refresh_monthly_rollups
+
+    seed_sold_item(seed_items)
+    expected = rollups()
+
+    db.session.query(MonthlyRollup).delete()
+    refresh_monthly_rollups(db.session)
+    db.session.commit()
+
+    assert rollups() == expected
+
+    # Existing rows are updated in place; rows for months without activity go
+    db.session.add(MonthlyRollup(month=date(2024, 1, 1), items_sold=3))
+    db.session.query(MonthlyRollup).filter_by(month=date(2025, 6, 1)).update({'revenue': 1})
+    db.session.commit()
+    refresh_monthly_rollups(db.session, [date(2025, 6, 1)])
+    refresh_monthly_rollups(db.session)
+    db.session.commit()
+    assert rollups() == expected
+
+
+def test_trends_read_last_twelve_months(app_ctx, seed_items):
+    from app import db
+    from models import month_start
+    from blueprints.reports import get_monthly_profit_trends
+
+    item = seed_sold_item(seed_items)
+    this_month = month_start(datetime.now().date())
+    item.sale_date = this_month
+    db.session.commit()
+
+    assert get_monthly_profit_trends() == [{
+        'month': this_month.strftime('%B %Y'),
+        'revenue': 250.0,
+        'profit': 80.0,
+        'items': 1,
+    }]
+
+    item.sale_date = date(this_month.year - 1, this_month.month, 1)
+    db.session.commit()
+    assert get_monthly_profit_trends() == []
@@ -0,0 +1,89 @@
+"""
+Unit tests for keyset pagination helpers
+"""
+from datetime import datetime, timedelta
+from utils.pagination import encode_cursor, decode_cursor, paginate_keyset
+
+
+def make_items(seed_items, count):
+    base = datetime(2025, 6, 1, 12, 0, 0)
+    # Pairs share a timestamp so the id tie-breaker is exercised
+    seed_items(count, updated_at=lambda i: base + timedelta(minutes=i // 2))
+
+
+class TestCursorEncoding:
+    """Test cursor token round-trips"""
+
+    def test_round_trip(self):
+        stamp = datetime(2025, 6, 25, 14, 6, 50, 123456)
+        assert decode_cursor(encode_cursor(stamp, 42)) == (stamp, 42)
+
+    def test_invalid_tokens(self):
+        assert decode_cursor(None) is None
+        assert decode_cursor('') is None
+        assert decode_cursor('not-a-cursor') is None
+
+
+class TestPaginateKeyset:
+    """Test paging through items newest-first"""
+
+    def test_walks_every_row_once(self, app_ctx, seed_items):
+        from models import Item
+        make_items(seed_items, 45)
+
+        seen = []
+        after = None
+        pages = 0
+        while True:
+            page = paginate_keyset(Item.query, Item.updated_at, Item.id, per_page=20, after=after)
+            seen.extend(item.id for item in page.items)
+            pages += 1
+            if not page.has_next:
+                break
+            after = page.next_cursor
+
+        expected = [item.id for item in Item.query.order_by(Item.updated_at.desc(), Item.id.desc())]
+        assert pages == 3
+        assert seen == expected
+
+    def test_prev_returns_previous_page(self, app_ctx, seed_items):
+        from models import Item
+        make_items(seed_items, 45)
+
+        first = paginate_keyset(Item.query, Item.updated_at, Item.id, per_page=20)
+        assert not first.has_prev
+
+        second = paginate_keyset(Item.query, Item.updated_at, Item.id, per_page=20,
+                                 after=first.next_cursor)
+        assert second.has_prev
+
+        back = paginate_keyset(Item.query, Item.updated_at, Item.id, per_page=20,
+                               before=second.prev_cursor)
+        assert [i.id for i in back.items] == [i.id for i in first.items]
+        assert not back.has_prev
+        assert back.has_next
+
+    def test_index_view_paginates(self, client, seed_items):
+        make_items(seed_items, 25)
+        response = client.get('/items/')
+        assert response.status_code == 200
+        assert b'Older' in response.data
+        # The header counts every matching item, not just this page
+        assert b'<span id="itemsCount">25</span>' in response.data
+
+    def test_rows_fragment_skips_page_chrome(self, client, seed_items):
+        from tests.test_query_counts import count_queries
+        make_items(seed_items, 25)
+
+        with count_queries() as statements:
+            response = client.get('/items/rows?status=watch&auction=all')
+        assert response.status_code == 200
+        assert b'<html' not in response.data
+        assert response.data.count(b'class="form-check-input item-checkbox"') == 20
+        assert b'hx-swap-oob' in response.data
+        assert b'<span id="itemsCount" hx-swap-oob="true">25</span>' in response.data
+        assert response.headers['HX-Push-Url'] == '/items/?status=watch&auction=all'
+        assert not any('FROM auction ORDER BY' in s for s in statements)
+
+        response = client.get('/items/rows?status=sold')
+        assert b'No items found' in response.data
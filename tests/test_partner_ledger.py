@@ -0,0 +1,163 @@
+"""
+Tests for the partner ledger
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from tests.test_query_counts import seed_sold_items, count_queries
+
+
+def ledger(partner_id):
+    from models import PartnerLedgerEntry
+    return [(e.kind, e.amount, e.balance) for e in
+            PartnerLedgerEntry.query.filter_by(partner_id=partner_id).order_by(PartnerLedgerEntry.id)]
+
+
+def test_sales_and_later_changes_post_accruals_and_adjustments(app_ctx, seed_items):
+    from app import db
+    from models import Item, ItemExpense, ItemPartner, ItemStatus, Partner, bulk_delete_items
+
+    seed_sold_items(seed_items, 1)
+    pat = Partner.query.filter_by(name='Pat').first()
+    item = Item.query.first()
+    share = Decimal(str(item.net_profit)) / 2
+
+    assert ledger(pat.id) == [('accrual', share, share)]
+
+    # An expense after the sale reduces the share
+    db.session.add(ItemExpense(item_id=item.id, description='Shipping', amount=Decimal('10.00'),
+                               date=date(2025, 6, 21)))
+    db.session.commit()
+    reduced = Decimal(str(item.net_profit)) / 2
+    assert reduced < share
+    assert ledger(pat.id)[-1] == ('adjustment', reduced - share, reduced)
+
+    # Saves that don't change the share post nothing
+    item.notes = 'Buyer picked up'
+    db.session.commit()
+    assert len(ledger(pat.id)) == 2
+
+    # Changing the share, then unselling, reverses down to zero
+    ItemPartner.query.filter_by(item_id=item.id).one().pct_share = Decimal('25')
+    db.session.commit()
+    item.status = ItemStatus.LISTED
+    db.session.commit()
+    assert ledger(pat.id)[-1][2] == 0
+
+    # Deleting a sold item reverses what was owed on it
+    item.status = ItemStatus.SOLD
+    db.session.commit()
+    assert ledger(pat.id)[-1][2] > 0
+    bulk_delete_items([item.id])
+    db.session.commit()
+    kind, amount, balance = ledger(pat.id)[-1]
+    assert (kind, balance) == ('adjustment', 0)
+
+
+def test_payouts_balances_and_statements(app_ctx, seed_items):
+    from app import db
+    from models import Partner, PartnerLedgerEntry
+    from utils.partner_ledger import get_partner_balances, get_partner_statement, record_payout
+
+    seed_sold_items(seed_items, 3)
+    pat = Partner.query.filter_by(name='Pat').first()
+    earned = get_partner_balances()[pat.id]
+
+    record_payout(pat.id, '20', date(2025, 7, 1), 'Check 101')
+    db.session.commit()
+    for bad_amount in ('-5', 'NaN', 'sNaN', 'Infinity', '100000000'):
+        with pytest.raises(ValueError, match='amount'):
+            record_payout(pat.id, bad_amount)
+
+    assert get_partner_balances([pat.id]) == {pat.id: pytest.approx(earned - 20)}
+
+    # Accruals are dated by the sale, so the statement period splits them from the payout
+    assert {e.entry_date for e in PartnerLedgerEntry.query.filter_by(kind='accrual')} == {date(2025, 6, 20)}
+
+    statement = get_partner_statement(pat.id, date(2025, 6, 25), date(2025, 7, 31))
+    assert statement['opening_balance'] == pytest.approx(earned)
+    assert [e['description'] for e in statement['entries']] == ['Check 101']
+    assert statement['paid'] == pytest.approx(20)
+    assert statement['closing_balance'] == pytest.approx(earned - 20)
+
+    with count_queries() as queries:
+        get_partner_statement(pat.id, date(2025, 6, 25), date(2025, 7, 31))
+    assert len(queries) == 2
+
+
+def test_backdated_entries_carry_later_balances_forward(app_ctx, seed_items):
+    from app import db
+    from models import Item, ItemPartner, ItemStatus, Partner, PartnerLedgerEntry
+    from utils.partner_ledger import get_partner_balances, get_partner_statement, record_payout
+
+    seed_sold_items(seed_items, 2)
+    pat = Partner.query.filter_by(name='Pat').first()
+    earned = get_partner_balances()[pat.id]
+
+    # Paid before the sales, recorded after them
+    record_payout(pat.id, '20', date(2025, 6, 1))
+    db.session.commit()
+    assert get_partner_balances()[pat.id] == pytest.approx(earned - 20)
+    early = get_partner_statement(pat.id, date(2025, 6, 1), date(2025, 6, 10))
+    assert early['closing_balance'] == pytest.approx(-20)
+
+    # A sale entered late is accrued on its sale date, ahead of later entries
+    record_payout(pat.id, '5', date(2025, 7, 1))
+    late = Item(auction_id=Item.query.first().auction_id, title='Late sale', status=ItemStatus.SOLD,
+                purchase_price=Decimal('10.00'), sale_price=Decimal('50.00'), sale_date=date(2025, 6, 5))
+    db.session.add(late)
+    db.session.flush()
+    db.session.add(ItemPartner(item_id=late.id, partner_id=pat.id, pct_share=Decimal('50')))
+    db.session.commit()
+    accrual = PartnerLedgerEntry.query.filter_by(item_id=late.id).one()
+    assert (accrual.kind, accrual.entry_date, accrual.balance) == ('accrual', date(2025, 6, 5), Decimal('0.00'))
+
+    entries = PartnerLedgerEntry.query.filter_by(partner_id=pat.id).order_by(
+        PartnerLedgerEntry.entry_date, PartnerLedgerEntry.id).all()
+    running = Decimal('0')
+    for entry in entries:
+        running += entry.amount
+        assert entry.balance == running
+    assert get_partner_balances()[pat.id] == pytest.approx(float(running))
+    statement = get_partner_statement(pat.id, date(2025, 6, 2), date(2025, 6, 30))
+    assert statement['opening_balance'] == pytest.approx(-20)
+    assert statement['closing_balance'] == pytest.approx(
+        statement['opening_balance'] + statement['accrued'] - statement['paid'])
+
+
+def test_rebuild_keeps_payouts_and_dates_accruals_by_sale(app_ctx, seed_items):
+    from app import db
+    from models import Partner, PartnerLedgerEntry, rebuild_partner_ledger
+    from utils.partner_ledger import get_partner_balances, record_payout
+
+    seed_sold_items(seed_items, 2)
+    pat = Partner.query.filter_by(name='Pat').first()
+    record_payout(pat.id, '15', date(2025, 6, 30))
+    db.session.commit()
+    before = get_partner_balances()[pat.id]
+
+    rebuild_partner_ledger(db.session)
+    db.session.commit()
+
+    entries = PartnerLedgerEntry.query.order_by(PartnerLedgerEntry.id).all()
+    assert [e.kind for e in entries] == ['accrual', 'accrual', 'payout']
+    assert entries[0].entry_date == date(2025, 6, 20)
+    assert get_partner_balances()[pat.id] == pytest.approx(before)
+
+
+def test_partner_page_shows_statement_and_records_payout(client, seed_items):
+    from models import Partner
+
+    seed_sold_items(seed_items, 1)
+    pat = Partner.query.filter_by(name='Pat').first()
+
+    response = client.post(f'/partners/{pat.id}/payouts', data={'amount': '12.50', 'note': 'Venmo'})
+    assert response.status_code == 302
+
+    today = date.today()
+    page = client.get(f'/partners/{pat.id}/view?start_date={today - timedelta(days=7)}&end_date={today}')
+    assert b'Venmo' in page.data
+    assert b'Closing balance' in page.data
+    assert b'Balance Owed' in page.data
@@ -0,0 +1,178 @@
+"""
+Tests for batch partner statements
+"""
+import io
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from tests.test_query_counts import seed_sold_items, count_queries
+
+JUNE = (date(2025, 6, 1), date(2025, 6, 30))
+
+
+def add_partner(name, email=None):
+    """A second partner sharing every existing item"""
+    from app import db
+    from models import Item, ItemPartner, Partner
+
+    partner = Partner(name=name, email=email)
+    db.session.add(partner)
+    db.session.flush()
+    for item in Item.query:
+        db.session.add(ItemPartner(item_id=item.id, partner_id=partner.id, pct_share=Decimal('25')))
+    db.session.commit()
+    return partner
+
+
+class FakeEmailService:
+    def __init__(self):
+        self.sent = []
+
+    def send_email(self, to_emails, subject, body, attachments=None):
+        self.sent.append((to_emails, subject, attachments))
+        return True
+
+
+def test_statements_come_from_one_shared_query(app_ctx, seed_items):
+    from utils.partner_statements import collect_partner_statements
+
+    seed_sold_items(seed_items, 2)
+    add_partner('Robin', 'robin@example.com')
+    with count_queries() as small:
+        collect_partner_statements(*JUNE)
+
+    seed_sold_items(seed_items, 6)
+    add_partner('Sam')
+    with count_queries() as large:
+        statements = collect_partner_statements(*JUNE)
+    assert len(large) == len(small)
+
+    # seed_sold_items adds another Pat each time; Sam shares every item
+    assert sorted(statement['name'] for statement in statements) == ['Pat', 'Pat', 'Robin', 'Sam']
+    sam = next(statement for statement in statements if statement['name'] == 'Sam')
+    assert len(sam['rows']) == 8
+    assert sam['total'] == pytest.approx(sum(row['share'] for row in sam['rows']))
+    assert sam['balance'] == pytest.approx(sam['total'])
+
+    # Partners still owed money get a statement for a period without sales
+    july = collect_partner_statements(date(2025, 7, 1), date(2025, 7, 31))
+    assert sorted(statement['name'] for statement in july) == ['Pat', 'Pat', 'Robin', 'Sam']
+    assert all(statement['rows'] == [] and statement['balance'] > 0 for statement in july)
+
+
+def test_partners_paid_or_owed_without_sales_get_statements(app_ctx, seed_items):
+    from app import db
+    from models import Partner
+    from utils.partner_ledger import record_payout
+    from utils.partner_statements import collect_partner_statements, render_partner_statements
+
+    seed_sold_items(seed_items, 1)
+    pat = Partner.query.filter_by(name='Pat').first()
+    record_payout(pat.id, '10', date(2025, 7, 15))
+    idle = Partner(name='Idle')
+    db.session.add(idle)
+    db.session.commit()
+
+    statements = collect_partner_statements(date(2025, 7, 1), date(2025, 7, 31))
+    assert [(s['name'], s['rows'], s['total']) for s in statements] == [('Pat', [], 0.0)]
+    assert statements[0]['balance'] > 0
+
+    rendered = render_partner_statements(statements, workers=1)[0]
+    assert rendered['chart'] is None
+    assert 'Balance owed:' in rendered['csv'].decode('utf-8')
+
+
+def test_rendered_in_worker_processes_match_in_process(app_ctx, seed_items):
+    from utils.partner_statements import collect_partner_statements, render_partner_statements
+
+    seed_sold_items(seed_items, 3)
+    add_partner('Robin')
+    statements = collect_partner_statements(*JUNE)
+
+    local = render_partner_statements(statements, workers=1)
+    pooled = render_partner_statements(statements, workers=2)
+    assert [s['csv'] for s in pooled] == [s['csv'] for s in local]
+    assert all(s['chart'].startswith(b'\x89PNG') for s in pooled)
+
+    text = local[0]['csv'].decode('utf-8')
+    assert text.startswith('Sale Date,Item Title')
+    assert 'Item 2' in text
+    assert local[0]['filename'] == 'Pat_statement_20250601_20250630'
+
+
+def _startup_created_tables():
+    from app import app, db
+
+    with app.app_context():
+        return db.inspect(db.engine).has_table('report_job')
+
+
+def test_worker_processes_skip_startup_database_work():
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # A spawned worker imports the app afresh, on its own in-memory database
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        assert pool.submit(_startup_created_tables).result() is False
+
+
+@pytest.fixture
+def job_client(client, tmp_path):
+    client.application.config.update(REPORT_JOB_EXECUTOR='inline', REPORT_JOB_DIR=str(tmp_path),
+                                      PARTNER_STATEMENT_WORKERS=1)
+    yield client
+    client.application.config.update(REPORT_JOB_EXECUTOR='thread', REPORT_JOB_DIR=None,
+                                      PARTNER_STATEMENT_WORKERS=0)
+
+
+def test_zip_bundle_and_emails(job_client, monkeypatch, seed_items):
+    import utils.email_service
+    from utils.partner_statements import (collect_partner_statements, render_partner_statements,
+                                          email_partner_statements)
+
+    client = job_client
+    seed_sold_items(seed_items, 2)
+    add_partner('Robin', 'robin@example.com')
+
+    # Rendering and sending run in report jobs, not the request
+    job = client.post('/reports/send-partner-report',
+                      data={'delivery': 'zip', 'start_date': '2025-06-01', 'end_date': '2025-06-30'})
+    assert job.status_code == 202
+    response = client.get(job.get_json()['download_url'])
+    assert response.mimetype == 'application/zip'
+    names = zipfile.ZipFile(io.BytesIO(response.data)).namelist()
+    assert 'Robin_statement_20250601_20250630.csv' in names
+    assert 'Pat_statement_20250601_20250630.png' in names
+
+    service = FakeEmailService()
+    rendered = render_partner_statements(collect_partner_statements(*JUNE), workers=1)
+    result = email_partner_statements(rendered, service)
+    assert result == {'sent': ['Robin'], 'skipped': ['Pat'], 'failed': []}
+    to_emails, subject, attachments = service.sent[0]
+    assert to_emails == ['robin@example.com']
+    assert [a['type'] for a in attachments] == ['csv', 'image']
+
+    services = []
+
+    class RecordingEmailService(FakeEmailService):
+        def __init__(self):
+            super().__init__()
+            services.append(self)
+
+    monkeypatch.setattr(utils.email_service, 'EmailService', RecordingEmailService)
+    data = {'delivery': 'email', 'start_date': '2025-06-01', 'end_date': '2025-06-30'}
+    for _ in range(2):
+        job = client.post('/reports/send-partner-report', data=data)
+        assert job.status_code == 202
+        outcome = client.get(job.get_json()['download_url']).get_json()
+        assert outcome['success']
+        assert outcome['sent'] == ['Robin']
+        assert 'no email address for Pat' in outcome['message']
+    # A repeated request sends again
+    assert [len(service.sent) for service in services] == [1, 1]
+
+    assert client.post('/reports/send-partner-report', data={'delivery': 'fax'}).status_code == 400
+    assert client.post('/reports/send-partner-report', data={'start_date': 'June'}).status_code == 400
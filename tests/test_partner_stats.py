@@ -0,0 +1,79 @@
+"""
+Tests for the shared partner statistics query
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from tests.test_query_counts import seed_sold_items, queries_for
+
+
+def seed_pending_items():
+    """A won item worth estimating, one that would lose money, and a partner with no items"""
+    from app import db
+    from models import Auction, Item, ItemPartner, ItemStatus, Partner
+
+    pat = Partner.query.filter_by(name='Pat').first()
+    auction = Auction.query.first()
+    won = Item(auction_id=auction.id, title='Clock', status=ItemStatus.WON, purchase_price=Decimal('40.00'),
+               refurb_cost=Decimal('10.00'), target_resale_price=Decimal('150.00'))
+    loser = Item(auction_id=auction.id, title='Chair', status=ItemStatus.LISTED, purchase_price=Decimal('90.00'),
+                 target_resale_price=Decimal('80.00'))
+    db.session.add_all([won, loser, Partner(name='Quinn')])
+    db.session.flush()
+    db.session.add_all([ItemPartner(item_id=won.id, partner_id=pat.id, pct_share=Decimal('25')),
+                        ItemPartner(item_id=loser.id, partner_id=pat.id, pct_share=Decimal('25'))])
+    db.session.commit()
+    return pat
+
+
+def test_stats_match_per_partnership_calculation(app_ctx, seed_items):
+    from models import Partner
+    from utils.partner_stats import get_partner_stats
+
+    seed_sold_items(seed_items, 4)
+    pat = seed_pending_items()
+    quinn = Partner.query.filter_by(name='Quinn').first()
+
+    stats = get_partner_stats()
+    expected_earnings = sum(p.calculate_partner_share() or 0 for p in pat.item_partnerships
+                            if p.item.status.value == 'sold')
+
+    assert stats[pat.id]['total_items'] == 6
+    assert stats[pat.id]['sold_items'] == 4
+    assert stats[pat.id]['total_earnings'] == pytest.approx(expected_earnings, abs=0.01)
+    # (150 - 40 - 10) less 15% for fees, times a 25% share; the chair would lose money
+    assert stats[pat.id]['pending_earnings'] == pytest.approx(21.25)
+    assert stats[quinn.id] == {'total_items': 0, 'sold_items': 0, 'total_earnings': 0.0,
+                               'pending_earnings': 0.0}
+
+    assert list(get_partner_stats([quinn.id])) == [quinn.id]
+
+
+def test_recent_sales_are_newest_first_and_limited(app_ctx, seed_items):
+    from app import db
+    from models import Item, Partner
+    from utils.partner_stats import get_recent_partner_sales
+
+    seed_sold_items(seed_items, 7)
+    for day, item in enumerate(Item.query.order_by(Item.id), start=1):
+        item.sale_date = date(2025, 6, day)
+    db.session.commit()
+
+    pat = Partner.query.filter_by(name='Pat').first()
+    sales = get_recent_partner_sales()[pat.id]
+    assert [sale['item']['sale_date'].day for sale in sales] == [7, 6, 5, 4, 3]
+    assert sales[0]['percentage'] == Decimal('50.00')
+
+
+@pytest.mark.parametrize('url', ['/partners/', '/partners/earnings', '/reports/partner-report'])
+def test_partner_pages_query_count_independent_of_items(client, url, seed_items):
+    seed_sold_items(seed_items, 2)
+    small = queries_for(client, url)
+
+    seed_sold_items(seed_items, 15)
+    assert queries_for(client, url) == small
+
+    response = client.get(url)
+    assert b'Pat' in response.data
@@ -0,0 +1,79 @@
+"""
+Tests for the aggregated profit analysis report
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from tests.test_query_counts import seed_sold_items, queries_for
+
+
+def python_figures():
+    """The report figures computed item by item from the live hybrid properties"""
+    from models import Item, ItemStatus
+
+    sold = Item.query.filter_by(status=ItemStatus.SOLD).all()
+    rois = [item.roi_percentage for item in sold if item.roi_percentage]
+    return {
+        'count': len(sold),
+        'revenue': sum(float(item.sale_price) for item in sold if item.sale_price),
+        'investment': sum(float(item.purchase_price) + float(item.refurb_cost or 0)
+                          for item in sold if item.purchase_price),
+        'profit': sum(item.net_profit for item in sold if item.net_profit),
+        'avg_roi': sum(rois) / len(rois),
+    }
+
+
+def test_summary_matches_item_properties(app_ctx, seed_items):
+    from app import db
+    from models import Auction, Item, ItemStatus
+    from blueprints.reports import get_profit_summary
+
+    seed_sold_items(seed_items, 6)
+    other = Auction(title='Barn Find', date=date(2025, 7, 1))
+    db.session.add(other)
+    db.session.flush()
+    db.session.add(Item(auction_id=other.id, title='Lamp', status=ItemStatus.SOLD,
+                        purchase_price=Decimal('20.00'), sale_price=Decimal('45.00'),
+                        sale_date=date(2025, 7, 4)))
+    db.session.add(Item(auction_id=other.id, title='Unsold chair', status=ItemStatus.LISTED,
+                        purchase_price=Decimal('30.00')))
+    db.session.commit()
+
+    totals, breakdown = get_profit_summary()
+    expected = python_figures()
+
+    assert totals['count'] == expected['count']
+    assert totals['revenue'] == pytest.approx(expected['revenue'])
+    assert totals['investment'] == pytest.approx(expected['investment'])
+    assert totals['profit'] == pytest.approx(expected['profit'])
+    assert totals['roi_total'] / totals['roi_count'] == pytest.approx(expected['avg_roi'], abs=0.01)
+
+    assert list(breakdown) == ['Barn Find', 'Estate Sale']
+    assert breakdown['Barn Find']['count'] == 1
+    assert breakdown['Barn Find']['profit'] == pytest.approx(25.0)
+    assert breakdown['Estate Sale']['count'] == 6
+
+
+def test_top_performers_ranked_in_database(app_ctx, seed_items):
+    from blueprints.reports import get_top_performers
+
+    seed_sold_items(seed_items, 12)
+    top = get_top_performers()
+
+    assert len(top) == 10
+    profits = [item['net_profit'] for item in top]
+    assert profits == sorted(profits, reverse=True)
+    assert top[0]['auction_title'] == 'Estate Sale'
+
+
+def test_page_renders_with_fixed_query_count(client, seed_items):
+    seed_sold_items(seed_items, 3)
+    small = queries_for(client, '/reports/profit-analysis')
+    seed_sold_items(seed_items, 20)
+    assert queries_for(client, '/reports/profit-analysis') == small
+
+    response = client.get('/reports/profit-analysis')
+    assert response.status_code == 200
+    assert b'Estate Sale' in response.data
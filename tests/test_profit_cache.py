@@ -0,0 +1,94 @@
+"""
+Tests for the write-maintained profit columns on Item
+"""
+from datetime import date, datetime
+from decimal import Decimal
+import pytest
+
+
+def make_item(seed_items, **kwargs):
+    from models import ItemStatus
+
+    fields = dict(title='Table', status=ItemStatus.SOLD,
+                  purchase_price=Decimal('100.00'), sale_price=Decimal('200.00'))
+    fields.update(kwargs)
+    return seed_items(**fields)[0]
+
+
+def cached(item_id):
+    from app import db
+    from models import Item
+
+    db.session.expire_all()
+    return db.session.get(Item, item_id)
+
+
+def test_new_item_is_cached(app_ctx, seed_items):
+    item = make_item(seed_items)
+    row = cached(item.id)
+    assert float(row.net_profit_cached) == pytest.approx(100.0)
+    assert float(row.roi_cached) == pytest.approx(100.0)
+
+
+def test_expense_changes_refresh_cache(app_ctx, seed_items):
+    from app import db
+    from models import ItemExpense
+
+    item = make_item(seed_items)
+    expense = ItemExpense(item_id=item.id, description='Hauling', amount=Decimal('20.00'), date=date(2025, 6, 2))
+    db.session.add(expense)
+    db.session.commit()
+
+    row = cached(item.id)
+    assert float(row.total_expenses_cached) == pytest.approx(20.0)
+    assert float(row.net_profit_cached) == pytest.approx(80.0)
+
+    db.session.delete(db.session.get(ItemExpense, expense.id))
+    db.session.commit()
+
+    row = cached(item.id)
+    assert float(row.total_expenses_cached) == pytest.approx(0.0)
+    assert float(row.net_profit_cached) == pytest.approx(100.0)
+
+
+def test_piece_sales_and_price_edits_refresh_cache(app_ctx, seed_items):
+    from app import db
+    from models import ItemSale
+
+    item = make_item(seed_items, sale_price=None, multiple_pieces=True, pieces_total=4, pieces_remaining=4)
+    db.session.add(ItemSale(item_id=item.id, pieces_sold=2, sale_price_per_piece=Decimal('40.00'),
+                            total_sale_amount=Decimal('80.00'), sale_date=date(2025, 6, 20)))
+    db.session.commit()
+
+    row = cached(item.id)
+    assert row.pieces_sold_cached == 2
+    assert float(row.piece_revenue_cached) == pytest.approx(80.0)
+    assert float(row.net_profit_cached) == pytest.approx(30.0)
+
+    row.purchase_price = Decimal('60.00')
+    db.session.commit()
+    assert float(cached(item.id).net_profit_cached) == pytest.approx(50.0)
+
+
+def test_refresh_preserves_updated_at(app_ctx, seed_items):
+    from app import db
+    from models import refresh_item_profit_cache
+
+    stamp = datetime(2025, 1, 1, 9, 30)
+    item = make_item(seed_items, updated_at=stamp)
+    refresh_item_profit_cache(db.session, [item.id])
+    db.session.commit()
+    assert cached(item.id).updated_at == stamp
+
+
+def test_recompute_profits_command(app_ctx, seed_items):
+    from app import db
+    from models import Item
+
+    item = make_item(seed_items)
+    db.session.execute(Item.__table__.update().values(net_profit_cached=None))
+    db.session.commit()
+
+    result = app_ctx.test_cli_runner().invoke(args=['recompute-profits', '--batch-size', '1'])
+    assert 'Recomputed cached profits for 1 items.' in result.output
+    assert float(cached(item.id).net_profit_cached) == pytest.approx(100.0)
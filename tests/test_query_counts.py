@@ -0,0 +1,103 @@
+"""
+Query-count regression tests for item list pages and exports
+"""
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+import pytest
+from sqlalchemy import event
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed inside the block"""
+    from app import db
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def seed_sold_items(seed_items, count):
+    """Create sold items with expenses, piece sales and a partner share each"""
+    from app import db
+    from models import ItemExpense, ItemSale, ItemPartner, Partner, ItemStatus
+
+    partner = Partner(name='Pat')
+    db.session.add(partner)
+
+    items = seed_items(count, commit=False, lot_number=lambda i: str(i),
+                       status=ItemStatus.SOLD, purchase_price=Decimal('100.00'),
+                       refurb_cost=Decimal('10.00'), sale_price=Decimal('200.00'),
+                       sale_date=date(2025, 6, 20), multiple_pieces=lambda i: i % 2 == 0,
+                       pieces_total=lambda i: 4 if i % 2 == 0 else None)
+    for item in items:
+        db.session.add(ItemExpense(item_id=item.id, description='Hauling',
+                                   amount=Decimal('5.00'), date=date(2025, 6, 2)))
+        db.session.add(ItemPartner(item_id=item.id, partner_id=partner.id, pct_share=Decimal('50')))
+        if item.multiple_pieces:
+            db.session.add(ItemSale(item_id=item.id, pieces_sold=2, sale_price_per_piece=Decimal('60.00'),
+                                    total_sale_amount=Decimal('120.00'), sale_date=date(2025, 6, 20)))
+    db.session.commit()
+
+
+def queries_for(client, url):
+    from flask import g
+    from app import db
+
+    # Start each request cold: nothing cached in the session or the login manager
+    db.session.expire_all()
+    g.pop('_login_user', None)
+    with count_queries() as statements:
+        response = client.get(url)
+        # Streamed exports query while the body is read
+        response.get_data()
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('url', [
+    '/items/',
+    '/items/sold',
+    '/items/export-inventory',
+    '/reports/profit-analysis',
+    '/reports/export/profit-analysis',
+    '/auctions/',
+])
+def test_query_count_independent_of_row_count(client, url, seed_items):
+    """Rendering 5 or 30 rows must issue the same number of statements"""
+    seed_sold_items(seed_items, 5)
+    small = queries_for(client, url)
+
+    seed_sold_items(seed_items, 25)
+    large = queries_for(client, url)
+
+    assert small == large
+
+
+@pytest.mark.parametrize('url', [
+    '/items/export-inventory',
+    '/reports/export/profit-analysis',
+    '/reports/export/cashflow?start_date=2000-01-01&end_date=2100-01-01',
+    '/partners/{partner_id}/earnings/export',
+])
+def test_exports_stream(client, url, seed_items):
+    """Exports are streamed responses with every row present"""
+    from models import Partner
+
+    seed_sold_items(seed_items, 12)
+    partner = Partner.query.first()
+
+    response = client.get(url.format(partner_id=partner.id))
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert response.get_data(as_text=True).count('Item 11') >= 1
+    assert len(response.get_data(as_text=True).splitlines()) > 12
@@ -0,0 +1,180 @@
+"""
+Tests for the versioned report cache
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from tests.test_query_counts import seed_sold_items, queries_for
+
+
+def version():
+    from app import db
+    from models import get_data_version
+    return get_data_version(db.session)
+
+
+def test_writes_bump_the_data_version(app_ctx, seed_items):
+    from app import db
+    from models import Item, ItemExpense, ItemStatus, User, bulk_update_item_status
+
+    seed_sold_items(seed_items, 2)
+    start = version()
+    assert start > 0
+
+    # Unrelated tables leave cached reports alone
+    db.session.add(User(id='someone'))
+    db.session.commit()
+    assert version() == start
+
+    item = Item.query.first()
+    db.session.add(ItemExpense(item_id=item.id, description='Tape', amount=Decimal('2.00'),
+                               date=date(2025, 6, 3)))
+    db.session.commit()
+    assert version() > start
+
+    # Bulk statements skip flush events but still count as writes
+    before = version()
+    bulk_update_item_status([item.id], ItemStatus.LISTED)
+    db.session.commit()
+    assert version() > before
+
+    # However many flushes a transaction makes, it bumps the version once
+    before = version()
+    for title in ('First', 'Second', 'Third'):
+        item.title = title
+        db.session.flush()
+    db.session.commit()
+    assert version() == before + 1
+
+    # Rolled back writes leave the committed version where it was
+    before = version()
+    item.title = 'Renamed'
+    db.session.flush()
+    db.session.rollback()
+    assert version() == before
+
+
+def test_reports_are_served_from_cache_until_data_changes(client, seed_items):
+    from app import db
+    from models import Item
+    from utils.report_cache import get_report_cache
+
+    seed_sold_items(seed_items, 3)
+    first = queries_for(client, '/reports/profit-analysis')
+    second = queries_for(client, '/reports/profit-analysis')
+    assert second < first
+
+    stats = get_report_cache().stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+    item = Item.query.first()
+    item.title = 'Renamed table'
+    db.session.commit()
+
+    response = client.get('/reports/profit-analysis')
+    assert b'Renamed table' in response.data
+    assert get_report_cache().stats()['misses'] == 2
+
+    assert client.get('/reports/cache-stats').get_json()['hits'] == 1
+
+
+def test_cashflow_params_are_normalized(client, seed_items):
+    from utils.report_cache import get_report_cache, normalize_params
+
+    assert normalize_params({'end_date': datetime(2025, 6, 30), 'start_date': date(2025, 6, 1), 'x': None}) == \
+        normalize_params({'start_date': ' 2025-06-01 ', 'end_date': '2025-06-30'})
+
+    seed_sold_items(seed_items, 1)
+    client.get('/reports/cashflow?start_date=2025-06-01&end_date=2025-06-30')
+    client.get('/reports/cashflow?end_date=2025-06-30&start_date=2025-06-01')
+    client.get('/reports/cashflow?start_date=2025-05-01&end_date=2025-06-30')
+
+    stats = get_report_cache().stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+
+def test_memory_backend_evicts_least_recently_used():
+    from utils.report_cache import MemoryBackend
+
+    backend = MemoryBackend(max_bytes=10)
+    backend.set('a', b'1234')
+    backend.set('b', b'1234')
+    backend.get('a')
+    backend.set('c', b'1234')
+
+    assert backend.get('b') is None
+    assert backend.get('a') == b'1234'
+    assert backend.stats()['evictions'] == 1
+
+    backend.set('huge', b'x' * 11)
+    assert backend.get('huge') is None
+
+
+def test_filesystem_backend_round_trip_and_eviction(tmp_path):
+    import os
+    from utils.report_cache import FileSystemBackend
+
+    backend = FileSystemBackend(str(tmp_path), max_bytes=10)
+    backend.set('a', b'1234')
+    backend.set('b', b'1234')
+    old = os.path.getmtime(backend._path('a')) - 60
+    os.utime(backend._path('a'), (old, old))
+    backend.set('c', b'1234')
+
+    assert backend.get('a') is None
+    assert backend.get('b') == b'1234'
+    assert backend.stats()['entries'] == 2
+
+    # Another worker sharing the directory sees the same entries
+    assert FileSystemBackend(str(tmp_path)).get('c') == b'1234'
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def scan_iter(self, match):
+        return [key for key in self.data if key.startswith(match.rstrip('*'))]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+def test_redis_backend_uses_prefixed_keys():
+    from utils.report_cache import RedisBackend
+
+    client = FakeRedis()
+    backend = RedisBackend('redis://unused', client=client)
+    backend.set('report:v1:abc', b'data')
+
+    assert backend.get('report:v1:abc') == b'data'
+    assert list(client.data) == ['mitch-quick:report:report:v1:abc']
+    backend.clear()
+    assert client.data == {}
+
+
+def test_backend_failures_fall_back_to_computing(app_ctx):
+    from utils.report_cache import ReportCache
+
+    class BrokenBackend:
+        name = 'broken'
+
+        def get(self, key):
+            raise ConnectionError('down')
+
+        def set(self, key, value):
+            raise ConnectionError('down')
+
+        def stats(self):
+            return {}
+
+    cache = ReportCache(BrokenBackend())
+    assert cache.get_or_compute('report', {}, lambda: 42) == 42
+    assert cache.stats()['errors'] == 2
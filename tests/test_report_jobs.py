@@ -0,0 +1,167 @@
+"""
+Tests for background report jobs
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from tests.test_query_counts import seed_sold_items
+
+
+@pytest.fixture
+def job_client(client, tmp_path):
+    client.application.config.update(REPORT_JOB_EXECUTOR='inline', REPORT_JOB_DIR=str(tmp_path))
+    yield client
+    client.application.config.update(REPORT_JOB_EXECUTOR='thread', REPORT_JOB_DIR=None)
+
+
+RANGE = {'start_date': '2025-01-01', 'end_date': '2025-12-31'}
+
+
+def test_export_job_returns_id_then_download(job_client, seed_items):
+    seed_sold_items(seed_items, 4)
+
+    response = job_client.post('/reports/jobs/cashflow_csv', data=RANGE)
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status'] == 'done'
+
+    status = job_client.get(job['status_url']).get_json()
+    assert status['job_id'] == job['job_id']
+
+    download = job_client.get(status['download_url'])
+    assert download.status_code == 200
+    assert download.mimetype == 'text/csv'
+    assert 'cashflow_report_2025-01-01_2025-12-31.csv' in download.headers['Content-Disposition']
+    text = download.get_data(as_text=True)
+    assert text.startswith('Date,')
+    assert 'Item 3' in text
+
+
+def test_results_are_reused_until_data_changes(job_client, seed_items):
+    from app import db
+    from models import Item, ReportJob
+
+    seed_sold_items(seed_items, 2)
+    first = job_client.post('/reports/jobs/profit_analysis_csv').get_json()['job_id']
+    again = job_client.post('/reports/jobs/profit_analysis_csv').get_json()['job_id']
+    assert again == first
+
+    other_range = job_client.post('/reports/jobs/cashflow_csv', data=RANGE).get_json()['job_id']
+    assert other_range != first
+
+    Item.query.first().title = 'Renamed'
+    db.session.commit()
+    fresh = job_client.post('/reports/jobs/profit_analysis_csv').get_json()['job_id']
+    assert fresh != first
+    assert ReportJob.query.count() == 3
+
+
+def test_external_worker_and_htmx_polling(job_client, seed_items):
+    from utils.report_jobs import run_pending_jobs
+
+    job_client.application.config['REPORT_JOB_EXECUTOR'] = 'external'
+    seed_sold_items(seed_items, 1)
+
+    response = job_client.post('/reports/jobs/cashflow', data=RANGE, headers={'HX-Request': 'true'})
+    assert response.status_code == 202
+    html = response.get_data(as_text=True)
+    assert 'Preparing cash flow report' in html
+    assert 'hx-trigger="load delay:2s"' in html
+    job_id = html.split('id="reportJob-')[1].split('"')[0]
+
+    assert run_pending_jobs() == 1
+    assert run_pending_jobs() == 0
+
+    html = job_client.get(f'/reports/jobs/{job_id}', headers={'HX-Request': 'true'}).get_data(as_text=True)
+    assert 'is ready' in html
+    assert 'hx-trigger' not in html
+
+    # The cash flow page renders from the job's result
+    view = job_client.get(f'/reports/jobs/{job_id}/download')
+    assert view.status_code == 302
+    page = job_client.get(view.headers['Location'])
+    assert page.status_code == 200
+    assert b'Item 0' in page.data
+    assert b'2025-01-01' in page.data
+
+
+def test_failed_job_reports_error(job_client):
+    from utils.report_jobs import JOB_KINDS, register_job_kind, submit_job, get_job
+
+    def explode(params, result_file):
+        raise RuntimeError('disk full')
+
+    register_job_kind('exploding', explode, lambda params: 'x.csv', 'text/csv')
+    try:
+        job = submit_job('exploding', {}, 'test-user')
+        job = get_job(job.id, 'test-user')
+        assert job.status == 'failed'
+        assert job.error == 'disk full'
+
+        response = job_client.get(f'/reports/jobs/{job.id}')
+        assert response.get_json()['status'] == 'failed'
+        assert 'download_url' not in response.get_json()
+        assert job_client.get(f'/reports/jobs/{job.id}/download').status_code == 404
+
+        # Failures are retried rather than reused
+        assert submit_job('exploding', {}, 'test-user').id != job.id
+    finally:
+        JOB_KINDS.pop('exploding')
+
+
+def test_jobs_are_private_to_their_user(job_client, seed_items):
+    from app import db
+    from models import ReportJob
+
+    seed_sold_items(seed_items, 1)
+    job_id = job_client.post('/reports/jobs/cashflow', data=RANGE).get_json()['job_id']
+
+    # Another user's identical request gets a job of its own, not this one
+    ReportJob.query.filter_by(id=job_id).update({'user_id': 'someone-else'})
+    db.session.commit()
+    assert job_client.get(f'/reports/jobs/{job_id}').status_code == 404
+    assert job_client.get(f'/reports/jobs/{job_id}/download').status_code == 404
+    assert job_client.get(f'/reports/cashflow?job={job_id}').status_code == 404
+    assert job_client.post('/reports/jobs/cashflow', data=RANGE).get_json()['job_id'] != job_id
+
+
+def test_cashflow_result_is_json(job_client, seed_items):
+    import json
+    from models import ReportJob
+
+    seed_sold_items(seed_items, 1)
+    job_id = job_client.post('/reports/jobs/cashflow', data=RANGE).get_json()['job_id']
+    with open(ReportJob.query.get(job_id).file_path, 'rb') as f:
+        data = json.load(f)
+    assert data['transactions'][0]['date'].startswith('2025-')
+
+
+def test_jobs_orphaned_by_a_stopped_process_are_failed(app_ctx):
+    import os
+    import socket
+    from app import db
+    from models import ReportJob
+    from utils.report_jobs import fail_orphaned_jobs
+
+    host = socket.gethostname()
+    workers = {
+        'restarted': f'{host}:{os.getpid()}',
+        'alive': f'{host}:{os.getppid()}',
+        'elsewhere': 'other-host:1',
+        'external': None,
+    }
+    for job_id, worker in workers.items():
+        db.session.add(ReportJob(id=job_id, kind='cashflow', params='{}', params_key='k', data_version=0,
+                                 status='running', worker=worker))
+    db.session.commit()
+
+    assert fail_orphaned_jobs() == 1
+    assert {job.id: job.status for job in ReportJob.query} == {
+        'restarted': 'failed', 'alive': 'running', 'elsewhere': 'running', 'external': 'running'}
+
+
+def test_rejects_unknown_kind_and_bad_dates(job_client):
+    assert job_client.post('/reports/jobs/nope').status_code == 404
+    assert job_client.post('/reports/jobs/cashflow', data={'start_date': 'June'}).status_code == 400
@@ -0,0 +1,109 @@
+"""
+Tests for full-text item search (SQLite FTS5 backend)
+"""
+from datetime import date
+
+
+def seed_search_items(seed_items):
+    from utils.search import ensure_search_index
+
+    ensure_search_index(rebuild=True)
+
+    seed_items([
+        dict(lot_number='LOT-001', title='Oak dining table', description='Solid oak with six chairs'),
+        dict(lot_number='12A', title='Mantel clock', description='Works, needs a new oak base'),
+        dict(lot_number='7', title='Brass lamp'),
+    ])
+
+
+def test_title_match_outranks_description(app_ctx, seed_items):
+    from utils.search import search_items
+
+    seed_search_items(seed_items)
+    results = search_items('oak')
+    assert [item.title for item in results.items] == ['Oak dining table', 'Mantel clock']
+
+
+def test_lot_number_and_prefix_search(app_ctx, seed_items):
+    from utils.search import search_items
+
+    seed_search_items(seed_items)
+    assert [item.title for item in search_items('12A').items] == ['Mantel clock']
+    assert [item.title for item in search_items('bra').items] == ['Brass lamp']
+
+
+def test_edits_are_indexed_and_results_paginate(app_ctx, seed_items):
+    from app import db
+    from models import Item
+    from utils.search import search_items
+
+    seed_search_items(seed_items)
+    lamp = Item.query.filter_by(title='Brass lamp').one()
+    lamp.title = 'Oak floor lamp'
+    db.session.commit()
+
+    first = search_items('oak', page=1, per_page=2)
+    second = search_items('oak', page=2, per_page=2)
+    assert first.has_next and not first.has_prev
+    assert len(second.items) == 1 and second.has_prev and not second.has_next
+
+
+def test_new_index_is_built_from_existing_items(seed_items):
+    from sqlalchemy import text
+    from app import db
+    from utils.search import ensure_search_index, search_items
+
+    # An existing database from before search: items but no FTS5 table or triggers
+    for name in ('item_fts_insert', 'item_fts_delete', 'item_fts_update'):
+        db.session.execute(text(f'DROP TRIGGER IF EXISTS {name}'))
+    db.session.execute(text('DROP TABLE IF EXISTS item_fts'))
+    seed_items(title='Walnut bookcase')
+
+    ensure_search_index()
+    assert [item.title for item in search_items('walnut').items] == ['Walnut bookcase']
+
+
+def test_search_view(client, seed_items):
+    seed_search_items(seed_items)
+    response = client.get('/items/search?q=clock')
+    assert response.status_code == 200
+    assert b'Mantel clock' in response.data
+    assert b'Brass lamp' not in response.data
+
+
+def test_typeahead_puts_prefix_matches_first(client, seed_items):
+    from app import db
+    from models import Auction, Item
+
+    seed_search_items(seed_items)
+    auction = Auction.query.first()
+    db.session.add(Item(auction_id=auction.id, title='Antique oak chest'))
+    db.session.commit()
+
+    response = client.get('/items/api/typeahead?q=oak')
+    assert [row['title'] for row in response.get_json()] == ['Oak dining table', 'Antique oak chest']
+    assert response.get_json()[0]['label'] == 'Oak dining table (Lot #LOT-001)'
+
+    # Two characters only prefix-match
+    response = client.get('/items/api/typeahead?q=la')
+    assert response.get_json() == []
+
+
+def test_typeahead_is_limited_and_expense_form_uses_picker(client):
+    from app import db
+    from models import Auction, Item
+
+    auction = Auction(title='Bulk lot', date=date(2025, 7, 1))
+    db.session.add(auction)
+    db.session.flush()
+    db.session.add_all([Item(auction_id=auction.id, title=f'Widget {n:02d}') for n in range(30)])
+    db.session.commit()
+
+    assert len(client.get('/items/api/typeahead?q=wid').get_json()) == 20
+
+    item = Item.query.filter_by(title='Widget 05').one()
+    response = client.get(f'/expenses/create?item_id={item.id}')
+    assert response.status_code == 200
+    assert b'data-item-picker' in response.data
+    assert b'Widget 05' in response.data
+    assert b'Widget 06' not in response.data
@@ -0,0 +1,200 @@
+"""
+Bulk expense entry
+
+A batch of expenses (e.g. everything logged after an auction pickup) is
+validated as a whole before anything is written: every entry is parsed,
+every item id is checked with one SELECT, and only a batch with no errors
+is inserted - with one multi-row INSERT, in one transaction.
+
+An entry is either a single expense:
+
+    {"item_id": 12, "description": "Glue", "amount": "8.50", "date": "2025-06-02",
+     "category": "repair", "notes": "optional"}
+
+or one receipt split across several items with "splits" instead of
+"item_id". Splits may give their own amount; the rest of the receipt is
+shared evenly (to the cent) by the splits that don't:
+
+    {"description": "U-Haul", "amount": "90.00", "date": "2025-06-02", "category": "transport",
+     "splits": [{"item_id": 12, "amount": "50.00"}, {"item_id": 13}, {"item_id": 14}]}
+"""
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+from app import db
+
+# Largest batch accepted in one request
+MAX_BULK_EXPENSES = 500
+
+# Most rows a batch may expand to once receipts are split. The multi-row INSERT
+# binds 8 parameters per row, so this keeps it well under Postgres' limit of
+# 65535 bind parameters per statement
+MAX_BULK_EXPENSE_ROWS = 2000
+
+CENT = Decimal('0.01')
+
+# Largest amount the Numeric(10, 2) item_expense.amount column holds
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+class BulkExpenseError(Exception):
+    """One problem with one entry of a batch"""
+
+    def __init__(self, field: str, message: str):
+        super().__init__(message)
+        self.field = field
+        self.message = message
+
+
+def _parse_amount(value: Any, field: str = 'amount') -> Decimal:
+    if isinstance(value, bool) or value is None or value == '':
+        raise BulkExpenseError(field, 'Amount is required')
+    try:
+        amount = Decimal(str(value).replace('$', '').replace(',', ''))
+    except InvalidOperation:
+        raise BulkExpenseError(field, f'"{value}" is not a valid amount')
+    # Checked before any arithmetic: NaN can't be compared and huge values can't be quantized
+    if not amount.is_finite():
+        raise BulkExpenseError(field, f'"{value}" is not a valid amount')
+    if amount <= 0:
+        raise BulkExpenseError(field, 'Amount must be greater than zero')
+    if amount > MAX_AMOUNT:
+        raise BulkExpenseError(field, f'Amount must be at most ${MAX_AMOUNT:,}')
+    if amount != amount.quantize(CENT):
+        raise BulkExpenseError(field, 'Amount must be in whole cents')
+    return amount.quantize(CENT)
+
+
+def _parse_date(value: Any) -> date:
+    if not value:
+        return datetime.utcnow().date()
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        raise BulkExpenseError('date', f'"{value}" is not a valid date (expected YYYY-MM-DD)')
+
+
+def _parse_item_id(value: Any, field: str = 'item_id') -> int:
+    # int() would quietly truncate 1.5 to item 1
+    if isinstance(value, (bool, float)):
+        raise BulkExpenseError(field, f'"{value}" is not an item id')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise BulkExpenseError(field, 'Item is required' if value in (None, '') else f'"{value}" is not an item id')
+
+
+def _text(entry: Dict[str, Any], field: str, max_length: Optional[int] = None) -> Optional[str]:
+    value = entry.get(field)
+    if value is None:
+        return None
+    value = str(value).strip()
+    if max_length and len(value) > max_length:
+        raise BulkExpenseError(field, f'Must be at most {max_length} characters')
+    return value
+
+
+def _split_amounts(total: Decimal, splits: List[Dict[str, Any]]) -> List[Tuple[int, Decimal]]:
+    """(item id, amount) for each split of a receipt"""
+    if not isinstance(splits, list) or not splits:
+        raise BulkExpenseError('splits', 'Splits must be a non-empty list')
+
+    parsed = []
+    for position, split in enumerate(splits):
+        if not isinstance(split, dict):
+            raise BulkExpenseError(f'splits[{position}]', 'Each split must be an object')
+        item_id = _parse_item_id(split.get('item_id'), f'splits[{position}].item_id')
+        amount = None
+        if split.get('amount') not in (None, ''):
+            amount = _parse_amount(split['amount'], f'splits[{position}].amount')
+        parsed.append((item_id, amount))
+
+    remainder = total - sum(amount for _, amount in parsed if amount is not None)
+    shared = [position for position, (_, amount) in enumerate(parsed) if amount is None]
+    if remainder < 0 or (not shared and remainder != 0):
+        raise BulkExpenseError('splits', f'Split amounts must add up to the receipt total of ${total}')
+    if shared:
+        cents = int(remainder / CENT)
+        share, extra = divmod(cents, len(shared))
+        if share == 0:
+            raise BulkExpenseError('splits', 'Receipt is too small to share between these items')
+        for rank, position in enumerate(shared):
+            # Leftover cents go to the first items so the parts add up exactly
+            parsed[position] = (parsed[position][0], (share + (1 if rank < extra else 0)) * CENT)
+    return parsed
+
+
+def _expand_entry(entry: Any) -> List[Dict[str, Any]]:
+    """ItemExpense rows for one entry (several for a split receipt)"""
+    if not isinstance(entry, dict):
+        raise BulkExpenseError('entry', 'Each expense must be an object')
+
+    description = _text(entry, 'description', 200)
+    if not description:
+        raise BulkExpenseError('description', 'Description is required')
+    amount = _parse_amount(entry.get('amount'))
+    expense_date = _parse_date(entry.get('date'))
+    category = _text(entry, 'category', 100) or None
+    notes = _text(entry, 'notes') or None
+
+    if 'splits' in entry:
+        if entry.get('item_id') not in (None, ''):
+            raise BulkExpenseError('item_id', 'Give either item_id or splits, not both')
+        parts = _split_amounts(amount, entry['splits'])
+        split_note = f'Split of ${amount} receipt across {len(parts)} items'
+        notes = f'{notes} ({split_note})' if notes else split_note
+    else:
+        parts = [(_parse_item_id(entry.get('item_id')), amount)]
+
+    return [{'item_id': item_id, 'description': description, 'amount': part_amount, 'date': expense_date,
+             'category': category, 'notes': notes}
+            for item_id, part_amount in parts]
+
+
+def validate_bulk_expenses(entries: Any) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Parse and check a batch of expense entries without writing anything
+
+    Args:
+        entries: Decoded JSON - a list of entries (see module docstring)
+
+    Returns:
+        (rows ready for bulk_insert_expenses, errors). Errors are dicts with
+        'row' (index into entries, or None for the whole batch), 'field' and
+        'message'; rows should only be inserted when errors is empty.
+    """
+    from models import Item
+
+    if not isinstance(entries, list) or not entries:
+        return [], [{'row': None, 'field': 'expenses', 'message': 'Expected a non-empty list of expenses'}]
+    if len(entries) > MAX_BULK_EXPENSES:
+        return [], [{'row': None, 'field': 'expenses',
+                     'message': f'At most {MAX_BULK_EXPENSES} expenses can be added at once'}]
+
+    rows: List[Dict[str, Any]] = []
+    row_indexes: List[int] = []
+    errors: List[Dict[str, Any]] = []
+    for index, entry in enumerate(entries):
+        try:
+            expanded = _expand_entry(entry)
+        except BulkExpenseError as e:
+            errors.append({'row': index, 'field': e.field, 'message': e.message})
+            continue
+        rows.extend(expanded)
+        row_indexes.extend([index] * len(expanded))
+        if len(rows) > MAX_BULK_EXPENSE_ROWS:
+            return [], [{'row': None, 'field': 'expenses',
+                         'message': f'At most {MAX_BULK_EXPENSE_ROWS} expense rows (counting each split '
+                                    f'separately) can be added at once'}]
+
+    # One SELECT checks every referenced item
+    item_ids = {row['item_id'] for row in rows}
+    existing = set(db.session.scalars(db.select(Item.id).where(Item.id.in_(item_ids)))) if item_ids else set()
+    reported = set()
+    for index, row in zip(row_indexes, rows):
+        if row['item_id'] not in existing and (index, row['item_id']) not in reported:
+            reported.add((index, row['item_id']))
+            errors.append({'row': index, 'field': 'item_id', 'message': f"No item with ID {row['item_id']}"})
+
+    errors.sort(key=lambda error: error['row'])
+    return rows, errors
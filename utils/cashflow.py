@@ -0,0 +1,120 @@
+"""
+Cash flow queries over the cash_event ledger
+
+The cash flow page, CSV export, weekly email and chart all read from here,
+so they agree with each other. Every query is a range scan on
+idx_cash_event_date_item_kind.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Tuple, Union
+from app import db
+
+DateLike = Union[date, datetime]
+
+
+def _as_date(value: DateLike) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _in_range(start_date: DateLike, end_date: DateLike):
+    from models import CashEvent
+    return CashEvent.event_date.between(_as_date(start_date), _as_date(end_date))
+
+
+def iter_cash_events(start_date: DateLike, end_date: DateLike, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    Yield transactions in the date range, newest first
+
+    Yields:
+        Dicts with date, type ('Income'/'Expense'), category, item,
+        amount (signed float), auction and description
+    """
+    from models import Auction, CashEvent, Item, CASH_EVENT_CATEGORIES, INCOME_CASH_EVENT_KINDS
+
+    stmt = (db.select(CashEvent.event_date, CashEvent.kind, CashEvent.amount, CashEvent.description,
+                      Item.title, Auction.title.label('auction_title'))
+            .join(Item, CashEvent.item_id == Item.id)
+            .join(Auction, Item.auction_id == Auction.id)
+            .where(_in_range(start_date, end_date))
+            .order_by(CashEvent.event_date.desc(), CashEvent.id.desc())
+            .execution_options(stream_results=True, yield_per=batch_size))
+
+    for row in db.session.execute(stmt):
+        amount = float(row.amount)
+        yield {
+            'date': row.event_date,
+            'type': 'Income' if row.kind in INCOME_CASH_EVENT_KINDS else 'Expense',
+            'category': CASH_EVENT_CATEGORIES.get(row.kind, row.kind),
+            'item': row.title,
+            'amount': amount,
+            'auction': row.auction_title or 'N/A',
+            'description': row.description or '',
+        }
+
+
+def cashflow_totals(start_date: DateLike, end_date: DateLike) -> Dict[str, Any]:
+    """
+    Income, expense and transaction totals for the date range in one GROUP BY
+
+    Returns:
+        Dict with total_income, total_expenses (positive), net_cashflow and
+        income_transactions / expense_transactions / total_transactions counts
+    """
+    from models import CashEvent, INCOME_CASH_EVENT_KINDS
+
+    # By kind, so a zero-amount event (e.g. a $0 purchase) isn't counted as income
+    is_income = CashEvent.kind.in_(INCOME_CASH_EVENT_KINDS).label('is_income')
+    rows = db.session.execute(
+        db.select(is_income, db.func.count(), db.func.sum(CashEvent.amount))
+        .where(_in_range(start_date, end_date))
+        .group_by(is_income)
+    ).all()
+
+    totals = {True: (0, 0.0), False: (0, 0.0)}
+    for income, count, amount in rows:
+        totals[bool(income)] = (count, float(amount or 0))
+
+    income_count, total_income = totals[True]
+    expense_count, expense_sum = totals[False]
+    total_expenses = -expense_sum
+
+    return {
+        'total_income': total_income,
+        'total_expenses': total_expenses,
+        'net_cashflow': total_income - total_expenses,
+        'income_transactions': income_count,
+        'expense_transactions': expense_count,
+        'total_transactions': income_count + expense_count,
+    }
+
+
+def daily_cashflow(start_date: DateLike, end_date: DateLike) -> List[Tuple[date, float, float]]:
+    """
+    Income and expenses (both positive) per day that has any events
+
+    Returns:
+        (day, income, expenses) tuples in date order
+    """
+    from models import CashEvent, INCOME_CASH_EVENT_KINDS
+
+    is_income = CashEvent.kind.in_(INCOME_CASH_EVENT_KINDS)
+    income = db.func.sum(db.case((is_income, CashEvent.amount), else_=0))
+    expenses = db.func.sum(db.case((is_income, 0), else_=-CashEvent.amount))
+    rows = db.session.execute(
+        db.select(CashEvent.event_date, income, expenses)
+        .where(_in_range(start_date, end_date))
+        .group_by(CashEvent.event_date)
+        .order_by(CashEvent.event_date)
+    ).all()
+    return [(day, float(inc or 0), float(exp or 0)) for day, inc, exp in rows]
+
+
+def weekly_cashflow(start_date: DateLike, end_date: DateLike) -> List[Tuple[date, float, float]]:
+    """Daily totals folded into Monday-starting weeks"""
+    weeks: Dict[date, List[float]] = {}
+    for day, income, expenses in daily_cashflow(start_date, end_date):
+        week_start = day - timedelta(days=day.weekday())
+        totals = weeks.setdefault(week_start, [0.0, 0.0])
+        totals[0] += income
+        totals[1] += expenses
+    return [(week, income, expenses) for week, (income, expenses) in sorted(weeks.items())]
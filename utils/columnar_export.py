@@ -0,0 +1,268 @@
+"""
+Typed data exports for analysis (Parquet, Arrow IPC, NDJSON)
+
+Each dataset is a plain column select streamed from a server-side cursor
+and written one record batch at a time, so exports never hold the full
+table in memory. Money columns are exported as float64 and dates as real
+date/timestamp columns, so pandas loads them without any string parsing.
+
+Parquet and Arrow are written with pyarrow (in requirements.txt). An install
+without it still serves NDJSON and reports PYARROW_MISSING for the others.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from app import db
+
+BATCH_SIZE = 5000
+
+FORMATS = {
+    # format: (file extension, mimetype, needs pyarrow)
+    'parquet': ('parquet', 'application/vnd.apache.parquet', True),
+    'arrow': ('arrow', 'application/vnd.apache.arrow.file', True),
+    'ndjson': ('ndjson', 'application/x-ndjson', False),
+}
+
+
+PYARROW_MISSING = 'Parquet and Arrow exports need the pyarrow package (pip install pyarrow)'
+
+
+class ExportUnavailable(Exception):
+    """Raised when a format's optional dependency isn't installed"""
+
+
+# Each dataset builder returns (select statement, [(column name, column type)])
+Dataset = Tuple[Any, List[Tuple[str, str]]]
+
+
+def _items_dataset() -> Dataset:
+    from models import Auction, Item
+
+    items = (db.select(Item.id, Item.auction_id, Auction.title.label('auction_title'), Item.lot_number,
+                       Item.title, Item.status, Item.purchase_price, Item.refurb_cost,
+                       Item.target_resale_price, Item.sale_price, Item.sale_date, Item.sale_fees,
+                       Item.shipping_cost, Item.list_channel, Item.multiple_pieces, Item.pieces_total,
+                       Item.total_expenses_cached.label('total_expenses'),
+                       Item.net_profit_cached.label('net_profit'),
+                       Item.roi_cached.label('roi_percentage'),
+                       Item.created_at, Item.updated_at)
+             .outerjoin(Auction, Item.auction_id == Auction.id)
+             .order_by(Item.id))
+    items_columns = [
+        ('id', 'int'), ('auction_id', 'int'), ('auction_title', 'string'), ('lot_number', 'string'),
+        ('title', 'string'), ('status', 'string'), ('purchase_price', 'money'), ('refurb_cost', 'money'),
+        ('target_resale_price', 'money'), ('sale_price', 'money'), ('sale_date', 'date'),
+        ('sale_fees', 'money'), ('shipping_cost', 'money'), ('list_channel', 'string'),
+        ('multiple_pieces', 'bool'), ('pieces_total', 'int'), ('total_expenses', 'money'),
+        ('net_profit', 'money'), ('roi_percentage', 'money'),
+        ('created_at', 'timestamp'), ('updated_at', 'timestamp'),
+    ]
+    return items, items_columns
+
+
+def _expenses_dataset() -> Dataset:
+    from models import ItemExpense
+
+    expenses = (db.select(ItemExpense.id, ItemExpense.item_id, ItemExpense.description,
+                          ItemExpense.amount, ItemExpense.date, ItemExpense.category,
+                          ItemExpense.created_at)
+                .order_by(ItemExpense.id))
+    expenses_columns = [
+        ('id', 'int'), ('item_id', 'int'), ('description', 'string'), ('amount', 'money'),
+        ('date', 'date'), ('category', 'string'), ('created_at', 'timestamp'),
+    ]
+    return expenses, expenses_columns
+
+
+def _piece_sales_dataset() -> Dataset:
+    from models import ItemSale
+
+    piece_sales = (db.select(ItemSale.id, ItemSale.item_id, ItemSale.pieces_sold,
+                             ItemSale.sale_price_per_piece, ItemSale.total_sale_amount,
+                             ItemSale.sale_date, ItemSale.sale_channel, ItemSale.created_at)
+                   .order_by(ItemSale.id))
+    piece_sales_columns = [
+        ('id', 'int'), ('item_id', 'int'), ('pieces_sold', 'int'), ('sale_price_per_piece', 'money'),
+        ('total_sale_amount', 'money'), ('sale_date', 'date'), ('sale_channel', 'string'),
+        ('created_at', 'timestamp'),
+    ]
+    return piece_sales, piece_sales_columns
+
+
+def _partner_shares_dataset() -> Dataset:
+    from models import Item, ItemPartner, Partner
+
+    partner_shares = (db.select(ItemPartner.id, ItemPartner.item_id, ItemPartner.partner_id,
+                                Partner.name.label('partner_name'), ItemPartner.pct_share,
+                                Item.status,
+                                Item.net_profit_cached.label('item_net_profit'),
+                                (Item.net_profit_cached * ItemPartner.pct_share / 100).label('share_amount'))
+                      .join(Partner, ItemPartner.partner_id == Partner.id)
+                      .join(Item, ItemPartner.item_id == Item.id)
+                      .order_by(ItemPartner.id))
+    partner_shares_columns = [
+        ('id', 'int'), ('item_id', 'int'), ('partner_id', 'int'), ('partner_name', 'string'),
+        ('pct_share', 'money'), ('item_status', 'string'), ('item_net_profit', 'money'),
+        ('share_amount', 'money'),
+    ]
+    return partner_shares, partner_shares_columns
+
+
+# Dataset name -> builder; the statements import models, so they are built on use
+DATASET_BUILDERS: Dict[str, Callable[[], Dataset]] = {
+    'items': _items_dataset,
+    'expenses': _expenses_dataset,
+    'piece_sales': _piece_sales_dataset,
+    'partner_shares': _partner_shares_dataset,
+}
+
+DATASETS = tuple(DATASET_BUILDERS)
+
+
+def _value(value, kind: str):
+    """Normalize a database value to a plain Python value of the column's type"""
+    if value is None:
+        return None
+    if isinstance(value, Enum):
+        return value.value
+    if kind == 'money':
+        return float(value)
+    return value
+
+
+def _iter_row_batches(dataset: str, batch_size: int = BATCH_SIZE) -> Iterator[Tuple[List[Tuple[str, str]], List]]:
+    statement, columns = DATASET_BUILDERS[dataset]()
+    result = db.session.execute(statement.execution_options(stream_results=True, yield_per=batch_size))
+    for rows in result.partitions():
+        yield columns, rows
+
+
+def _arrow_schema(columns: List[Tuple[str, str]]):
+    import pyarrow as pa
+
+    types = {
+        'int': pa.int64(),
+        'money': pa.float64(),
+        'string': pa.string(),
+        'bool': pa.bool_(),
+        'date': pa.date32(),
+        'timestamp': pa.timestamp('us'),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def iter_record_batches(dataset: str, batch_size: int = BATCH_SIZE):
+    """
+    Yield pyarrow RecordBatches for a dataset, one per database fetch
+
+    Raises:
+        ExportUnavailable: If pyarrow isn't installed
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ExportUnavailable(PYARROW_MISSING)
+
+    _, columns = DATASET_BUILDERS[dataset]()
+    schema = _arrow_schema(columns)
+
+    for columns, rows in _iter_row_batches(dataset, batch_size):
+        arrays = [
+            pa.array([_value(row[i], kind) for row in rows], type=schema.field(i).type)
+            for i, (_, kind) in enumerate(columns)
+        ]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_columnar_export(dataset: str, fmt: str, batch_size: int = BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Serialize a dataset incrementally
+
+    Args:
+        dataset: One of DATASETS
+        fmt: One of FORMATS
+        batch_size: Rows per record batch / database fetch
+
+    Yields:
+        Encoded file contents, roughly one chunk per record batch
+    """
+    if fmt == 'ndjson':
+        for columns, rows in _iter_row_batches(dataset, batch_size):
+            lines = []
+            for row in rows:
+                record = {name: _value(row[i], kind) for i, (name, kind) in enumerate(columns)}
+                lines.append(json.dumps(record, default=_json_default))
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+        return
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportUnavailable(PYARROW_MISSING)
+
+    _, columns = DATASET_BUILDERS[dataset]()
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    out = pa.PythonFile(sink, mode='w')
+
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(out, schema)
+    else:
+        writer = pa.ipc.new_file(out, schema)
+
+    for batch in iter_record_batches(dataset, batch_size):
+        writer.write_batch(batch)
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def check_format_available(fmt: str):
+    """Raise ExportUnavailable before streaming starts if the format can't be written"""
+    _, _, needs_pyarrow = FORMATS[fmt]
+    if needs_pyarrow:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportUnavailable(PYARROW_MISSING)
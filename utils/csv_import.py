@@ -0,0 +1,323 @@
+"""
+Streaming inventory CSV import
+
+Rows are read straight off the upload, grouped into chunks, and each chunk
+is applied with one preload SELECT and one bulk UPDATE before committing,
+so memory and transaction size stay flat however large the file is. The
+report keeps counts for every row but only the first MAX_REPORTED_ROWS
+errors and (for dry runs) diffs.
+
+Uploads from the web page are saved next to the report job results and
+imported by an 'inventory_import' background job, so a large file never
+ties up the request.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from app import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Errors and diffs kept for display; the counts cover every row
+MAX_REPORTED_ROWS = 200
+
+IMPORT_JOB_KIND = 'inventory_import'
+
+# Largest value the Numeric(10, 2) money columns hold
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+def _parse_money(value: str) -> Decimal:
+    try:
+        amount = Decimal(value.replace('$', '').replace(',', ''))
+    except InvalidOperation:
+        raise ValueError(f'"{value}" is not a valid amount')
+    if not amount.is_finite():
+        raise ValueError(f'"{value}" is not a valid amount')
+    amount = amount.quantize(Decimal('0.01'))
+    if abs(amount) > MAX_AMOUNT:
+        raise ValueError(f'"{value}" is larger than ${MAX_AMOUNT:,}')
+    return amount
+
+
+def _parse_date(value: str):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'"{value}" is not a valid date (expected YYYY-MM-DD)')
+
+
+def _parse_lot_number(value: str) -> str:
+    if len(value) > 50:
+        raise ValueError(f'"{value}" is longer than 50 characters')
+    return value
+
+
+# CSV column -> (Item attribute, parser)
+IMPORT_COLUMNS = {
+    'Lot Number': ('lot_number', _parse_lot_number),
+    'Purchase Price': ('purchase_price', _parse_money),
+    'Refurb Cost': ('refurb_cost', _parse_money),
+    'Sale Price': ('sale_price', _parse_money),
+    'Sale Date': ('sale_date', _parse_date),
+}
+
+
+class ImportReport:
+    """Outcome of an import or dry run"""
+
+    # Attributes saved with a background import's result
+    FIELDS = ('dry_run', 'rows_processed', 'updated', 'unchanged', 'skipped',
+              'error_count', 'errors', 'diff_count', 'diffs')
+
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.rows_processed = 0
+        self.updated = 0  # distinct items changed
+        self.unchanged = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.diff_count = 0
+        self.diffs: List[Dict[str, Any]] = []  # dry runs only
+        self._updated_ids = set()
+
+    def add_error(self, line: int, item_id: Optional[str], message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ROWS:
+            self.errors.append({'line': line, 'item_id': item_id, 'message': message})
+
+    def add_change(self, line: int, item_id: int, title: str, changes: Dict[str, Dict[str, Any]]):
+        if item_id not in self._updated_ids:
+            self._updated_ids.add(item_id)
+            self.updated += 1
+        if self.dry_run:
+            self.diff_count += 1
+            if len(self.diffs) < MAX_REPORTED_ROWS:
+                self.diffs.append({'line': line, 'item_id': item_id, 'title': title, 'changes': changes})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ImportReport':
+        report = cls(data['dry_run'])
+        for field in cls.FIELDS:
+            setattr(report, field, data[field])
+        return report
+
+
+def iter_csv_rows(binary_stream) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    Decode and parse an uploaded file incrementally
+
+    newline='' hands line endings to the csv module, so CRLF, LF and
+    CR-only files (and quoted multi-line cells) all parse.
+
+    Yields:
+        (line number, row dict) pairs; line numbers count the header as line 1
+    """
+    text_stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.DictReader(text_stream)
+        for row in reader:
+            yield reader.line_num, row
+    finally:
+        # Leave the caller's stream open
+        text_stream.detach()
+
+
+def _chunks(rows: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_row(line: int, row: Dict[str, str], report: ImportReport):
+    """Return (item id, {attribute: value}) or None if the row is skipped or invalid"""
+    raw_id = (row.get('ID') or '').strip()
+    if not raw_id:
+        report.skipped += 1
+        return None
+
+    try:
+        item_id = int(raw_id)
+    except ValueError:
+        report.add_error(line, raw_id, f'"{raw_id}" is not a valid item ID')
+        return None
+
+    values = {}
+    for column, (attribute, parse) in IMPORT_COLUMNS.items():
+        raw = (row.get(column) or '').strip()
+        if not raw:
+            continue
+        try:
+            values[attribute] = parse(raw)
+        except ValueError as e:
+            report.add_error(line, raw_id, f'{column}: {e}')
+            return None
+
+    return item_id, values
+
+
+def _apply_chunk(chunk: List[Tuple[int, Dict[str, str]]], report: ImportReport):
+    from models import (Item, refresh_item_profit_cache, refresh_cash_events,
+                        refresh_monthly_rollups, item_rollup_months, sync_partner_ledger,
+                        mark_data_changed, natural_lot_key, REPORT_DATA_VERSION)
+
+    parsed = []
+    for line, row in chunk:
+        result = _parse_row(line, row, report)
+        if result:
+            parsed.append((line, *result))
+
+    if not parsed:
+        return
+
+    # One SELECT for the whole chunk instead of one per row
+    attributes = [attribute for attribute, _ in IMPORT_COLUMNS.values()]
+    columns = [getattr(Item, attribute) for attribute in attributes]
+    ids = {item_id for _, item_id, _ in parsed}
+    current = {row.id: row for row in db.session.execute(
+        db.select(Item.id, Item.title, *columns).where(Item.id.in_(ids)))}
+
+    mappings = {}
+    for line, item_id, values in parsed:
+        existing = current.get(item_id)
+        if existing is None:
+            report.add_error(line, str(item_id), 'No item with this ID')
+            continue
+
+        # Later rows for the same item build on earlier ones
+        pending = mappings.get(item_id, {})
+        changes = {}
+        for attribute, new_value in values.items():
+            old_value = pending.get(attribute, getattr(existing, attribute))
+            if old_value != new_value:
+                changes[attribute] = {'old': old_value, 'new': new_value}
+
+        if not changes:
+            report.unchanged += 1
+            continue
+
+        report.add_change(line, item_id, existing.title, changes)
+        pending.update({attribute: change['new'] for attribute, change in changes.items()})
+        mappings[item_id] = pending
+
+    if report.dry_run or not mappings:
+        return
+
+    # Sale dates may move, so the rollups of both the old and new months change
+    months = item_rollup_months(db.session, mappings)
+    now = datetime.utcnow()
+    rows = []
+    for item_id, values in mappings.items():
+        row = {'id': item_id, 'updated_at': now, **values}
+        if 'lot_number' in values:
+            # The bulk UPDATE skips before_flush, which normally keeps the sort key current
+            row['lot_sort_key'] = natural_lot_key(values['lot_number'])
+        rows.append(row)
+    db.session.execute(db.update(Item), rows)
+    # Bulk updates skip flush events, so refresh derived data explicitly
+    refresh_item_profit_cache(db.session, list(mappings))
+    refresh_cash_events(db.session, list(mappings))
+    refresh_monthly_rollups(db.session, months | item_rollup_months(db.session, mappings))
+    sync_partner_ledger(db.session, list(mappings))
+    mark_data_changed(db.session, REPORT_DATA_VERSION)
+    db.session.commit()
+
+
+def import_inventory_csv(binary_stream, dry_run: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         progress: Optional[Callable[[ImportReport], None]] = None) -> ImportReport:
+    """
+    Update existing items from an inventory CSV
+
+    Args:
+        binary_stream: File-like object yielding the raw upload bytes
+        dry_run: Report what would change without writing anything
+        chunk_size: Rows preloaded, updated and committed together
+        progress: Called with the running report after each chunk
+
+    Returns:
+        ImportReport with counts, per-row errors and (for dry runs) per-row diffs
+    """
+    report = ImportReport(dry_run)
+
+    for chunk in _chunks(iter_csv_rows(binary_stream), chunk_size):
+        _apply_chunk(chunk, report)
+        report.rows_processed += len(chunk)
+
+        if progress:
+            progress(report)
+
+    if dry_run:
+        db.session.rollback()
+
+    return report
+
+
+def log_progress(report: ImportReport):
+    """Progress callback that writes a line to the application log"""
+    logger.info(f"Inventory import{' (dry run)' if report.dry_run else ''}: "
+                f"{report.rows_processed} rows processed, {report.updated} updated, "
+                f"{report.error_count} errors")
+
+
+def save_import_upload(upload) -> str:
+    """
+    Save an uploaded CSV where the import job can read it
+
+    Returns:
+        Upload name to pass to the job as its 'upload' parameter
+    """
+    from utils.report_jobs import job_directory
+
+    name = f'{uuid.uuid4().hex}.upload.csv'
+    upload.save(os.path.join(job_directory(), name))
+    return name
+
+
+def count_csv_rows(binary_stream) -> int:
+    """Data rows in an upload, so a job can report how far through it is"""
+    return sum(1 for _ in iter_csv_rows(binary_stream))
+
+
+def build_import_job(params: Dict[str, Any], result_file):
+    """Report job: import a saved upload and write the report as JSON"""
+    from utils.report_jobs import job_directory, report_job_progress
+
+    path = os.path.join(job_directory(), os.path.basename(params['upload']))
+    try:
+        with open(path, 'rb') as upload:
+            total = count_csv_rows(upload)
+            upload.seek(0)
+            report_job_progress(0, total)
+
+            def record_progress(report: ImportReport):
+                log_progress(report)
+                report_job_progress(report.rows_processed, total)
+
+            report = import_inventory_csv(upload, dry_run=params['dry_run'], progress=record_progress)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    result_file.write(json.dumps(report.to_dict(), default=str).encode('utf-8'))
+
+
+def load_import_report(path: str) -> ImportReport:
+    """Report written by build_import_job"""
+    with open(path, 'rb') as f:
+        return ImportReport.from_dict(json.load(f))
@@ -1,5 +1,9 @@
 import logging
+import random
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import json
@@ -8,25 +12,173 @@ from app import db
 
 logger = logging.getLogger(__name__)
 
+# Responses worth retrying: rate limited or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Longest single wait between retries, including a server's Retry-After
+MAX_BACKOFF_SECONDS = 30.0
+
 class EBayAPI:
-    """eBay Browse API integration for price suggestions"""
+    """
+    eBay Browse API integration for price suggestions
+
+    All calls go through one pooled keep-alive requests.Session with connect
+    and read timeouts, so a slow eBay response can't hold a worker forever.
+    Rate limits (429) and 5xx responses are retried a bounded number of times
+    with jittered exponential backoff, all within a total time budget per
+    call. Latency, retries and connections opened are recorded per call type;
+    see stats().
+
+    Settings come from the environment (EBAY_BASE_URL, EBAY_CONNECT_TIMEOUT,
+    EBAY_READ_TIMEOUT, EBAY_TOTAL_TIMEOUT, EBAY_MAX_RETRIES,
+    EBAY_BACKOFF_FACTOR, EBAY_POOL_SIZE) unless passed in.
+    """
     
-    def __init__(self):
+    def __init__(self, base_url: Optional[str] = None, connect_timeout: Optional[float] = None,
+                 read_timeout: Optional[float] = None, max_retries: Optional[int] = None,
+                 backoff_factor: Optional[float] = None, pool_size: Optional[int] = None,
+                 total_timeout: Optional[float] = None):
         self.app_id = os.environ.get('EBAY_APP_ID', 'default_app_id')
         self.cert_id = os.environ.get('EBAY_CERT_ID', 'default_cert_id')
         self.dev_id = os.environ.get('EBAY_DEV_ID', 'default_dev_id')
-        self.base_url = 'https://api.ebay.com'
+        self.base_url = (base_url or os.environ.get('EBAY_BASE_URL', 'https://api.ebay.com')).rstrip('/')
         self.access_token = None
         self.token_expires = None
         self.cache = {}  # Simple in-memory cache for 24 hours
+        
+        self.connect_timeout = connect_timeout if connect_timeout is not None else float(os.environ.get('EBAY_CONNECT_TIMEOUT', '3.05'))
+        self.read_timeout = read_timeout if read_timeout is not None else float(os.environ.get('EBAY_READ_TIMEOUT', '10'))
+        self.total_timeout = total_timeout if total_timeout is not None else float(os.environ.get('EBAY_TOTAL_TIMEOUT', '20'))
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get('EBAY_MAX_RETRIES', '3'))
+        self.backoff_factor = backoff_factor if backoff_factor is not None else float(os.environ.get('EBAY_BACKOFF_FACTOR', '0.5'))
+        self.pool_size = pool_size if pool_size is not None else int(os.environ.get('EBAY_POOL_SIZE', '10'))
+        
+        self._session = None
+        self._adapter = None
+        self._lock = threading.Lock()
+        self.metrics: Dict[str, Dict[str, Any]] = {}
     
-    def get_access_token(self) -> Optional[str]:
+    @property
+    def session(self) -> requests.Session:
+        """The shared keep-alive session, created on first use"""
+        with self._lock:
+            if self._session is None:
+                # Retries are handled in _request so they can be jittered and counted
+                self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session = requests.Session()
+                session.mount('https://', self._adapter)
+                session.mount('http://', self._adapter)
+                self._session = session
+            return self._session
+    
+    def close(self):
+        """Close pooled connections; the next call opens a new session"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._adapter = None
+    
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Seconds to wait before retry number attempt (1-based)"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), MAX_BACKOFF_SECONDS)
+        # Full jitter: anywhere up to the exponential ceiling, so workers don't retry in step
+        ceiling = min(self.backoff_factor * (2 ** (attempt - 1)), MAX_BACKOFF_SECONDS)
+        return random.uniform(0, ceiling)
+    
+    def _request(self, name: str, method: str, path: str, retry_read_timeouts: bool = True,
+                 **kwargs) -> requests.Response:
+        """
+        Send a request on the pooled session, retrying 429/5xx and connection
+        errors up to max_retries times, all within total_timeout seconds
+
+        Each attempt's timeouts are cut to the time left, and a retry whose
+        wait (backoff or Retry-After) would run past it isn't made.
+
+        Args:
+            name: Call type the latency is recorded under
+            method: HTTP method
+            path: Path under base_url
+            retry_read_timeouts: Whether a response that never arrived is
+                retried; off while a user waits, since eBay may still be
+                working on the first one
+
+        Raises:
+            requests.RequestException: If the last attempt failed to connect or timed out
+
+        Returns:
+            The last response, which may still be an error status
+        """
+        url = f'{self.base_url}{path}'
+        connect_timeout, read_timeout = kwargs.pop('timeout', (self.connect_timeout, self.read_timeout))
+        deadline = time.monotonic() + self.total_timeout
+        
+        attempt = 0
+        while True:
+            remaining = max(deadline - time.monotonic(), 0.001)
+            started = time.perf_counter()
+            response = None
+            error = None
+            try:
+                response = self.session.request(method, url, timeout=(min(connect_timeout, remaining),
+                                                                      min(read_timeout, remaining)), **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            self._record(name, time.perf_counter() - started, retry=attempt > 0,
+                         failed=error is not None or response.status_code >= 400)
+            
+            retryable = error is not None or response.status_code in RETRY_STATUSES
+            if isinstance(error, requests.ReadTimeout) and not retry_read_timeouts:
+                retryable = False
+            delay = self._backoff(attempt + 1, response) if retryable else 0.0
+            if not retryable or attempt >= self.max_retries or delay >= deadline - time.monotonic():
+                if error is not None:
+                    raise error
+                return response
+            
+            attempt += 1
+            logger.warning(f"eBay {name} {'failed: ' + str(error) if error else 'returned ' + str(response.status_code)}; "
+                           f"retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+    
+    def _record(self, name: str, seconds: float, retry: bool, failed: bool):
+        with self._lock:
+            metrics = self.metrics.setdefault(name, {'calls': 0, 'retries': 0, 'errors': 0,
+                                                     'total_seconds': 0.0, 'max_seconds': 0.0})
+            metrics['calls'] += 1
+            metrics['retries'] += int(retry)
+            metrics['errors'] += int(failed)
+            metrics['total_seconds'] += seconds
+            metrics['max_seconds'] = max(metrics['max_seconds'], seconds)
+        logger.debug(f'eBay {name} took {seconds * 1000:.1f}ms')
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Latency per call type, and how many connections the pool has opened
+
+        A connections_opened figure well below the number of calls is the
+        keep-alive pool at work.
+        """
+        with self._lock:
+            calls = {name: {**metrics, 'avg_seconds': metrics['total_seconds'] / metrics['calls']}
+                     for name, metrics in self.metrics.items()}
+            opened = 0
+            if self._adapter is not None:
+                pools = self._adapter.poolmanager.pools
+                opened = sum(pools[key].num_connections for key in pools.keys())
+        return {'calls': calls, 'connections_opened': opened}
+    
+    def get_access_token(self, interactive: bool = False) -> Optional[str]:
         """Get OAuth access token for eBay API"""
         if self.access_token and self.token_expires and datetime.now() < self.token_expires:
             return self.access_token
         
         try:
-            url = f"{self.base_url}/identity/v1/oauth2/token"
             headers = {
                 'Content-Type': 'application/x-www-form-urlencoded',
                 'Authorization': f'Basic {self._get_basic_auth()}'
@@ -36,7 +188,8 @@ class EBayAPI:
                 'scope': 'https://api.ebay.com/oauth/api_scope'
             }
             
-            response = requests.post(url, headers=headers, data=data)
+            response = self._request('token', 'POST', '/identity/v1/oauth2/token',
+                                     retry_read_timeouts=not interactive, headers=headers, data=data)
             
             if response.status_code == 200:
                 token_data = response.json()
@@ -58,8 +211,14 @@ class EBayAPI:
         credentials = f"{self.app_id}:{self.cert_id}"
         return base64.b64encode(credentials.encode()).decode()
     
-    def get_median_sold_price(self, query: str, condition: str = 'used') -> Optional[float]:
-        """Get median sold price for a search query with 24-hour caching"""
+    def get_median_sold_price(self, query: str, condition: str = 'used',
+                              interactive: bool = False) -> Optional[float]:
+        """
+        Get median sold price for a search query with 24-hour caching
+
+        Pass interactive=True when a user is waiting on the answer: read
+        timeouts then fail at once instead of being retried.
+        """
         
         # Check cache first
         cache_key = f"{query}_{condition}"
@@ -70,13 +229,12 @@ class EBayAPI:
                 return cached_data['price']
         
         try:
-            access_token = self.get_access_token()
+            access_token = self.get_access_token(interactive)
             if not access_token:
                 logger.error("Could not get eBay access token")
                 return None
             
             # Search for sold listings
-            url = f"{self.base_url}/buy/browse/v1/item_summary/search"
             headers = {
                 'Authorization': f'Bearer {access_token}',
                 'Content-Type': 'application/json',
@@ -90,7 +248,8 @@ class EBayAPI:
                 'limit': 50  # Get more results for better median calculation
             }
             
-            response = requests.get(url, headers=headers, params=params)
+            response = self._request('search', 'GET', '/buy/browse/v1/item_summary/search',
+                                     retry_read_timeouts=not interactive, headers=headers, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -151,8 +310,8 @@ class EBayAPI:
         }
         return condition_map.get(condition.lower(), '3000')  # Default to 'used'
     
-    def update_item_price_suggestion(self, item):
-        """Update an item's eBay price suggestion"""
+    def update_item_price_suggestion(self, item, interactive: bool = False):
+        """Update an item's eBay price suggestion (see get_median_sold_price for interactive)"""
         if not item.title:
             return False
         
@@ -161,7 +320,7 @@ class EBayAPI:
             search_query = item.title[:80]  # Limit query length
             
             # Get price suggestion
-            suggested_price = self.get_median_sold_price(search_query)
+            suggested_price = self.get_median_sold_price(search_query, interactive=interactive)
             
             if suggested_price:
                 item.ebay_suggested_price = suggested_price
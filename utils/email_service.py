@@ -9,8 +9,6 @@ from email import encoders
 from typing import List, Optional
 import tempfile
 from datetime import datetime, timedelta
-import csv
-import io
 
 logger = logging.getLogger(__name__)
 
@@ -84,9 +82,12 @@ class EmailService:
                 msg.attach(part)
                 
             elif attachment_type == 'image':
-                # Image attachment
-                with open(attachment['path'], 'rb') as f:
-                    img_data = f.read()
+                # Image attachment, from a file or in-memory data
+                if 'data' in attachment:
+                    img_data = attachment['data']
+                else:
+                    with open(attachment['path'], 'rb') as f:
+                        img_data = f.read()
                 image = MIMEImage(img_data)
                 image.add_header(
                     'Content-Disposition',
@@ -109,90 +110,34 @@ class EmailService:
         except Exception as e:
             logger.error(f"Failed to add attachment: {e}")
 
+CASHFLOW_CSV_HEADER = ['Date', 'Type', 'Item', 'Amount', 'Category', 'Auction', 'Notes']
+
+def iter_cashflow_rows(start_date: datetime, end_date: datetime):
+    """
+    Yield cash flow CSV rows for the date range from the cash event ledger
+
+    Events are streamed from the database in batches, so this can feed a
+    streaming download without loading the whole range.
+    """
+    from utils.cashflow import iter_cash_events
+    
+    for transaction in iter_cash_events(start_date, end_date):
+        yield [
+            transaction['date'].strftime('%Y-%m-%d'),
+            transaction['type'],
+            transaction['item'],
+            f"{transaction['amount']:.2f}",
+            transaction['category'],
+            transaction['auction'],
+            transaction['description']
+        ]
+
 def generate_cashflow_csv(start_date: datetime, end_date: datetime) -> str:
     """Generate cash flow CSV data"""
-    from models import Item, ItemStatus
+    from utils.streaming import iter_csv
     
     try:
-        # Get all relevant transactions in date range
-        items = Item.query.filter(
-            Item.updated_at >= start_date,
-            Item.updated_at <= end_date
-        ).all()
-        
-        # Generate CSV data
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            'Date', 'Type', 'Item', 'Amount', 'Category', 'Auction', 'Notes'
-        ])
-        
-        # Write transactions
-        for item in items:
-            auction_title = item.auction.title if item.auction else 'N/A'
-            
-            # Money out (purchases and refurb costs)
-            if item.purchase_price:
-                writer.writerow([
-                    item.updated_at.strftime('%Y-%m-%d') if item.updated_at else '',
-                    'Expense',
-                    item.title,
-                    f'-{float(item.purchase_price):.2f}',
-                    'Purchase',
-                    auction_title,
-                    f'Lot #{item.lot_number}' if item.lot_number else ''
-                ])
-            
-            if item.refurb_cost and float(item.refurb_cost) > 0:
-                writer.writerow([
-                    item.updated_at.strftime('%Y-%m-%d') if item.updated_at else '',
-                    'Expense',
-                    item.title,
-                    f'-{float(item.refurb_cost):.2f}',
-                    'Refurbishment',
-                    auction_title,
-                    'Repair/restoration costs'
-                ])
-            
-            # Money in (sales)
-            if item.sale_price and item.status == ItemStatus.SOLD:
-                writer.writerow([
-                    item.sale_date.strftime('%Y-%m-%d') if item.sale_date else '',
-                    'Income',
-                    item.title,
-                    f'{float(item.sale_price):.2f}',
-                    'Sale',
-                    auction_title,
-                    f'Sold on {item.list_channel}' if item.list_channel else 'Sale'
-                ])
-                
-                # Sale fees as expense
-                if item.sale_fees and float(item.sale_fees) > 0:
-                    writer.writerow([
-                        item.sale_date.strftime('%Y-%m-%d') if item.sale_date else '',
-                        'Expense',
-                        item.title,
-                        f'-{float(item.sale_fees):.2f}',
-                        'Fees',
-                        auction_title,
-                        'Marketplace fees'
-                    ])
-                
-                # Shipping costs
-                if item.shipping_cost and float(item.shipping_cost) > 0:
-                    writer.writerow([
-                        item.sale_date.strftime('%Y-%m-%d') if item.sale_date else '',
-                        'Expense',
-                        item.title,
-                        f'-{float(item.shipping_cost):.2f}',
-                        'Shipping',
-                        auction_title,
-                        'Shipping costs'
-                    ])
-        
-        return output.getvalue()
+        return ''.join(iter_csv(CASHFLOW_CSV_HEADER, iter_cashflow_rows(start_date, end_date)))
         
     except Exception as e:
         logger.error(f"Error generating cash flow CSV: {e}")
@@ -203,44 +148,19 @@ def generate_cashflow_chart(start_date: datetime, end_date: datetime) -> Optiona
     try:
         import matplotlib.pyplot as plt
         import matplotlib.dates as mdates
-        from collections import defaultdict
-        from models import Item, ItemStatus
-        
-        # Get transaction data
-        items = Item.query.filter(
-            Item.updated_at >= start_date,
-            Item.updated_at <= end_date
-        ).all()
-        
-        # Aggregate data by week
-        weekly_data = defaultdict(lambda: {'income': 0, 'expenses': 0})
+        from utils.cashflow import weekly_cashflow
         
-        for item in items:
-            week_start = item.updated_at.replace(hour=0, minute=0, second=0, microsecond=0)
-            week_start = week_start - timedelta(days=week_start.weekday())  # Start of week
-            
-            # Expenses
-            if item.purchase_price:
-                weekly_data[week_start]['expenses'] += float(item.purchase_price)
-            if item.refurb_cost:
-                weekly_data[week_start]['expenses'] += float(item.refurb_cost)
-            if item.sale_fees:
-                weekly_data[week_start]['expenses'] += float(item.sale_fees)
-            if item.shipping_cost:
-                weekly_data[week_start]['expenses'] += float(item.shipping_cost)
-            
-            # Income
-            if item.sale_price and item.status == ItemStatus.SOLD:
-                weekly_data[week_start]['income'] += float(item.sale_price)
+        # Weekly totals from the cash event ledger
+        weekly_data = weekly_cashflow(start_date, end_date)
         
         if not weekly_data:
             logger.warning("No data available for cash flow chart")
             return None
         
         # Prepare chart data
-        dates = sorted(weekly_data.keys())
-        income = [weekly_data[date]['income'] for date in dates]
-        expenses = [weekly_data[date]['expenses'] for date in dates]
+        dates = [week for week, _, _ in weekly_data]
+        income = [inc for _, inc, _ in weekly_data]
+        expenses = [exp for _, _, exp in weekly_data]
         net_flow = [inc - exp for inc, exp in zip(income, expenses)]
         
         # Create chart
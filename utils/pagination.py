@@ -0,0 +1,110 @@
+"""
+Keyset (cursor) pagination helpers for large list pages
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Tuple, List, Any
+from sqlalchemy import tuple_
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """Encode a (timestamp, id) position as an opaque URL-safe token"""
+    payload = json.dumps([sort_value.isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """
+    Decode a cursor token produced by encode_cursor
+
+    Returns:
+        (timestamp, id) tuple or None if the token is missing or malformed
+    """
+    if not token:
+        return None
+
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+
+class KeysetPage:
+    """A single page of rows plus the cursors needed to move around it"""
+
+    def __init__(self, items: List[Any], next_cursor: Optional[str], prev_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        # Size of the whole filtered result, when the caller counts it
+        self.total: Optional[int] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+
+def paginate_keyset(query, sort_column, id_column, per_page: int = 20,
+                    after: Optional[str] = None, before: Optional[str] = None) -> KeysetPage:
+    """
+    Paginate a query newest-first on (sort_column, id_column) using keyset seeks
+
+    Every page is a single indexed range scan with LIMIT, so cost does not grow
+    with how deep the user pages. Pass `after` to move to older rows and
+    `before` to move back to newer ones.
+
+    Args:
+        query: Base query with any filters already applied
+        sort_column: Timestamp column to order by (descending)
+        id_column: Unique tie-breaker column (descending)
+        per_page: Rows per page
+        after: Cursor of the last row of the previous page
+        before: Cursor of the first row of the next page
+
+    Returns:
+        KeysetPage with the rows in display order
+    """
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before)
+    position = tuple_(sort_column, id_column)
+
+    if before_key:
+        # Walk backwards from the cursor, then flip back into display order
+        rows = (query.filter(position > before_key)
+                .order_by(sort_column.asc(), id_column.asc())
+                .limit(per_page + 1)
+                .all())
+        has_newer = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        has_older = True
+    else:
+        if after_key:
+            query = query.filter(position < after_key)
+        rows = (query.order_by(sort_column.desc(), id_column.desc())
+                .limit(per_page + 1)
+                .all())
+        has_older = len(rows) > per_page
+        rows = rows[:per_page]
+        has_newer = after_key is not None
+
+    sort_attr = sort_column.key
+    id_attr = id_column.key
+
+    next_cursor = None
+    prev_cursor = None
+    if rows and has_older:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_attr), getattr(last, id_attr))
+    if rows and has_newer:
+        first = rows[0]
+        prev_cursor = encode_cursor(getattr(first, sort_attr), getattr(first, id_attr))
+
+    return KeysetPage(rows, next_cursor, prev_cursor)
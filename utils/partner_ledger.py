@@ -0,0 +1,131 @@
+"""
+Partner ledger balances, statements and payouts
+
+Every ledger entry stores the partner's running balance after it in
+(entry_date, id) order, so a current balance is the latest-dated entry and a
+statement for any period is an opening balance (the last entry before the
+period) plus one range scan of
+idx_partner_ledger_partner_date. Accruals and adjustments are posted
+automatically by models.sync_partner_ledger(); payouts are recorded here.
+"""
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional
+from app import db
+
+# Largest payout the Numeric(10, 2) amount column holds
+MAX_PAYOUT = Decimal('99999999.99')
+
+
+def get_partner_balances(partner_ids: Optional[List[int]] = None) -> Dict[int, float]:
+    """
+    Current balance owed to each partner
+
+    Args:
+        partner_ids: Limit to these partners, or None for all
+
+    Returns:
+        {partner id: balance} for partners with ledger entries
+    """
+    from models import Partner, partner_ledger_balances
+
+    if partner_ids is None:
+        partner_ids = db.session.scalars(db.select(Partner.id)).all()
+    return {partner_id: float(balance)
+            for partner_id, balance in partner_ledger_balances(db.session, partner_ids).items()}
+
+
+def get_partner_statement(partner_id: int, start_date: Optional[date] = None,
+                          end_date: Optional[date] = None) -> Dict[str, Any]:
+    """
+    A partner's ledger entries for a period with opening and closing balances
+
+    Args:
+        partner_id: Partner to report on
+        start_date: First day to include, or None for the beginning
+        end_date: Last day to include, or None for today onwards
+
+    Returns:
+        Dict with opening_balance, entries (dicts), accrued, paid and
+        closing_balance
+    """
+    from models import PartnerLedgerEntry as Entry
+
+    opening = Decimal('0')
+    if start_date is not None:
+        opening = db.session.scalar(
+            db.select(Entry.balance)
+            .where(Entry.partner_id == partner_id, Entry.entry_date < start_date)
+            .order_by(Entry.entry_date.desc(), Entry.id.desc())
+            .limit(1)
+        ) or Decimal('0')
+
+    stmt = db.select(Entry).where(Entry.partner_id == partner_id)
+    if start_date is not None:
+        stmt = stmt.where(Entry.entry_date >= start_date)
+    if end_date is not None:
+        stmt = stmt.where(Entry.entry_date <= end_date)
+
+    entries = []
+    accrued = paid = Decimal('0')
+    for entry in db.session.scalars(stmt.order_by(Entry.entry_date, Entry.id)):
+        if entry.kind == 'payout':
+            paid -= entry.amount
+        else:
+            accrued += entry.amount
+        entries.append({
+            'date': entry.entry_date,
+            'kind': entry.kind,
+            'item_id': entry.item_id,
+            'description': entry.description,
+            'amount': float(entry.amount),
+            'balance': float(entry.balance),
+        })
+
+    return {
+        'opening_balance': float(opening),
+        'entries': entries,
+        'accrued': float(accrued),
+        'paid': float(paid),
+        'closing_balance': entries[-1]['balance'] if entries else float(opening),
+    }
+
+
+def record_payout(partner_id: int, amount, entry_date: Optional[date] = None,
+                  note: Optional[str] = None):
+    """
+    Record money paid to a partner
+
+    The entry is added to the session; the caller commits.
+
+    Args:
+        partner_id: Partner who was paid
+        amount: Positive amount paid
+        entry_date: Day of the payment, defaults to today
+        note: Optional description, e.g. a check number
+
+    Raises:
+        ValueError: If the amount isn't a positive number within MAX_PAYOUT
+    """
+    from models import post_partner_ledger_entries
+
+    try:
+        amount = Decimal(str(amount))
+    except (InvalidOperation, ValueError):
+        raise ValueError('Payout amount must be a number')
+    if not amount.is_finite():
+        raise ValueError('Payout amount must be a number')
+    amount = amount.quantize(Decimal('0.01'))
+    if amount <= 0:
+        raise ValueError('Payout amount must be greater than zero')
+    if amount > MAX_PAYOUT:
+        raise ValueError(f'Payout amount must be at most ${MAX_PAYOUT:,}')
+
+    post_partner_ledger_entries(db.session, [{
+        'partner_id': partner_id,
+        'item_id': None,
+        'entry_date': entry_date or date.today(),
+        'kind': 'payout',
+        'amount': -amount,
+        'description': (note or 'Payout')[:200],
+    }])
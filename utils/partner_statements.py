@@ -0,0 +1,295 @@
+"""
+Batch partner statements
+
+Statements for every partner are built in two steps:
+
+1. collect_partner_statements() reads the period's sold partnerships for all
+   partners in one ordered query (plus a few fixed ones for ledger balances
+   and payouts) and groups them into plain per-partner dicts.
+2. render_partner_statements() turns each dict into a CSV and a chart image
+   in a process pool, since drawing charts is CPU bound.
+
+The renderer never touches the database or the Flask app, so this module
+keeps its app imports inside the functions that need them: pool workers
+import it without building an app or opening connections.
+
+The rendered statements can be bundled into one zip or emailed to each
+partner.
+"""
+import csv
+import io
+import logging
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Any, BinaryIO, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_CSV_HEADER = ['Sale Date', 'Item Title', 'Lot Number', 'Auction',
+                        'Purchase Price', 'Sale Price', 'Net Profit',
+                        'Partner Share %', 'Partner Earnings']
+
+
+def collect_partner_statements(start_date: date, end_date: date,
+                               partner_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Every partner's sold items for a period, from one shared query
+
+    Args:
+        start_date: First sale date to include
+        end_date: Last sale date to include
+        partner_ids: Limit to these partners, or None for all
+
+    Returns:
+        One picklable dict per partner with sales in the period, a payout in
+        it or a balance owed, in partner order: partner_id, name, email,
+        start_date, end_date, rows (one per sale, in date order; empty
+        without sales), total and balance (currently owed, from the partner
+        ledger)
+    """
+    from app import db
+    from models import (Auction, Item, ItemPartner, ItemStatus, Partner, PartnerLedgerEntry,
+                        partner_ledger_balances, partner_share_amount)
+
+    stmt = (db.select(Partner.id, Partner.name, Partner.email, Item.title, Item.lot_number, Auction.title,
+                      Item.sale_date, Item.purchase_price, Item.sale_price, Item.net_profit_cached,
+                      ItemPartner.pct_share)
+            .join(ItemPartner, ItemPartner.partner_id == Partner.id)
+            .join(Item, ItemPartner.item_id == Item.id)
+            .outerjoin(Auction, Item.auction_id == Auction.id)
+            .where(Item.status == ItemStatus.SOLD, Item.sale_date >= start_date, Item.sale_date <= end_date)
+            .order_by(Partner.id, Item.sale_date, Item.id))
+    if partner_ids is not None:
+        stmt = stmt.where(Partner.id.in_(partner_ids))
+
+    statements: Dict[int, Dict[str, Any]] = {}
+
+    def statement_for(partner_id, name, email):
+        if partner_id not in statements:
+            statements[partner_id] = {
+                'partner_id': partner_id, 'name': name, 'email': email,
+                'start_date': start_date, 'end_date': end_date,
+                'rows': [], 'total': 0.0, 'balance': 0.0,
+            }
+        return statements[partner_id]
+
+    for (partner_id, name, email, title, lot_number, auction, sale_date, purchase_price, sale_price,
+         net_profit, pct_share) in db.session.execute(stmt):
+        statement = statement_for(partner_id, name, email)
+        share = float(partner_share_amount(net_profit, pct_share)) if net_profit is not None else None
+        statement['rows'].append({
+            'sale_date': sale_date,
+            'title': title,
+            'lot_number': lot_number,
+            'auction': auction,
+            'purchase_price': float(purchase_price) if purchase_price else None,
+            'sale_price': float(sale_price) if sale_price else None,
+            'net_profit': float(net_profit) if net_profit is not None else None,
+            'pct_share': float(pct_share),
+            'share': share,
+        })
+        statement['total'] += share or 0.0
+
+    # Partners without sales in the period still get a statement if they were
+    # paid in it or are owed money
+    balances = partner_ledger_balances(db.session, partner_ids)
+    payouts = (db.select(PartnerLedgerEntry.partner_id).distinct()
+               .where(PartnerLedgerEntry.kind == 'payout',
+                      PartnerLedgerEntry.entry_date >= start_date, PartnerLedgerEntry.entry_date <= end_date))
+    if partner_ids is not None:
+        payouts = payouts.where(PartnerLedgerEntry.partner_id.in_(partner_ids))
+    extra_ids = ({partner_id for partner_id, balance in balances.items() if balance}
+                 | set(db.session.scalars(payouts))) - set(statements)
+    if extra_ids:
+        for partner_id, name, email in db.session.execute(
+                db.select(Partner.id, Partner.name, Partner.email).where(Partner.id.in_(extra_ids))):
+            statement_for(partner_id, name, email)
+
+    for partner_id, balance in balances.items():
+        if partner_id in statements:
+            statements[partner_id]['balance'] = float(balance)
+    return [statements[partner_id] for partner_id in sorted(statements)]
+
+
+def statement_filename(statement: Dict[str, Any]) -> str:
+    """File name (without extension) for a partner's statement"""
+    name = re.sub(r'[^A-Za-z0-9]+', '_', statement['name']).strip('_') or f"partner_{statement['partner_id']}"
+    return f"{name}_statement_{statement['start_date']:%Y%m%d}_{statement['end_date']:%Y%m%d}"
+
+
+def _money(value: Optional[float]) -> str:
+    return f'${value:.2f}' if value else ''
+
+
+def statement_csv(statement: Dict[str, Any]) -> bytes:
+    """A partner's statement as CSV, in the same layout as the single-partner earnings export"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(STATEMENT_CSV_HEADER)
+    for row in statement['rows']:
+        writer.writerow([
+            row['sale_date'].strftime('%Y-%m-%d') if row['sale_date'] else '',
+            row['title'],
+            row['lot_number'] or '',
+            row['auction'] or '',
+            _money(row['purchase_price']),
+            _money(row['sale_price']),
+            _money(row['net_profit']),
+            f"{row['pct_share']:.1f}%",
+            _money(row['share']),
+        ])
+    writer.writerow(['', '', '', '', '', '', '', 'Total:', f"${statement['total']:.2f}"])
+    writer.writerow(['', '', '', '', '', '', '', 'Balance owed:', f"${statement['balance']:.2f}"])
+    return buffer.getvalue().encode('utf-8')
+
+
+def statement_chart(statement: Dict[str, Any]) -> Optional[bytes]:
+    """PNG of a partner's earnings per sale day and cumulative earnings over the period"""
+    from matplotlib.figure import Figure
+
+    daily: Dict[date, float] = {}
+    for row in statement['rows']:
+        if row['sale_date'] and row['share']:
+            daily[row['sale_date']] = daily.get(row['sale_date'], 0.0) + row['share']
+    if not daily:
+        return None
+
+    days = sorted(daily)
+    earnings = [daily[day] for day in days]
+    cumulative = []
+    running = 0.0
+    for amount in earnings:
+        running += amount
+        cumulative.append(running)
+
+    # Figure rather than pyplot: no global state, safe in any worker
+    figure = Figure(figsize=(10, 5))
+    ax = figure.subplots()
+    ax.bar(days, earnings, color=['green' if amount >= 0 else 'red' for amount in earnings],
+           alpha=0.7, label='Earnings')
+    ax.plot(days, cumulative, color='navy', marker='o', label='Cumulative')
+    ax.axhline(y=0, color='black', linestyle='-', alpha=0.3)
+    ax.set_title(f"{statement['name']} - Earnings {statement['start_date']:%m/%d/%Y} to "
+                 f"{statement['end_date']:%m/%d/%Y}")
+    ax.set_ylabel('Amount ($)')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    figure.autofmt_xdate()
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def render_partner_statement(statement: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Render one partner's statement; runs in a pool worker
+
+    Returns:
+        Dict with partner_id, name, email, filename, csv (bytes) and chart
+        (PNG bytes, or None when there is nothing to plot)
+    """
+    return {
+        'partner_id': statement['partner_id'],
+        'name': statement['name'],
+        'email': statement['email'],
+        'start_date': statement['start_date'],
+        'end_date': statement['end_date'],
+        'total': statement['total'],
+        'balance': statement['balance'],
+        'filename': statement_filename(statement),
+        'csv': statement_csv(statement),
+        'chart': statement_chart(statement),
+    }
+
+
+def render_partner_statements(statements: List[Dict[str, Any]], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Render statements in parallel, keeping their order
+
+    Args:
+        statements: Output of collect_partner_statements()
+        workers: Worker processes; 1 renders in this process. Defaults to
+            PARTNER_STATEMENT_WORKERS, or the CPU count outside an app
+
+    Returns:
+        Rendered statements (see render_partner_statement)
+    """
+    if workers is None:
+        workers = _configured_workers()
+    workers = min(workers, len(statements))
+    if workers <= 1:
+        return [render_partner_statement(statement) for statement in statements]
+
+    # spawn: workers start clean instead of inheriting the web process's threads and connections
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return list(pool.map(render_partner_statement, statements))
+
+
+def _configured_workers() -> int:
+    from flask import current_app, has_app_context
+
+    if has_app_context() and current_app.config.get('PARTNER_STATEMENT_WORKERS'):
+        return current_app.config['PARTNER_STATEMENT_WORKERS']
+    return os.cpu_count() or 1
+
+
+def write_statement_zip(rendered: List[Dict[str, Any]], binary_file: BinaryIO):
+    """Bundle rendered statements into a zip: a CSV and (when there is one) a chart per partner"""
+    with zipfile.ZipFile(binary_file, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+        for statement in rendered:
+            bundle.writestr(f"{statement['filename']}.csv", statement['csv'])
+            if statement['chart']:
+                bundle.writestr(f"{statement['filename']}.png", statement['chart'])
+
+
+def email_partner_statements(rendered: List[Dict[str, Any]], email_service=None) -> Dict[str, List[str]]:
+    """
+    Email each partner their own statement
+
+    Args:
+        rendered: Output of render_partner_statements()
+        email_service: Defaults to a new EmailService
+
+    Returns:
+        Partner names by outcome: {'sent', 'skipped' (no email address), 'failed'}
+    """
+    if email_service is None:
+        from utils.email_service import EmailService
+        email_service = EmailService()
+
+    result: Dict[str, List[str]] = {'sent': [], 'skipped': [], 'failed': []}
+    for statement in rendered:
+        if not statement['email']:
+            result['skipped'].append(statement['name'])
+            continue
+
+        period = f"{statement['start_date']:%m/%d/%Y} - {statement['end_date']:%m/%d/%Y}"
+        body = f"""
+        Partner Statement for {statement['name']}
+
+        Period: {period}
+        Earnings this period: ${statement['total']:.2f}
+        Current balance owed: ${statement['balance']:.2f}
+
+        The attached CSV lists each item sold in the period and your share.
+
+        Best regards,
+        Mitch Quick Auction Tracker
+        """
+        attachments = [{'type': 'csv', 'data': statement['csv'].decode('utf-8'),
+                        'filename': f"{statement['filename']}.csv"}]
+        if statement['chart']:
+            attachments.append({'type': 'image', 'data': statement['chart'],
+                                'filename': f"{statement['filename']}.png"})
+
+        if email_service.send_email([statement['email']], f'Mitch Quick - Partner Statement ({period})',
+                                    body, attachments):
+            result['sent'].append(statement['name'])
+        else:
+            result['failed'].append(statement['name'])
+    return result
@@ -0,0 +1,99 @@
+"""
+Partner statistics shared by the partner pages and the partner report
+
+Counts and earnings for every partner come from one GROUP BY over
+item_partner joined to the items' cached profit columns, so the cost
+depends on the number of partners, not on how many items each one is in.
+"""
+from typing import Any, Dict, List, Optional
+from app import db
+
+# Share of an unsold item's expected margin set aside for fees and shipping
+PENDING_FEE_ESTIMATE = 0.15
+
+
+def get_partner_stats(partner_ids: Optional[List[int]] = None) -> Dict[int, Dict[str, Any]]:
+    """
+    Item counts and earnings per partner
+
+    Realized earnings are each sold item's cached net profit times the
+    partner's share. Pending earnings estimate won and listed items at their
+    target resale price, less purchase and refurb costs and a 15% allowance
+    for fees; items that wouldn't make money count as zero.
+
+    Args:
+        partner_ids: Limit to these partners, or None for all
+
+    Returns:
+        {partner id: {'total_items', 'sold_items', 'total_earnings',
+        'pending_earnings'}}, with an entry for every partner even if they
+        have no items
+    """
+    from models import Item, ItemPartner, ItemStatus, Partner
+
+    share = ItemPartner.pct_share / 100
+    is_sold = Item.status == ItemStatus.SOLD
+    estimated_net = Item.target_resale_price - Item.purchase_price - db.func.coalesce(Item.refurb_cost, 0)
+    has_estimate = db.and_(
+        Item.status.in_([ItemStatus.WON, ItemStatus.LISTED]),
+        Item.target_resale_price != 0,
+        Item.purchase_price != 0,
+        estimated_net > 0,
+    )
+
+    stmt = (db.select(
+                Partner.id,
+                db.func.count(ItemPartner.id),
+                db.func.count(db.case((is_sold, ItemPartner.id))),
+                db.func.sum(db.case((is_sold, Item.net_profit_cached * share))),
+                db.func.sum(db.case((has_estimate, estimated_net * (1 - PENDING_FEE_ESTIMATE) * share))))
+            .outerjoin(ItemPartner, ItemPartner.partner_id == Partner.id)
+            .outerjoin(Item, ItemPartner.item_id == Item.id)
+            .group_by(Partner.id))
+    if partner_ids is not None:
+        stmt = stmt.where(Partner.id.in_(partner_ids))
+
+    return {
+        partner_id: {
+            'total_items': total_items,
+            'sold_items': sold_items,
+            'total_earnings': float(earnings or 0),
+            'pending_earnings': float(pending or 0),
+        }
+        for partner_id, total_items, sold_items, earnings, pending in db.session.execute(stmt)
+    }
+
+
+def get_recent_partner_sales(limit: int = 5) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Each partner's most recent sold items, newest first, in one windowed query
+
+    Returns:
+        {partner id: [{'item': {'id', 'title', 'sale_date'}, 'share',
+        'percentage'}]} for partners with sales
+    """
+    from models import Item, ItemPartner, ItemStatus
+
+    rank = db.func.row_number().over(
+        partition_by=ItemPartner.partner_id,
+        order_by=(Item.sale_date.desc().nulls_last(), Item.id.desc())
+    ).label('rank')
+    ranked = (db.select(ItemPartner.partner_id, Item.id, Item.title, Item.sale_date, ItemPartner.pct_share,
+                        (db.func.coalesce(Item.net_profit_cached, 0) * ItemPartner.pct_share / 100).label('share'),
+                        rank)
+              .join(Item, ItemPartner.item_id == Item.id)
+              .where(Item.status == ItemStatus.SOLD)
+              .subquery())
+    rows = db.session.execute(
+        db.select(ranked).where(ranked.c.rank <= limit)
+        .order_by(ranked.c.partner_id, ranked.c.rank)
+    )
+
+    sales: Dict[int, List[Dict[str, Any]]] = {}
+    for row in rows:
+        sales.setdefault(row.partner_id, []).append({
+            'item': {'id': row.id, 'title': row.title, 'sale_date': row.sale_date},
+            'share': float(row.share),
+            'percentage': row.pct_share,
+        })
+    return sales
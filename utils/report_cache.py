@@ -0,0 +1,333 @@
+"""
+Versioned cache for computed report data
+
+Entries are keyed by (report name, normalized parameters, data version).
+The data version lives in the database and is bumped when a transaction that
+wrote to the tables reports read commits (see models.mark_data_changed), so a
+change invalidates every cached report in every worker without anything
+having to be deleted - stale entries simply stop being asked for and age out
+of the backend.
+
+Backends (REPORT_CACHE_BACKEND):
+    memory      In-process LRU, evicting least recently used entries past
+                REPORT_CACHE_MAX_BYTES
+    filesystem  One file per entry under REPORT_CACHE_DIR, shared by all
+                workers on the host; oldest files are removed past the limit
+    redis       Any Redis-compatible server at REPORT_CACHE_URL (needs the
+                optional redis package); the server's maxmemory policy evicts
+                and entries expire after REPORT_CACHE_TTL seconds
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+from flask import current_app
+from app import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class MemoryBackend:
+    """Least-recently-used cache in this process, bounded by total value size"""
+
+    name = 'memory'
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {'entries': len(self._entries), 'bytes': self._size,
+                'max_bytes': self.max_bytes, 'evictions': self.evictions}
+
+
+class FileSystemBackend:
+    """One file per entry in a directory, bounded by total file size"""
+
+    name = 'filesystem'
+    suffix = '.cache'
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + self.suffix)
+
+    def _files(self):
+        with os.scandir(self.directory) as entries:
+            return [entry for entry in entries if entry.name.endswith(self.suffix)]
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = f.read()
+        except FileNotFoundError:
+            return None
+        # Reads refresh the modification time, so eviction is least recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        # Write then rename, so readers in other workers never see a partial file
+        temp_path = os.path.join(self.directory, f'.{uuid.uuid4().hex}.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(value)
+        os.replace(temp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        files = []
+        for entry in self._files():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for entry in self._files():
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        files = self._files()
+        return {'entries': len(files), 'bytes': sum(entry.stat().st_size for entry in files),
+                'max_bytes': self.max_bytes, 'evictions': self.evictions}
+
+
+class RedisBackend:
+    """Entries on a Redis-compatible server, shared by every worker and host"""
+
+    name = 'redis'
+    prefix = 'mitch-quick:report:'
+
+    def __init__(self, url: str, max_bytes: int = DEFAULT_MAX_BYTES, ttl: int = DEFAULT_TTL, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'max_bytes': self.max_bytes, 'ttl': self.ttl}
+
+
+def _normalize(value):
+    if isinstance(value, datetime):
+        # Date-only parameters arrive as midnight datetimes from strptime
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return str(value.normalize())
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_normalize(v) for v in value]
+        return sorted(items, key=repr) if isinstance(value, (set, frozenset)) else items
+    return value
+
+
+def normalize_params(params: Optional[Dict[str, Any]]) -> str:
+    """Canonical text for a parameter dict: sorted keys, None dropped, dates as ISO strings"""
+    return json.dumps(_normalize(params or {}), sort_keys=True, separators=(',', ':'), default=str)
+
+
+class ReportCache:
+    """Report data cache over a backend, with hit/miss counters for this process"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def make_key(self, report: str, params: Optional[Dict[str, Any]] = None,
+                 version_name: Optional[str] = None) -> str:
+        from models import REPORT_DATA_VERSION, get_data_version
+        version = get_data_version(db.session, version_name or REPORT_DATA_VERSION)
+        digest = hashlib.sha256(normalize_params(params).encode('utf-8')).hexdigest()[:32]
+        return f'{report}:v{version}:{digest}'
+
+    def get_or_compute(self, report: str, params: Optional[Dict[str, Any]], compute: Callable[[], Any],
+                       version_name: Optional[str] = None) -> Any:
+        """
+        Return cached report data, computing and storing it on a miss
+
+        Backend failures are logged and treated as misses; the report is
+        still served.
+
+        Args:
+            report: Report name
+            params: Parameters the data depends on
+            compute: Builds the data; its result must be picklable
+            version_name: Data version counter the data depends on, if
+                narrower than the reports version (e.g. EXPENSE_DATA_VERSION)
+        """
+        key = self.make_key(report, params, version_name)
+
+        try:
+            payload = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f'Report cache read failed for {report}: {e}')
+            self._count('errors')
+            payload = None
+
+        if payload is not None:
+            try:
+                value = pickle.loads(payload)
+            except Exception as e:
+                logger.warning(f'Discarding unreadable report cache entry for {report}: {e}')
+                self._count('errors')
+            else:
+                self._count('hits')
+                return value
+
+        self._count('misses')
+        value = compute()
+
+        try:
+            self.backend.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            logger.warning(f'Report cache write failed for {report}: {e}')
+            self._count('errors')
+
+        return value
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {
+            'backend': self.backend.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_ratio': self.hits / lookups if lookups else 0,
+        }
+        try:
+            stats.update(self.backend.stats())
+        except Exception as e:
+            stats['backend_error'] = str(e)
+        return stats
+
+
+def create_backend(config):
+    """Build the backend named by REPORT_CACHE_BACKEND from app config"""
+    kind = config.get('REPORT_CACHE_BACKEND', 'memory')
+    max_bytes = config.get('REPORT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+    if kind == 'memory':
+        return MemoryBackend(max_bytes)
+    if kind == 'filesystem':
+        directory = config.get('REPORT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'mitch-quick-report-cache')
+        return FileSystemBackend(directory, max_bytes)
+    if kind == 'redis':
+        return RedisBackend(config['REPORT_CACHE_URL'], max_bytes, config.get('REPORT_CACHE_TTL', DEFAULT_TTL))
+    raise ValueError(f'Unknown REPORT_CACHE_BACKEND "{kind}" (expected memory, filesystem or redis)')
+
+
+def get_report_cache() -> ReportCache:
+    """The app's report cache, created on first use"""
+    cache = current_app.extensions.get('report_cache')
+    if cache is None:
+        try:
+            backend = create_backend(current_app.config)
+        except Exception as e:
+            logger.warning(f'Report cache backend unavailable, using in-process cache: {e}')
+            backend = MemoryBackend(current_app.config.get('REPORT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        cache = current_app.extensions['report_cache'] = ReportCache(backend)
+    return cache
+
+
+def cached_report(report: str, params: Optional[Dict[str, Any]], compute: Callable[[], Any],
+                  version_name: Optional[str] = None) -> Any:
+    """Shortcut for get_report_cache().get_or_compute(...)"""
+    return get_report_cache().get_or_compute(report, params, compute, version_name)
@@ -0,0 +1,352 @@
+"""
+Background report jobs
+
+Long reports and exports run outside the request: submitting a job returns
+its id straight away, a worker writes the result to a file under
+REPORT_JOB_DIR, and the page polls the job until the result is ready.
+
+REPORT_JOB_EXECUTOR picks the worker:
+    thread    a small thread pool in the web process (default)
+    external  jobs wait in the report_job table for `flask run-report-jobs`
+    inline    run during the submitting request (tests and local debugging)
+
+A finished result is reused for the same kind, parameters, data version and
+user, and removed after REPORT_JOB_RETENTION_HOURS. Jobs are only visible to
+the user who submitted them.
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Callable, Dict, NamedTuple, Optional
+from flask import current_app
+from app import db
+from utils.report_cache import normalize_params
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+PENDING_STATUSES = (QUEUED, RUNNING)
+
+# Jobs still pending after this long are assumed lost with their worker
+STALE_AFTER = timedelta(hours=1)
+
+
+class JobKind(NamedTuple):
+    """How to compute and serve one kind of job"""
+    build: Callable[[Dict[str, Any], BinaryIO], None]  # (params, result file) -> None
+    filename: Callable[[Dict[str, Any]], str]
+    mimetype: str
+    view: Optional[str] = None  # endpoint that shows the result (given job=<id>) instead of downloading it
+
+
+JOB_KINDS: Dict[str, JobKind] = {}
+
+
+def register_job_kind(name: str, build: Callable[[Dict[str, Any], BinaryIO], None],
+                      filename: Callable[[Dict[str, Any]], str], mimetype: str,
+                      view: Optional[str] = None):
+    """
+    Make a report available as a background job
+
+    Args:
+        name: Job kind, used in URLs and the report_job table
+        build: Writes the result for the given parameters to a binary file
+        filename: Download name for the result
+        mimetype: Content type of the result
+        view: Endpoint that renders a finished result, for kinds shown as a
+            page rather than downloaded
+    """
+    JOB_KINDS[name] = JobKind(build, filename, mimetype, view)
+
+
+def job_directory() -> str:
+    directory = (current_app.config.get('REPORT_JOB_DIR')
+                 or os.path.join(tempfile.gettempdir(), 'mitch-quick-report-jobs'))
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def job_params(job) -> Dict[str, Any]:
+    return json.loads(job.params)
+
+
+def submit_job(kind: str, params: Dict[str, Any], user_id: Optional[str] = None):
+    """
+    Queue a job, or return an existing one for the same parameters and data
+
+    Args:
+        kind: Registered job kind
+        params: JSON-serializable parameters passed to the kind's build function
+        user_id: Submitting user; only they can see the job
+
+    Raises:
+        ValueError: If the kind isn't registered
+
+    Returns:
+        ReportJob, possibly already finished
+    """
+    from models import ReportJob, get_data_version
+
+    if kind not in JOB_KINDS:
+        raise ValueError(f'Unknown report job kind "{kind}"')
+
+    purge_expired_jobs()
+
+    params_json = normalize_params(params)
+    params_key = hashlib.sha256(params_json.encode('utf-8')).hexdigest()
+    version = get_data_version(db.session)
+
+    existing = _reusable_job(kind, params_key, version, user_id)
+    if existing is not None:
+        return existing
+
+    job = ReportJob(id=uuid.uuid4().hex, kind=kind, params=params_json, params_key=params_key,
+                    data_version=version, status=QUEUED, user_id=user_id)
+    if current_app.config.get('REPORT_JOB_EXECUTOR', 'thread') == 'thread':
+        job.worker = _worker_name()
+    db.session.add(job)
+    db.session.commit()
+
+    _dispatch(job.id)
+    return job
+
+
+def _reusable_job(kind: str, params_key: str, version: int, user_id: Optional[str]):
+    from models import ReportJob
+
+    fresh_since = datetime.utcnow() - STALE_AFTER
+    candidates = ReportJob.query.filter(
+        ReportJob.kind == kind,
+        ReportJob.params_key == params_key,
+        ReportJob.data_version == version,
+        ReportJob.user_id.is_(None) if user_id is None else ReportJob.user_id == user_id,
+        ReportJob.status != FAILED
+    ).order_by(ReportJob.created_at.desc())
+
+    for job in candidates:
+        if job.status == DONE and job.file_path and os.path.exists(job.file_path):
+            return job
+        if job.status in PENDING_STATUSES and job.created_at >= fresh_since:
+            return job
+    return None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Job being built on this thread, for report_job_progress()
+_running = threading.local()
+
+
+def _worker_name() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _process_gone(pid: int) -> bool:
+    if pid == os.getpid():
+        # This process is only starting up, so it isn't running anything yet
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+def fail_orphaned_jobs() -> int:
+    """
+    Mark failed the pending jobs of thread pools that no longer exist
+
+    A job run on a web process's thread pool dies with the process, and would
+    otherwise stay pending - blocking a rerun - until STALE_AFTER. Called at
+    startup; jobs of processes on other hosts are left to STALE_AFTER.
+
+    Returns:
+        Number of jobs marked failed
+    """
+    from models import ReportJob
+
+    host = socket.gethostname()
+    pending = ReportJob.query.filter(
+        ReportJob.status.in_(PENDING_STATUSES),
+        ReportJob.worker.like(f'{host}:%')
+    ).all()
+
+    orphaned = [job for job in pending if _process_gone(int(job.worker.rsplit(':', 1)[1]))]
+    for job in orphaned:
+        job.status = FAILED
+        job.error = 'The process running this job stopped before it finished'
+        job.finished_at = datetime.utcnow()
+    if orphaned:
+        db.session.commit()
+    return len(orphaned)
+
+
+def _executor(app) -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=app.config.get('REPORT_JOB_THREADS', 2),
+                                       thread_name_prefix='report-job')
+    return _pool
+
+
+def _run_in_app_context(app, job_id: str):
+    with app.app_context():
+        try:
+            run_job(job_id)
+        finally:
+            db.session.remove()
+
+
+def _dispatch(job_id: str):
+    executor = current_app.config.get('REPORT_JOB_EXECUTOR', 'thread')
+    if executor == 'inline':
+        run_job(job_id)
+    elif executor == 'thread':
+        app = current_app._get_current_object()
+        _executor(app).submit(_run_in_app_context, app, job_id)
+    # 'external': left queued for `flask run-report-jobs`
+
+
+def run_job(job_id: str) -> bool:
+    """
+    Claim a queued job and write its result
+
+    The claim is a conditional UPDATE, so several workers can poll the same
+    table without running a job twice.
+
+    Returns:
+        False if the job was no longer queued
+    """
+    from models import ReportJob
+
+    table = ReportJob.__table__
+    claimed = db.session.execute(
+        table.update()
+        .where(table.c.id == job_id, table.c.status == QUEUED)
+        .values(status=RUNNING, started_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return False
+
+    job = db.session.get(ReportJob, job_id)
+    kind = JOB_KINDS.get(job.kind)
+    path = os.path.join(job_directory(), f'{job.id}.result')
+    temp_path = path + '.tmp'
+
+    try:
+        if kind is None:
+            raise ValueError(f'Unknown report job kind "{job.kind}"')
+        _running.job_id = job_id
+        try:
+            with open(temp_path, 'wb') as f:
+                kind.build(job_params(job), f)
+        finally:
+            _running.job_id = None
+        os.replace(temp_path, path)
+    except Exception as e:
+        logger.exception(f'Report job {job_id} ({job.kind}) failed')
+        db.session.rollback()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        job.status = FAILED
+        job.error = str(e)
+    else:
+        job.status = DONE
+        job.file_path = path
+
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return True
+
+
+def run_pending_jobs() -> int:
+    """Run every queued job, oldest first; returns how many this worker ran"""
+    from models import ReportJob
+
+    job_ids = db.session.scalars(
+        db.select(ReportJob.id).where(ReportJob.status == QUEUED).order_by(ReportJob.created_at)
+    ).all()
+    return sum(1 for job_id in job_ids if run_job(job_id))
+
+
+def purge_expired_jobs() -> int:
+    """Delete finished jobs (and their files) older than REPORT_JOB_RETENTION_HOURS"""
+    from models import ReportJob
+
+    cutoff = datetime.utcnow() - timedelta(hours=current_app.config.get('REPORT_JOB_RETENTION_HOURS', 24))
+    expired = ReportJob.query.filter(
+        ReportJob.created_at < cutoff,
+        ReportJob.status.in_([DONE, FAILED])
+    ).all()
+
+    for job in expired:
+        if job.file_path and os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        db.session.delete(job)
+    if expired:
+        db.session.commit()
+    return len(expired)
+
+
+def get_job(job_id: str, user_id: Optional[str]):
+    """The job with this id, or None if there is none or another user submitted it"""
+    from models import ReportJob
+    job = db.session.get(ReportJob, job_id)
+    if job is None or job.user_id != user_id:
+        return None
+    return job
+
+
+def report_job_progress(done: int, total: Optional[int] = None):
+    """
+    Record how far the job being built on this thread has got
+
+    Build functions call this as they go so the polled status can show it;
+    outside a job (e.g. from the CLI) it does nothing. Commits the session,
+    so call it between units of work.
+    """
+    from models import ReportJob
+
+    job_id = getattr(_running, 'job_id', None)
+    if job_id is None:
+        return
+    table = ReportJob.__table__
+    db.session.execute(table.update().where(table.c.id == job_id)
+                       .values(progress=done, progress_total=total))
+    db.session.commit()
+
+
+def job_status(job) -> Dict[str, Any]:
+    """JSON-friendly summary of a job"""
+    return {
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'error': job.error,
+        'progress': job.progress,
+        'progress_total': job.progress_total,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def job_result_path(job) -> Optional[str]:
+    """Path of a finished job's result file, or None if it isn't available"""
+    if job.status == DONE and job.file_path and os.path.exists(job.file_path):
+        return job.file_path
+    return None
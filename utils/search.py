@@ -0,0 +1,210 @@
+"""
+Full-text item search
+
+Postgres uses a generated tsvector column with a GIN index (see
+supabase_schema.sql). SQLite uses an FTS5 shadow table kept in sync by
+triggers. Both rank matches and page with LIMIT.
+"""
+import logging
+import re
+from typing import List, Any
+from sqlalchemy import text
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Lot numbers and titles are what people type, so they outrank descriptions
+POSTGRES_SEARCH_SETUP = [
+    """
+    ALTER TABLE item ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(lot_number, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_item_search_vector ON item USING GIN (search_vector)",
+    # Trigram indexes serve the typeahead's ILIKE '%...%' lookups
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_item_title_trgm ON item USING GIN (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_item_lot_number_trgm ON item USING GIN (lot_number gin_trgm_ops)",
+]
+
+SQLITE_SEARCH_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS item_fts USING fts5(
+        title, description, lot_number, content='item', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_fts_insert AFTER INSERT ON item BEGIN
+        INSERT INTO item_fts(rowid, title, description, lot_number)
+        VALUES (new.id, new.title, new.description, new.lot_number);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_fts_delete AFTER DELETE ON item BEGIN
+        INSERT INTO item_fts(item_fts, rowid, title, description, lot_number)
+        VALUES ('delete', old.id, old.title, old.description, old.lot_number);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_fts_update AFTER UPDATE OF title, description, lot_number ON item BEGIN
+        INSERT INTO item_fts(item_fts, rowid, title, description, lot_number)
+        VALUES ('delete', old.id, old.title, old.description, old.lot_number);
+        INSERT INTO item_fts(rowid, title, description, lot_number)
+        VALUES (new.id, new.title, new.description, new.lot_number);
+    END
+    """,
+]
+
+
+class SearchResults:
+    """One page of ranked search results"""
+
+    def __init__(self, query: str, items: List[Any], page: int, per_page: int, has_next: bool):
+        self.query = query
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_next = has_next
+
+    @property
+    def has_prev(self) -> bool:
+        return self.page > 1
+
+
+def ensure_search_index(rebuild: bool = False):
+    """
+    Create the search column/index (Postgres) or FTS5 table and triggers (SQLite)
+
+    Safe to run on every startup. A newly created SQLite FTS5 table is filled
+    from the item table straight away, so an existing database is searchable
+    on first start. Pass rebuild=True to repopulate it later, e.g. after bulk
+    loads that bypassed triggers.
+    """
+    dialect = db.engine.dialect.name
+
+    if dialect == 'postgresql':
+        statements = POSTGRES_SEARCH_SETUP
+    elif dialect == 'sqlite':
+        statements = SQLITE_SEARCH_SETUP
+        exists = db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'item_fts'")).first()
+        # The triggers only index later writes; items already present need a full build
+        rebuild = rebuild or exists is None
+    else:
+        logger.warning(f"Full-text search is not supported on {dialect}")
+        return
+
+    for statement in statements:
+        db.session.execute(text(statement))
+
+    if dialect == 'sqlite' and rebuild:
+        db.session.execute(text("INSERT INTO item_fts(item_fts) VALUES ('rebuild')"))
+
+    db.session.commit()
+
+
+def _fts5_query(query: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, last word as a prefix"""
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return ''
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def item_label(item) -> str:
+    """Display label used by item pickers"""
+    if item.lot_number:
+        return f'{item.title} (Lot #{item.lot_number})'
+    return item.title
+
+
+def typeahead_items(query: str, limit: int = 20):
+    """
+    Quick item lookup for pickers: prefix matches first, then substring matches
+
+    Queries shorter than three characters only prefix-match, since trigram
+    indexes can't narrow substrings that short.
+
+    Returns:
+        Rows with id, title and lot_number
+    """
+    from models import Item
+
+    query = (query or '').strip()
+    if not query:
+        return []
+
+    prefix_match = db.or_(Item.title.istartswith(query, autoescape=True),
+                          Item.lot_number.istartswith(query, autoescape=True))
+    if len(query) < 3:
+        match = prefix_match
+    else:
+        match = db.or_(Item.title.icontains(query, autoescape=True),
+                       Item.lot_number.icontains(query, autoescape=True))
+
+    stmt = (db.select(Item.id, Item.title, Item.lot_number)
+            .where(match)
+            .order_by(db.case((prefix_match, 0), else_=1), Item.title, Item.id)
+            .limit(limit))
+    return db.session.execute(stmt).all()
+
+
+def search_items(query: str, page: int = 1, per_page: int = 20, options=()) -> SearchResults:
+    """
+    Search items by title, description and lot number
+
+    Args:
+        query: Free text entered by the user
+        page: 1-based page number
+        per_page: Results per page
+        options: Loader options applied to the Item query
+
+    Returns:
+        SearchResults with the best matches first
+    """
+    from models import Item
+
+    query = (query or '').strip()
+    page = max(page, 1)
+    if not query:
+        return SearchResults(query, [], page, per_page, False)
+
+    dialect = db.engine.dialect.name
+
+    if dialect == 'postgresql':
+        tsquery = db.func.websearch_to_tsquery('english', query)
+        search_vector = db.literal_column('item.search_vector')
+        rank = db.func.ts_rank_cd(search_vector, tsquery)
+        stmt = (db.select(Item)
+                .where(search_vector.op('@@')(tsquery))
+                .order_by(rank.desc(), Item.id.desc()))
+    elif dialect == 'sqlite':
+        fts_query = _fts5_query(query)
+        if not fts_query:
+            return SearchResults(query, [], page, per_page, False)
+        item_fts = db.table('item_fts', db.column('rowid'))
+        fts = db.literal_column('item_fts')
+        # bm25 weights follow the column order: title, description, lot_number
+        rank = db.func.bm25(fts, 10.0, 1.0, 10.0)
+        stmt = (db.select(Item)
+                .join(item_fts, item_fts.c.rowid == Item.id)
+                .where(fts.op('MATCH')(fts_query))
+                .order_by(rank, Item.id.desc()))
+    else:
+        # Unindexed fallback for other databases
+        pattern = f'%{query}%'
+        stmt = (db.select(Item)
+                .where(db.or_(Item.title.ilike(pattern),
+                              Item.description.ilike(pattern),
+                              Item.lot_number.ilike(pattern)))
+                .order_by(Item.updated_at.desc(), Item.id.desc()))
+
+    stmt = stmt.options(*options).limit(per_page + 1).offset((page - 1) * per_page)
+    items = db.session.execute(stmt).unique().scalars().all()
+
+    return SearchResults(query, items[:per_page], page, per_page, len(items) > per_page)